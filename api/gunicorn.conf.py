@@ -0,0 +1,43 @@
+"""
+🏭 GUNICORN CONFIG - Production serving for the Twin API
+Run from anywhere: gunicorn -c api/gunicorn.conf.py
+"""
+
+import os
+from pathlib import Path
+
+# Import path for the app, relative to the repository root
+chdir = str(Path(__file__).resolve().parent.parent)
+wsgi_app = "api.twin_api:app"
+
+bind = f"{os.getenv('TWIN_API_HOST', '0.0.0.0')}:{os.getenv('TWIN_API_PORT', '5001')}"
+
+# Threaded workers: dashboard polling is I/O bound and each worker keeps
+# its own user sessions in memory, so threads scale better than processes
+worker_class = "gthread"
+workers = int(os.getenv("TWIN_API_WORKERS", "1"))
+threads = int(os.getenv("TWIN_API_THREADS", "8"))
+
+# One worker only. A second process would load its own copy of each
+# user's learned profile and context and overwrite the other's on save;
+# only decisions are shared through storage (see core/storage.py).
+if workers > 1:
+    print(f"⚠️ TWIN_API_WORKERS={workers} is not supported; serving with 1 worker")
+    print("   Raise TWIN_API_THREADS for more concurrency")
+    workers = 1
+
+# Liveness heartbeat: a worker that stops checking in with the master for
+# this many seconds is killed and restarted. Requests themselves have no
+# overall deadline; /api/decision/check bounds its own stages.
+timeout = int(os.getenv("TWIN_API_TIMEOUT", "30"))
+graceful_timeout = timeout
+
+# Seconds an idle keep-alive connection may stay open
+keepalive = int(os.getenv("TWIN_API_KEEPALIVE", "5"))
+
+# Never import the app in the master: the worker builds its engines,
+# storage connections and tracker after the fork
+preload_app = False
+
+accesslog = os.getenv("TWIN_API_ACCESS_LOG")
+errorlog = "-"
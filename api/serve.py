@@ -0,0 +1,54 @@
+"""
+🏭 TWIN API SERVER
+Production entry point: gunicorn workers on Linux/macOS, waitress on Windows
+"""
+
+import os
+import runpy
+import sys
+from pathlib import Path
+
+API_DIR = Path(__file__).resolve().parent
+CONFIG_PATH = API_DIR / "gunicorn.conf.py"
+
+try:
+    import gunicorn  # noqa: F401
+    GUNICORN_AVAILABLE = True
+except ImportError:
+    GUNICORN_AVAILABLE = False
+
+try:
+    import waitress
+    WAITRESS_AVAILABLE = True
+except ImportError:
+    WAITRESS_AVAILABLE = False
+
+
+def main():
+    """Serve the API with the settings from gunicorn.conf.py"""
+    if GUNICORN_AVAILABLE and sys.platform != "win32":
+        os.execv(sys.executable, [sys.executable, "-m", "gunicorn", "-c", str(CONFIG_PATH)])
+
+    if not WAITRESS_AVAILABLE:
+        print("⚠️ No production server installed")
+        print("   pip install gunicorn   (Linux/macOS)")
+        print("   pip install waitress   (Windows)")
+        return
+
+    # Waitress has no worker processes; reuse the bind, thread and timeout settings
+    config = runpy.run_path(str(CONFIG_PATH))
+    sys.path.insert(0, config["chdir"])
+    os.chdir(config["chdir"])
+    from api.twin_api import app
+
+    print(f"🚀 Serving Cognitive Twin API on http://{config['bind']}")
+    waitress.serve(
+        app,
+        listen=config["bind"],
+        threads=config["threads"],
+        channel_timeout=config["timeout"]
+    )
+
+
+if __name__ == "__main__":
+    main()
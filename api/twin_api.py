@@ -3,30 +3,26 @@
 RESTful API for web and mobile interfaces
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, abort, g, make_response, request, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.local import LocalProxy
 from flask_cors import CORS
 import sys
 import os
 from pathlib import Path
+import gzip
+import hmac
+import zlib
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from core.cognitive_state_monitor import CognitiveStateMonitor
-from core.parallel_universe_viewer import ParallelUniverseViewer
-from core.decision_intervention import DecisionInterventionSystem
-from core.regret_predictor import RegretPredictor
-from core.flow_state_protector import FlowStateProtector
-from core.decision_tracker import DecisionTracker
-from core.pattern_analyzer import PatternAnalyzer
-from core.learning_engine import LearningEngine
-from core.context_awareness import ContextAwarenessEngine
-from core.jarvis_brain import JarvisBrain
-from core.proactive_assistant import ProactiveAssistant
 from core.activity_tracker import get_tracker
 from core.voice_interface import get_voice_interface
+from core.twin_session import DEFAULT_USER, get_session_cache
+from core.stage_runner import get_stage_runner
 
 # Load environment variables
 from dotenv import load_dotenv
@@ -35,20 +31,64 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)  # Enable CORS for mobile/web
 
-# Initialize systems
-state_monitor = CognitiveStateMonitor()
-universe_viewer = ParallelUniverseViewer()
-decision_tracker = DecisionTracker()
-pattern_analyzer = PatternAnalyzer()
-intervention_system = DecisionInterventionSystem(decision_tracker, pattern_analyzer)
-regret_predictor = RegretPredictor(decision_tracker)
-flow_protector = FlowStateProtector()
-learning_engine = LearningEngine()
-context_engine = ContextAwarenessEngine()
-jarvis = JarvisBrain()
-proactive = ProactiveAssistant()
-activity_tracker = get_tracker()
-voice_interface = get_voice_interface()
+# Per-user engines, built on first request and evicted when idle
+sessions = get_session_cache()
+
+# Shared with the authenticating proxy that sets X-Twin-User; without it
+# only the default user is served
+USER_HEADER_SECRET = os.getenv("TWIN_USER_HEADER_SECRET", "")
+
+
+def _requested_user():
+    """The user named by X-Twin-User, trusted only alongside the proxy's secret"""
+    user_id = request.headers.get('X-Twin-User')
+    if not user_id:
+        return DEFAULT_USER
+    if not USER_HEADER_SECRET:
+        abort(make_response(jsonify({
+            "success": False,
+            "error": "X-Twin-User is disabled; set TWIN_USER_HEADER_SECRET behind an authenticating proxy"
+        }), 403))
+    secret = request.headers.get('X-Twin-User-Secret', '')
+    if not hmac.compare_digest(secret.encode(), USER_HEADER_SECRET.encode()):
+        abort(make_response(jsonify({"success": False, "error": "X-Twin-User requires a valid X-Twin-User-Secret"}), 403))
+    return user_id
+
+
+def current_session():
+    """The calling user's twin, chosen by the X-Twin-User header; pinned until the request ends"""
+    if 'twin_session' not in g:
+        try:
+            g.twin_session = sessions.acquire(_requested_user())
+        except ValueError as e:
+            abort(make_response(jsonify({"success": False, "error": str(e)}), 400))
+    return g.twin_session
+
+
+@app.teardown_request
+def release_session(exc=None):
+    """Let the cache evict or close the request's twin again"""
+    twin = g.pop('twin_session', None)
+    if twin is not None:
+        sessions.release(twin)
+
+
+state_monitor = LocalProxy(lambda: current_session().state_monitor)
+universe_viewer = LocalProxy(lambda: current_session().universe_viewer)
+decision_tracker = LocalProxy(lambda: current_session().decision_tracker)
+pattern_analyzer = LocalProxy(lambda: current_session().pattern_analyzer)
+intervention_system = LocalProxy(lambda: current_session().intervention_system)
+regret_predictor = LocalProxy(lambda: current_session().regret_predictor)
+flow_protector = LocalProxy(lambda: current_session().flow_protector)
+learning_engine = LocalProxy(lambda: current_session().learning_engine)
+context_engine = LocalProxy(lambda: current_session().context_engine)
+jarvis = LocalProxy(lambda: current_session().jarvis)
+proactive = LocalProxy(lambda: current_session().proactive)
+
+# Machine-wide: these observe the local keyboard, mouse and microphone.
+# Built on first use, so each server worker creates its own after forking.
+activity_tracker = LocalProxy(get_tracker)
+voice_interface = LocalProxy(get_voice_interface)
 
 
 # ============= VIRTUAL ASSISTANT ENDPOINTS =============
@@ -59,9 +99,10 @@ def get_greeting():
     # Learn from interaction
     state = state_monitor.get_current_state()
     learning_engine.learn_from_interaction("state_check", state)
+    profile = learning_engine.profile_snapshot()
     
     # Get JARVIS-style greeting
-    greeting = proactive.get_contextual_greeting(learning_engine.profile, state)
+    greeting = proactive.get_contextual_greeting(profile, state)
     
     # Get smart recommendation
     recommendation = learning_engine.get_smart_recommendation(state)
@@ -72,7 +113,7 @@ def get_greeting():
     # Get proactive suggestions
     suggestions = proactive.get_proactive_suggestions(
         state, 
-        learning_engine.profile, 
+        profile, 
         datetime.now().hour
     )
     
@@ -85,7 +126,7 @@ def get_greeting():
         "energy": state["energy_level"],
         "mood": "great" if state["energy_level"] > 70 else "okay" if state["energy_level"] > 40 else "tired",
         "insight": insight,
-        "relationship_level": learning_engine.profile["relationship_level"],
+        "relationship_level": profile["relationship_level"],
         "suggestions": suggestions,
         "commentary": commentary,
         "ai_available": jarvis.is_available()
@@ -141,12 +182,13 @@ def ask_assistant():
     
     # Get current state
     state = state_monitor.get_current_state()
+    profile = learning_engine.profile_snapshot()
     
     # Use JARVIS brain for intelligent response
     if jarvis.is_available():
         answer = jarvis.chat(
             question,
-            learning_engine.profile,
+            profile,
             state,
             understanding
         )
@@ -158,10 +200,10 @@ def ask_assistant():
             "am i productive": f"You've had {state_monitor.get_daily_stats()['total_focus_time']} minutes of focus time today.",
             "can i make decisions": "Yes, your decision quality is good!" if state['decision_quality'] > 70 else "Wait a bit, your decision quality is low right now.",
             "what should i do": learning_engine.get_smart_recommendation(state),
-            "how do you know me": f"I've learned from {learning_engine.profile['relationship_level']:.0f}% of our interactions. I'm getting to know you!",
+            "how do you know me": f"I've learned from {profile['relationship_level']:.0f}% of our interactions. I'm getting to know you!",
             "what have you learned": f"I've tracked {len(learning_engine.interactions)} interactions and generated {len(learning_engine.insights)} insights about you.",
             "tell me something": learning_engine.generate_insight() or {"message": "Keep using me and I'll learn more about you!"},
-            "what's my pattern": f"You often think about: {', '.join(list(learning_engine.profile['decision_style'].keys())[:3]) if learning_engine.profile['decision_style'] else 'not enough data yet'}",
+            "what's my pattern": f"You often think about: {', '.join(list(profile['decision_style'].keys())[:3]) if profile['decision_style'] else 'not enough data yet'}",
             "predict": learning_engine.predict_next_state(datetime.now().hour)["message"],
             "insight": learning_engine.generate_insight() or {"message": "I need more data to generate insights"}
         }
@@ -226,64 +268,189 @@ def log_activity():
     return jsonify({"success": True, "message": "Activity logged"})
 
 
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonlines')
+
+# Bounds on one activity batch, checked after decompression
+BATCH_MAX_BYTES = int(os.getenv("TWIN_BATCH_MAX_BYTES", str(8 * 1024 * 1024)))
+BATCH_MAX_ITEMS = int(os.getenv("TWIN_BATCH_MAX_ITEMS", "10000"))
+
+# Raw request bodies can't be larger than a decompressed batch either
+app.config['MAX_CONTENT_LENGTH'] = BATCH_MAX_BYTES
+
+
+def _read_activities():
+    """Activities from an NDJSON or JSON-array body, gzip or plain
+    
+    The batch is held in memory, so the decompressed size and the item
+    count are capped; a small gzip body can't expand without bound.
+    """
+    stream = request.stream
+    if request.headers.get('Content-Encoding', '').lower() == 'gzip':
+        stream = gzip.GzipFile(fileobj=stream)
+    
+    if request.mimetype in NDJSON_TYPES:
+        activities = []
+        budget = BATCH_MAX_BYTES
+        while True:
+            line = stream.readline(budget + 1)
+            if not line:
+                break
+            budget -= len(line)
+            if budget < 0:
+                raise RequestEntityTooLarge(f"batch is larger than {BATCH_MAX_BYTES} bytes")
+            line = line.strip()
+            if line:
+                if len(activities) >= BATCH_MAX_ITEMS:
+                    raise RequestEntityTooLarge(f"batch has more than {BATCH_MAX_ITEMS} activities")
+                activities.append(json.loads(line))
+        return activities
+    
+    raw = stream.read(BATCH_MAX_BYTES + 1)
+    if len(raw) > BATCH_MAX_BYTES:
+        raise RequestEntityTooLarge(f"batch is larger than {BATCH_MAX_BYTES} bytes")
+    body = json.loads(raw or b'[]')
+    if isinstance(body, dict):
+        body = body.get('activities', [])
+    if not isinstance(body, list):
+        raise ValueError("expected a list of activities")
+    if len(body) > BATCH_MAX_ITEMS:
+        raise RequestEntityTooLarge(f"batch has more than {BATCH_MAX_ITEMS} activities")
+    return body
+
+
+@app.route('/api/state/activity/batch', methods=['POST'])
+def log_activity_batch():
+    """Log many activities in one request and return the resulting state
+    
+    The whole batch is read and validated before anything is applied, so a
+    rejected batch can be retried as is.
+    """
+    try:
+        applied = state_monitor.log_activities(_read_activities())
+    except RequestEntityTooLarge as e:
+        return jsonify({"success": False, "error": f"Activity batch too large: {e.description}"}), 413
+    except (ValueError, TypeError, KeyError, EOFError, OSError, zlib.error) as e:
+        # Malformed JSON or item, or a bad or truncated gzip stream
+        return jsonify({"success": False, "error": f"Invalid activity batch: {e}"}), 400
+
+    return jsonify({
+        "success": True,
+        "applied": applied,
+        "state": state_monitor.get_current_state()
+    })
+
+
 # ============= DECISION ENDPOINTS =============
 
+# Seconds from request start each /api/decision/check stage may take
+DECISION_STAGE_DEADLINES = {
+    "learn": 2.0,
+    "regret": 2.0,
+    "intervention": 2.0,
+    "universe": 1.0,
+    "understanding": 2.0,
+    "jarvis": float(os.getenv("TWIN_AI_DEADLINE", "10"))
+}
+
+
 @app.route('/api/decision/check', methods=['POST'])
 def check_decision():
-    """Check a decision - JARVIS-powered analysis"""
+    """Check a decision - JARVIS-powered analysis
+    
+    The analyses run concurrently; any that miss their deadline or fail are
+    returned as null and listed in "stages".
+    """
     data = request.json
     decision = data.get('decision', '')
     context = data.get('context', {})
     
+    # Stages run on pool threads, outside the request context
+    twin = current_session()
+    
     # Add current state to context
     if not context:
         context = {
-            "stress_level": state_monitor.stress_level,
-            "energy_level": state_monitor.energy_level,
-            "decision_quality": state_monitor.decision_quality,
+            "stress_level": twin.state_monitor.stress_level,
+            "energy_level": twin.state_monitor.energy_level,
+            "decision_quality": twin.state_monitor.decision_quality,
             "decision": decision
         }
     
+    ai_available = twin.jarvis.is_available()
+    deadlines = DECISION_STAGE_DEADLINES
+    stages = get_stage_runner().group()
+    
     # Learn from decision
-    learning_engine.learn_from_interaction("decision", {
+    stages.submit("learn", lambda: twin.learning_engine.learn_from_interaction("decision", {
         "decision": decision,
         "context": context
-    })
+    }), deadlines["learn"])
     
     # Get regret prediction
-    regret = regret_predictor.predict_regret(decision, context)
+    stages.submit("regret", lambda: twin.regret_predictor.predict_regret(decision, context), deadlines["regret"])
     
     # Check intervention
-    intervention = intervention_system.check_decision(decision, context)
+    stages.submit("intervention", lambda: twin.intervention_system.check_decision(decision, context), deadlines["intervention"])
     
     # Get parallel responses
-    responses = universe_viewer.present_decision(decision, context)
+    universe = stages.submit("universe", lambda: twin.universe_viewer.present_decision(decision, context), deadlines["universe"])
     
     # Get contextual insight
-    understanding = context_engine.understand_query(decision)
-    
-    # Get JARVIS analysis
-    jarvis_analysis = None
-    if jarvis.is_available():
-        jarvis_analysis = jarvis.analyze_decision(
+    stages.submit("understanding", lambda: (
+        twin.context_engine.understand_query(decision),
+        twin.context_engine.generate_contextual_response(decision, "Decision analyzed")
+    ), deadlines["understanding"])
+    
+    # Get JARVIS analysis once the parallel responses it reads are ready
+    if ai_available:
+        stages.submit("jarvis", lambda: twin.jarvis.analyze_decision(
             decision,
-            learning_engine.profile,
-            state_monitor.get_current_state(),
-            responses
-        )
+            twin.learning_engine.profile_snapshot(),
+            twin.state_monitor.get_current_state(),
+            universe.result()
+        ), deadlines["jarvis"], slow=True, after=universe)
+    
+    # Late stages keep using the twin after this request returns
+    sessions.pin(twin)
+    stages.when_done(lambda: sessions.release(twin))
+    
+    results, report = stages.collect()
+    understanding, smart_note = results["understanding"] or (None, None)
     
     return jsonify({
         "decision": decision,
-        "regret": regret,
-        "intervention": intervention,
-        "parallel_responses": responses,
+        "regret": results["regret"],
+        "intervention": results["intervention"],
+        "parallel_responses": results["universe"],
         "understanding": understanding,
-        "jarvis_analysis": jarvis_analysis,
-        "smart_note": context_engine.generate_contextual_response(
-            decision, 
-            "Decision analyzed"
-        ),
-        "ai_powered": jarvis.is_available(),
+        "jarvis_analysis": results.get("jarvis"),
+        "smart_note": smart_note,
+        "ai_powered": ai_available,
+        "stages": report,
+        "timestamp": datetime.now().isoformat()
+    })
+
+
+@app.route('/api/decision/regret/batch', methods=['POST'])
+def predict_regret_batch():
+    """Score many pending decisions for regret in one call"""
+    data = request.json
+    items = data.get('decisions', []) if isinstance(data, dict) else None
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        return jsonify({"success": False, "error": "decisions must be a list of objects"}), 400
+
+    try:
+        results = regret_predictor.predict_regret_batch(
+            [str(item.get('decision') or '') for item in items],
+            [item.get('context') or {} for item in items],
+            include_similar=data.get('include_similar', False)
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": f"Invalid regret batch: {e}"}), 400
+
+    return jsonify({
+        "results": results,
+        "count": len(results),
         "timestamp": datetime.now().isoformat()
     })
 
@@ -309,11 +476,26 @@ def add_decision():
 def get_decision_history():
     """Get decision history"""
     limit = request.args.get('limit', 10, type=int)
-    decisions = decision_tracker.get_recent_decisions(limit)
+    tag = request.args.get('tag')
+    since = request.args.get('since')
+    until = request.args.get('until')
+    
+    if tag:
+        decisions = decision_tracker.get_decisions_by_tag(tag, since, until)[-limit:][::-1]
+    elif since or until:
+        decisions = decision_tracker.get_decisions_between(since, until)[-limit:][::-1]
+    else:
+        decisions = decision_tracker.get_recent_decisions(limit)
     
     return jsonify({"decisions": decisions})
 
 
+@app.route('/api/decision/rules', methods=['GET'])
+def get_intervention_rules():
+    """Get per-rule evaluation counts and timing, in evaluation order"""
+    return jsonify({"rules": intervention_system.get_rule_stats()})
+
+
 # ============= PARALLEL UNIVERSE ENDPOINTS =============
 
 @app.route('/api/universe/view', methods=['GET'])
@@ -457,7 +639,7 @@ def get_proactive_suggestions():
     state = state_monitor.get_current_state()
     suggestions = proactive.get_proactive_suggestions(
         state,
-        learning_engine.profile,
+        learning_engine.profile_snapshot(),
         datetime.now().hour
     )
     
@@ -490,9 +672,9 @@ def generate_proactive_insight():
     
     state = state_monitor.get_current_state()
     insight = jarvis.generate_proactive_insight(
-        learning_engine.profile,
+        learning_engine.profile_snapshot(),
         state,
-        learning_engine.interactions[-20:]
+        learning_engine.recent_interactions(20)
     )
     
     return jsonify({
@@ -561,6 +743,24 @@ def get_focus_score():
     return jsonify(activity_tracker.get_focus_score(minutes))
 
 
+@app.route('/api/activity/history', methods=['GET'])
+def get_activity_history():
+    """Get daily and hourly activity totals for the last N days"""
+    days = request.args.get('days', 7, type=int)
+    if days is None or days <= 0:
+        return jsonify({"success": False, "error": "days must be a positive integer"}), 400
+    start = (datetime.now() - timedelta(days=days - 1)).date()
+    return jsonify(activity_tracker.get_activity_history(start))
+
+
+@app.route('/api/activity/switches', methods=['GET'])
+def get_app_switches():
+    """Get the app-to-app switch matrix, recent or over the last N days"""
+    days = request.args.get('days', type=int)
+    limit = request.args.get('limit', 10, type=int)
+    return jsonify(activity_tracker.get_switch_matrix(days, limit))
+
+
 # ============= VOICE INTERFACE ENDPOINTS =============
 
 @app.route('/api/voice/status', methods=['GET'])
@@ -609,7 +809,9 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "version": "2.0"
+        "version": "2.0",
+        "worker": os.getpid(),
+        "sessions": sessions.stats()
     })
 
 
@@ -630,12 +832,15 @@ def index():
             "state": [
                 "GET /api/state/current",
                 "GET /api/state/daily",
-                "POST /api/state/activity"
+                "POST /api/state/activity",
+                "POST /api/state/activity/batch"
             ],
             "decision": [
                 "POST /api/decision/check",
+                "POST /api/decision/regret/batch",
                 "POST /api/decision/add",
-                "GET /api/decision/history"
+                "GET /api/decision/history",
+                "GET /api/decision/rules"
             ],
             "universe": [
                 "GET /api/universe/view",
@@ -654,10 +859,38 @@ def index():
                 "GET /api/intelligence/conversation",
                 "POST /api/intelligence/generate_insight"
             ],
+            "jarvis": [
+                "GET /api/jarvis/proactive",
+                "GET /api/jarvis/commentary",
+                "POST /api/jarvis/proactive_insight",
+                "GET /api/jarvis/status"
+            ],
+            "activity": [
+                "POST /api/activity/start",
+                "POST /api/activity/stop",
+                "GET /api/activity/status",
+                "GET /api/activity/level",
+                "GET /api/activity/focus",
+                "GET /api/activity/history",
+                "GET /api/activity/switches"
+            ],
+            "voice": [
+                "GET /api/voice/status",
+                "POST /api/voice/speak",
+                "POST /api/voice/listen"
+            ],
             "daemon": [
                 "GET /api/daemon/status"
+            ],
+            "health": [
+                "GET /api/health"
             ]
         },
+        "multi_user": {
+            "headers": ["X-Twin-User", "X-Twin-User-Secret"],
+            "enabled": bool(USER_HEADER_SECRET),
+            "note": "Set by an authenticating proxy; without them every request uses the default twin"
+        },
         "features": [
             "🧠 Learning Engine - Learns from every interaction",
             "🎯 Context Awareness - Understands emotional context",
@@ -672,5 +905,6 @@ def index():
 if __name__ == '__main__':
     print("🚀 Starting Cognitive Twin API...")
     print("📡 API running on http://localhost:5001")
-    print("📱 Mobile/Web interfaces can connect now\n")
+    print("📱 Mobile/Web interfaces can connect now")
+    print("🏭 Development server - use `python api/serve.py` in production\n")
     app.run(debug=True, host='0.0.0.0', port=5001)
@@ -0,0 +1,193 @@
+"""
+🗓️ ACTIVITY HISTORY - Columnar per-day archive of raw activity events
+One directory per day with a file per column and precomputed minute rollups
+"""
+
+import os
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from core.shared_ring import APP_SWITCH, CLICK, KEY, NO_APP
+
+
+# Raw little-endian column files, appended in place and read with np.memmap
+COLUMNS = {
+    "time": np.dtype("<f8"),   # wall-clock seconds
+    "type": np.dtype("u1"),    # KEY / CLICK / APP_SWITCH
+    "app": np.dtype("<u4")     # AppDictionary id, NO_APP for input events
+}
+
+# Per-minute counts, one row per minute of the day
+ROLLUP_FIELDS = ("keystrokes", "clicks", "app_switches")
+ROLLUP_COLUMN = {KEY: 0, CLICK: 1, APP_SWITCH: 2}
+MINUTES_PER_DAY = 24 * 60
+
+
+class ActivityHistory:
+    """Day-partitioned columnar event store.
+
+    Events are buffered in memory and appended on flush. Each day directory
+    holds ``time.f8``, ``type.u1`` and ``app.u4`` columns plus
+    ``minutes.i4``, a 1440 x 3 table of per-minute counts kept up to date
+    as events are appended. Range queries map only the days and columns
+    they ask for, and most aggregate queries never touch raw events.
+    """
+
+    def __init__(self, history_dir: str):
+        self.history_dir = history_dir
+        self._pending: Dict[str, List[Tuple[float, int, int]]] = {}
+        self._lock = threading.Lock()
+
+    # ----- Writing -----
+
+    def record(self, event_type: int, times: Iterable[float], app_id: int = NO_APP):
+        """Buffer events of one type at the given wall-clock times"""
+        with self._lock:
+            day_end = None
+            for event_time in times:
+                if day_end is None or event_time >= day_end:
+                    midnight = datetime.fromtimestamp(event_time).replace(
+                        hour=0, minute=0, second=0, microsecond=0
+                    )
+                    day_end = (midnight + timedelta(days=1)).timestamp()
+                    events = self._pending.setdefault(midnight.date().isoformat(), [])
+                events.append((event_time, event_type, app_id))
+
+    def flush(self):
+        """Append buffered events to their day files and update the rollups"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        for day, events in pending.items():
+            day_dir = self._day_dir(day)
+            os.makedirs(day_dir, exist_ok=True)
+
+            events.sort()
+            batch = np.array(events, dtype=[(name, dtype) for name, dtype in COLUMNS.items()])
+            self._append_sorted(day, batch)
+            self._add_to_rollup(day, batch)
+
+    def _append_sorted(self, day: str, batch: np.ndarray):
+        """Append a sorted batch, merging it into the stored tail if it starts earlier.
+
+        Input events are consolidated a moment after app switches are
+        recorded, so a flush can hold events older than the previous one's
+        last. Only the stored events newer than the batch's first are
+        rewritten, keeping each day's time column sorted for searchsorted.
+        """
+        stored = self._map_column(day, "time")
+        length = min(len(self._map_column(day, name)) for name in COLUMNS)
+        pos = length
+        if length and stored[length - 1] > batch["time"][0]:
+            pos = int(np.searchsorted(stored[:length], batch["time"][0], side="right"))
+        del stored
+
+        if pos < length:
+            tail = np.empty(length - pos, dtype=batch.dtype)
+            for name in COLUMNS:
+                tail[name] = self._map_column(day, name)[pos:length]
+            merged = np.concatenate([tail, batch])
+            batch = merged[np.argsort(merged["time"], kind="stable")]
+
+        for name, dtype in COLUMNS.items():
+            with open(self._column_path(day, name), "r+b" if length else "ab") as f:
+                # Also drops any partial trailing record left by a crash
+                f.truncate(pos * dtype.itemsize)
+                f.seek(pos * dtype.itemsize)
+                batch[name].astype(dtype, copy=False).tofile(f)
+
+    def _add_to_rollup(self, day: str, batch: np.ndarray):
+        path = self._rollup_path(day)
+        if os.path.exists(path):
+            rollup = np.fromfile(path, dtype="<i4").reshape(MINUTES_PER_DAY, len(ROLLUP_FIELDS))
+        else:
+            rollup = np.zeros((MINUTES_PER_DAY, len(ROLLUP_FIELDS)), dtype="<i4")
+
+        midnight = datetime.fromisoformat(day).timestamp()
+        minutes = ((batch["time"] - midnight) // 60).astype(np.int64).clip(0, MINUTES_PER_DAY - 1)
+        for event_type, column in ROLLUP_COLUMN.items():
+            mask = batch["type"] == event_type
+            rollup[:, column] += np.bincount(minutes[mask], minlength=MINUTES_PER_DAY).astype("<i4")
+
+        tmp_path = path + ".tmp"
+        rollup.tofile(tmp_path)
+        os.replace(tmp_path, path)
+
+    # ----- Reading -----
+
+    def days(self, start: Optional[date] = None, end: Optional[date] = None) -> List[str]:
+        """Stored days with start <= day < end, oldest first"""
+        if not os.path.isdir(self.history_dir):
+            return []
+        days = sorted(
+            name for name in os.listdir(self.history_dir)
+            if os.path.isdir(os.path.join(self.history_dir, name))
+        )
+        lo = start.isoformat() if start else ""
+        hi = end.isoformat() if end else "9999"
+        return [day for day in days if lo <= day < hi]
+
+    def minute_rollups(self, start: Optional[date] = None, end: Optional[date] = None) -> Dict[str, np.ndarray]:
+        """Per-minute (keystrokes, clicks, app_switches) tables by day"""
+        rollups = {}
+        for day in self.days(start, end):
+            path = self._rollup_path(day)
+            if os.path.exists(path):
+                rollups[day] = np.fromfile(path, dtype="<i4").reshape(
+                    MINUTES_PER_DAY, len(ROLLUP_FIELDS)
+                )
+        return rollups
+
+    def hourly_totals(self, start: Optional[date] = None, end: Optional[date] = None) -> np.ndarray:
+        """24 x 3 counts by hour of day, summed over the range"""
+        totals = np.zeros((24, len(ROLLUP_FIELDS)), dtype=np.int64)
+        for rollup in self.minute_rollups(start, end).values():
+            totals += rollup.reshape(24, 60, len(ROLLUP_FIELDS)).sum(axis=1)
+        return totals
+
+    def daily_totals(self, start: Optional[date] = None, end: Optional[date] = None) -> Dict[str, Dict[str, int]]:
+        """Counts per day over the range"""
+        return {
+            day: dict(zip(ROLLUP_FIELDS, rollup.sum(axis=0).tolist()))
+            for day, rollup in self.minute_rollups(start, end).items()
+        }
+
+    def events(self, start: datetime, end: datetime, columns=("time", "type")) -> Dict[str, np.ndarray]:
+        """Raw event columns with start <= time < end, mapping only what is asked for"""
+        columns = tuple(dict.fromkeys(("time",) + tuple(columns)))
+        parts = {name: [] for name in columns}
+
+        for day in self.days(start.date(), end.date() + timedelta(days=1)):
+            mapped = {name: self._map_column(day, name) for name in columns}
+            length = min(len(values) for values in mapped.values())
+            times = mapped["time"][:length]
+            lo = np.searchsorted(times, start.timestamp(), side="left")
+            hi = np.searchsorted(times, end.timestamp(), side="left")
+            for name in columns:
+                parts[name].append(mapped[name][lo:hi])
+
+        return {
+            name: np.concatenate(values) if values else np.empty(0, dtype=COLUMNS[name])
+            for name, values in parts.items()
+        }
+
+    def _map_column(self, day: str, name: str) -> np.ndarray:
+        path = self._column_path(day, name)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return np.empty(0, dtype=COLUMNS[name])
+        return np.memmap(path, dtype=COLUMNS[name], mode="r")
+
+    # ----- Paths -----
+
+    def _day_dir(self, day: str) -> str:
+        return os.path.join(self.history_dir, day)
+
+    def _column_path(self, day: str, name: str) -> str:
+        dtype = COLUMNS[name]
+        return os.path.join(self._day_dir(day), f"{name}.{dtype.kind}{dtype.itemsize}")
+
+    def _rollup_path(self, day: str) -> str:
+        return os.path.join(self._day_dir(day), "minutes.i4")
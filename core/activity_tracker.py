@@ -3,14 +3,22 @@
 Tracks actual computer usage - no more simulation!
 """
 
-import psutil
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 from collections import deque
 import threading
-import json
 import os
 
+import numpy as np
+
+from core.activity_history import ROLLUP_FIELDS, ActivityHistory
+from core.app_dictionary import AppDictionary
+from core.event_buffer import SecondCounter, TimestampRing
+from core.shared_ring import APP_SWITCH, CLICK, KEY, MOVE, SharedEventRing
+from core.snapshot_log import SnapshotLog
+from core.window_watcher import ProcessNameCache, create_focus_watcher
+from core.storage import get_storage
+
 try:
     from pynput import keyboard, mouse
     PYNPUT_AVAILABLE = True
@@ -19,26 +27,73 @@ except ImportError:
     print("⚠️ pynput not installed. Run: pip install pynput")
 
 
+# Shared event ring written by the standalone collector (daemon/activity_collector.py)
+ACTIVITY_RING_FILE = "activity_ring.bin"
+
+
 class ActivityTracker:
-    """Track real desktop activity"""
+    """Track real desktop activity
     
-    def __init__(self, data_dir="data"):
+    With ``publish_ring`` the tracker is the collector: it also publishes
+    every event to the shared ring. With ``follow_ring`` it listens to no
+    input itself and replays the collector's events instead, without
+    persisting stats (the collector owns the activity log).
+    
+    Given ``ring_path``, a non-collector tracker re-checks the collector
+    every RING_CHECK_INTERVAL seconds: it follows a collector that starts
+    later and falls back to local input when the collector stops.
+    """
+    
+    RING_CHECK_INTERVAL = 10.0
+    
+    def __init__(self, data_dir="data", storage=None, publish_ring=None, follow_ring=None, ring_path=None):
         self.data_dir = data_dir
+        self.storage = storage if storage is not None else get_storage(data_dir)
         self.activity_file = f"{data_dir}/activity_log.json"
         
-        # Activity buffers
-        self.keyboard_events = deque(maxlen=1000)
-        self.mouse_events = deque(maxlen=1000)
-        self.app_switches = deque(maxlen=100)
+        # Activity buffers: monotonic event times, plus per-second counts
+        # that answer the usual 5-10 minute windows in constant time
+        self.keyboard_events = TimestampRing(10000)
+        self.mouse_events = TimestampRing(10000)
+        self.keyboard_counts = SecondCounter()
+        self.mouse_counts = SecondCounter()
+        self.app_switches = deque(maxlen=100)  # (from_id, to_id, wall time)
+        self.app_switch_times = TimestampRing(100)
+        
+        # App names are interned to small ids; events and counters use the ids
+        self.apps = AppDictionary(os.path.join(data_dir, "activity_apps.json"), self.storage)
         
         # Current state
-        self.current_app = None
-        self.last_activity = datetime.now()
+        self._current_app_id = None
+        self._last_move = time.monotonic()
         self.idle_threshold = 300  # 5 minutes
         
         # Tracking state
         self.is_tracking = False
-        self.tracking_thread = None
+        self.focus_watcher = None
+        self.process_names = ProcessNameCache()
+        
+        # Input callbacks only write timestamps; this thread folds them into
+        # the counters and stats. Cursors mark how far each ring is folded.
+        self.consolidate_interval = 0.5
+        self.consolidation_thread = None
+        self._stats_lock = threading.RLock()
+        self._cursors = {"keystrokes": 0, "clicks": 0}
+        
+        # Cross-process event sharing
+        self.publish_ring = publish_ring
+        self.follow_ring = follow_ring
+        self.ring_path = ring_path
+        self._ring_cursor = 0
+        self._next_ring_check = time.monotonic() + self.RING_CHECK_INTERVAL
+        self._published_move = 0.0
+        
+        # Dirty stats are flushed every 30s or 500 events as small deltas,
+        # with a full atomic snapshot every 20 deltas and on stop
+        self.stats_log = SnapshotLog(self.activity_file, flush_interval=30, flush_every=500)
+        
+        # Raw events for historical queries, appended on the same schedule
+        self.history = ActivityHistory(os.path.join(data_dir, "activity_history"))
         
         # Statistics
         self.stats = {
@@ -47,37 +102,88 @@ class ActivityTracker:
             "total_app_switches": 0,
             "active_time": 0,
             "idle_time": 0,
-            "apps_used": {},
+            "apps_used": {},  # str(app id) -> focus count
             "hourly_activity": {}
         }
         
         self._load_stats()
+        self._migrate_app_names()
     
     def _load_stats(self):
         """Load saved statistics"""
-        if os.path.exists(self.activity_file):
-            try:
-                with open(self.activity_file, 'r') as f:
-                    self.stats = json.load(f)
-            except:
-                pass
+        if self.storage:
+            self.stats = self.storage.load_document("activity_log", self.stats)
+            return
+        
+        self.stats = self.stats_log.load(self.stats)
+    
+    def _migrate_app_names(self):
+        """Re-key stats from before the app dictionary by app id"""
+        if self.follow_ring is not None or self.apps.exists() or not self.stats["apps_used"]:
+            return
+        
+        self.stats["apps_used"] = {
+            str(self.apps.intern(name)): count
+            for name, count in self.stats["apps_used"].items()
+        }
+        self._save_stats()
     
     def _save_stats(self):
-        """Save statistics"""
-        os.makedirs(self.data_dir, exist_ok=True)
-        with open(self.activity_file, 'w') as f:
-            json.dump(self.stats, f, indent=2)
+        """Save a full snapshot of the statistics"""
+        self.history.flush()
+        if self.storage:
+            self.storage.save_document("activity_log", self.stats)
+            return
+        
+        self.stats_log.snapshot(self.stats)
+    
+    def _flush_stats(self):
+        """Persist statistics changed since the last flush"""
+        self.history.flush()
+        if self.storage:
+            # One small transactional write; no delta log needed
+            self.storage.save_document("activity_log", self.stats)
+            self.stats_log.mark_flushed()
+            return
+        
+        self.stats_log.flush(self.stats)
     
     def start_tracking(self):
         """Start tracking activity"""
+        if self.is_tracking:
+            return True
+        
+        if self.follow_ring is not None:
+            self.is_tracking = True
+            
+            # Recent events fill the activity windows but are already in the stats
+            with self._stats_lock:
+                self._pull_shared(count_stats=False)
+                self._consolidate(count_stats=False)
+            
+            self.consolidation_thread = threading.Thread(target=self._consolidate_loop, daemon=True)
+            self.consolidation_thread.start()
+            print("✅ Following activity from the collector")
+            return True
+        
         if not PYNPUT_AVAILABLE:
             print("❌ Cannot start tracking: pynput not installed")
             return False
         
-        if self.is_tracking:
-            return True
-        
         self.is_tracking = True
+        self._start_inputs()
+        
+        # Start consolidation thread
+        self.consolidation_thread = threading.Thread(target=self._consolidate_loop, daemon=True)
+        self.consolidation_thread.start()
+        
+        print("✅ Activity tracking started")
+        return True
+    
+    def _start_inputs(self):
+        """Listen to keyboard, mouse and focus changes in this process"""
+        if not PYNPUT_AVAILABLE:
+            return False
         
         # Start keyboard listener
         self.keyboard_listener = keyboard.Listener(
@@ -92,24 +198,98 @@ class ActivityTracker:
         )
         self.mouse_listener.start()
         
-        # Start app monitoring thread
-        self.tracking_thread = threading.Thread(target=self._monitor_apps, daemon=True)
-        self.tracking_thread.start()
-        
-        print("✅ Activity tracking started")
+        # Start app focus watcher (X11 events, or polling elsewhere)
+        self.focus_watcher = create_focus_watcher(
+            self._on_app_focus, self._get_active_app, self.process_names
+        )
         return True
     
-    def stop_tracking(self):
-        """Stop tracking activity"""
-        self.is_tracking = False
-        
+    def _stop_inputs(self):
         if hasattr(self, 'keyboard_listener'):
             self.keyboard_listener.stop()
+            del self.keyboard_listener
         
         if hasattr(self, 'mouse_listener'):
             self.mouse_listener.stop()
+            del self.mouse_listener
+        
+        if self.focus_watcher:
+            self.focus_watcher.stop()
+            self.focus_watcher = None
+    
+    def refresh_source(self, force=False):
+        """Follow the collector's ring while it is live, otherwise track locally"""
+        if self.publish_ring is not None or self.ring_path is None:
+            return
+        now = time.monotonic()
+        if not force and now < self._next_ring_check:
+            return
+        self._next_ring_check = now + self.RING_CHECK_INTERVAL
         
+        live = SharedEventRing.is_live(self.ring_path)
+        with self._stats_lock:
+            if self.follow_ring is None:
+                if live:
+                    self._switch_to_ring()
+            elif not live:
+                self._switch_to_local()
+            elif not self.follow_ring.is_current():
+                self._reopen_ring()
+    
+    def _switch_to_ring(self):
+        """Hand input collection to a collector that started after us"""
+        try:
+            ring = SharedEventRing.open(self.ring_path)
+        except (OSError, ValueError):
+            return
+        
+        if self.is_tracking:
+            self._stop_inputs()
+            self._consolidate()
         self._save_stats()
+        
+        self.follow_ring = ring
+        self._ring_cursor = ring.sequence
+        print("📡 Activity collector found, following its events")
+    
+    def _reopen_ring(self):
+        """Follow the new ring of a restarted collector"""
+        try:
+            ring = SharedEventRing.open(self.ring_path)
+        except (OSError, ValueError):
+            return
+        self._pull_shared()
+        self.follow_ring.close()
+        self.follow_ring = ring
+        self._ring_cursor = ring.sequence
+    
+    def _switch_to_local(self):
+        """Take input collection back after the collector stopped or restarted"""
+        ring, self.follow_ring = self.follow_ring, None
+        ring.close()
+        
+        # The collector owned the stats and app names; continue from what it saved
+        self.apps = AppDictionary(os.path.join(self.data_dir, "activity_apps.json"), self.storage)
+        self._load_stats()
+        
+        if not self.is_tracking:
+            return
+        if not self._start_inputs():
+            print("⚠️ Activity collector stopped and pynput is not installed; activity is not tracked")
+            return
+        print("⚠️ Activity collector stopped, tracking input locally")
+    
+    def stop_tracking(self):
+        """Stop tracking activity"""
+        self.is_tracking = False
+        self._stop_inputs()
+        
+        with self._stats_lock:
+            if self.follow_ring is not None:
+                self._pull_shared()
+            self._consolidate()
+            if self.follow_ring is None:
+                self._save_stats()
         print("⏹️ Activity tracking stopped")
     
     def _on_key_press(self, key):
@@ -117,86 +297,151 @@ class ActivityTracker:
         if not self.is_tracking:
             return
         
-        now = datetime.now()
-        self.keyboard_events.append({
-            "type": "keypress",
-            "timestamp": now.isoformat(),
-            "hour": now.hour
-        })
-        
-        self.stats["total_keystrokes"] += 1
-        self.last_activity = now
-        
-        # Update hourly stats
-        hour_key = str(now.hour)
-        if hour_key not in self.stats["hourly_activity"]:
-            self.stats["hourly_activity"][hour_key] = {
-                "keystrokes": 0,
-                "clicks": 0,
-                "active_minutes": 0
-            }
-        self.stats["hourly_activity"][hour_key]["keystrokes"] += 1
+        self.keyboard_events.append(time.monotonic())
     
     def _on_mouse_click(self, x, y, button, pressed):
         """Handle mouse click"""
         if not self.is_tracking or not pressed:
             return
         
-        now = datetime.now()
-        self.mouse_events.append({
-            "type": "click",
-            "timestamp": now.isoformat(),
-            "hour": now.hour
-        })
-        
-        self.stats["total_mouse_clicks"] += 1
-        self.last_activity = now
-        
-        # Update hourly stats
-        hour_key = str(now.hour)
-        if hour_key not in self.stats["hourly_activity"]:
-            self.stats["hourly_activity"][hour_key] = {
-                "keystrokes": 0,
-                "clicks": 0,
-                "active_minutes": 0
-            }
-        self.stats["hourly_activity"][hour_key]["clicks"] += 1
+        self.mouse_events.append(time.monotonic())
     
     def _on_mouse_move(self, x, y):
         """Handle mouse movement"""
         if not self.is_tracking:
             return
         
-        self.last_activity = datetime.now()
+        self._last_move = time.monotonic()
     
-    def _monitor_apps(self):
-        """Monitor active applications"""
+    def _consolidate_loop(self):
+        """Periodically fold buffered input events into stats"""
         while self.is_tracking:
-            try:
-                # Get active window (platform-specific)
-                active_app = self._get_active_app()
-                
-                if active_app and active_app != self.current_app:
-                    now = datetime.now()
-                    self.app_switches.append({
-                        "from": self.current_app,
-                        "to": active_app,
-                        "timestamp": now.isoformat()
-                    })
-                    
-                    self.current_app = active_app
-                    self.stats["total_app_switches"] += 1
-                    
-                    # Track app usage
-                    if active_app not in self.stats["apps_used"]:
-                        self.stats["apps_used"][active_app] = 0
-                    self.stats["apps_used"][active_app] += 1
+            time.sleep(self.consolidate_interval)
+            self.refresh_source()
+            with self._stats_lock:
+                if self.follow_ring is not None:
+                    self._pull_shared()
+                self._consolidate()
+                if self.publish_ring is not None:
+                    self.publish_ring.heartbeat()
+                if self.follow_ring is None and self.stats_log.due():
+                    self._flush_stats()
+    
+    def _consolidate(self, count_stats=True):
+        """Fold events written since the last pass into counters and stats"""
+        with self._stats_lock:
+            wall_offset = time.time() - time.monotonic()
+            streams = (
+                (self.keyboard_events, self.keyboard_counts, "total_keystrokes", "keystrokes", KEY),
+                (self.mouse_events, self.mouse_counts, "total_mouse_clicks", "clicks", CLICK)
+            )
+            if self.publish_ring is not None and self._last_move > self._published_move:
+                self._published_move = self._last_move
+                self.publish_ring.append(MOVE, self._last_move + wall_offset)
+            
+            for ring, counts, total_key, field, event_type in streams:
+                times, cursor = ring.read_since(self._cursors[field])
+                new_events = cursor - self._cursors[field]
+                self._cursors[field] = cursor
+                if not times:
+                    continue
                 
-                time.sleep(2)  # Check every 2 seconds
+                # Events the ring overwrote before this pass count at the oldest survivor
+                weights = [1] * len(times)
+                weights[0] += new_events - len(times)
                 
-            except Exception as e:
-                print(f"Error monitoring apps: {e}")
-                time.sleep(5)
+                for event_time, weight in zip(times, weights):
+                    counts.add(event_time, weight)
+                wall_times = [t + wall_offset for t in times]
+                if self.publish_ring is not None:
+                    self.publish_ring.append_many(event_type, wall_times)
+                if count_stats:
+                    self.stats[total_key] += new_events
+                    self.stats_log.note_events(new_events)
+                    self._add_hourly(field, times, weights, wall_offset)
+                    if self.follow_ring is None:
+                        self.history.record(event_type, wall_times)
+    
+    def _pull_shared(self, count_stats=True):
+        """Copy new collector events from the shared ring into the local buffers"""
+        views, self._ring_cursor = self.follow_ring.read_since(self._ring_cursor)
+        mono_offset = time.monotonic() - time.time()
+        
+        for events in views:
+            kinds, times = events["type"], events["time"] + mono_offset
+            for event_time in times[kinds == KEY].tolist():
+                self.keyboard_events.append(event_time)
+            for event_time in times[kinds == CLICK].tolist():
+                self.mouse_events.append(event_time)
+            
+            moves = times[kinds == MOVE]
+            if len(moves):
+                self._last_move = max(self._last_move, float(moves.max()))
+            
+            switches = kinds == APP_SWITCH
+            for event_time, app in zip(times[switches].tolist(), events["app"][switches].tolist()):
+                self._record_switch(app, event_time, count_stats)
+    
+    def _add_hourly(self, field, times, weights, wall_offset):
+        """Add sorted monotonic event times to the hourly stats"""
+        hourly = self.stats["hourly_activity"]
+        hour_end = None
+        for event_time, weight in zip(times, weights):
+            wall = event_time + wall_offset
+            if hour_end is None or wall >= hour_end:
+                hour_start = datetime.fromtimestamp(wall).replace(minute=0, second=0, microsecond=0)
+                hour_end = hour_start.timestamp() + 3600
+                bucket = hourly.setdefault(str(hour_start.hour), {
+                    "keystrokes": 0,
+                    "clicks": 0,
+                    "active_minutes": 0
+                })
+            bucket[field] += weight
+    
+    def _on_app_focus(self, active_app):
+        """Record a switch to a newly focused application"""
+        app_id = self.apps.intern(active_app)
+        if self.publish_ring is not None:
+            self.publish_ring.register_app(app_id, active_app)
+        self._record_switch(app_id)
+    
+    def _record_switch(self, app_id, event_time=None, count_stats=True):
+        """Record a focus change to an app id"""
+        if not self.is_tracking or app_id == self._current_app_id:
+            return
+        
+        if event_time is None:
+            event_time = time.monotonic()
+        wall_time = event_time + time.time() - time.monotonic()
+        self.app_switches.append((self._current_app_id, app_id, wall_time))
+        self.app_switch_times.append(event_time)
+        if self.publish_ring is not None:
+            self.publish_ring.append(APP_SWITCH, wall_time, app_id)
+        
+        self._current_app_id = app_id
+        if not count_stats:
+            return
+        if self.follow_ring is None:
+            self.history.record(APP_SWITCH, [wall_time], app_id)
+        with self._stats_lock:
+            self.stats["total_app_switches"] += 1
+            
+            # Track app usage
+            key = str(app_id)
+            self.stats["apps_used"][key] = self.stats["apps_used"].get(key, 0) + 1
+            self.stats_log.note_events()
+    
+    @property
+    def current_app(self):
+        """Name of the focused application"""
+        return self._app_name(self._current_app_id)
+    
+    def _app_name(self, app_id):
+        """Name for an app id; followers fall back to the collector's table"""
+        name = self.apps.name(app_id)
+        if name is None and app_id is not None and self.follow_ring is not None:
+            name = self.follow_ring.app_name(app_id)
+        return name
     
     def _get_active_app(self):
         """Get currently active application"""
@@ -210,8 +455,7 @@ class ActivityTracker:
                     import win32process
                     window = win32gui.GetForegroundWindow()
                     _, pid = win32process.GetWindowThreadProcessId(window)
-                    process = psutil.Process(pid)
-                    return process.name()
+                    return self.process_names.lookup(pid)
                 except:
                     pass
             
@@ -228,8 +472,7 @@ class ActivityTracker:
                     import subprocess
                     window_id = subprocess.check_output(['xdotool', 'getactivewindow']).decode().strip()
                     pid = subprocess.check_output(['xdotool', 'getwindowpid', window_id]).decode().strip()
-                    process = psutil.Process(int(pid))
-                    return process.name()
+                    return self.process_names.lookup(int(pid))
                 except:
                     pass
             
@@ -238,20 +481,28 @@ class ActivityTracker:
         
         return None
     
+    @property
+    def last_activity(self):
+        """Time of the latest keystroke, click or mouse movement"""
+        return datetime.now() - timedelta(seconds=time.monotonic() - self._last_input())
+    
+    def _last_input(self):
+        """Monotonic time of the latest input event"""
+        return max(
+            self._last_move,
+            self.keyboard_events.latest() or 0.0,
+            self.mouse_events.latest() or 0.0
+        )
+    
     def is_idle(self):
         """Check if user is idle"""
-        idle_time = (datetime.now() - self.last_activity).total_seconds()
+        idle_time = time.monotonic() - self._last_input()
         return idle_time > self.idle_threshold
     
     def get_activity_level(self, minutes=5):
         """Get activity level for last N minutes"""
-        now = datetime.now()
-        cutoff = now.timestamp() - (minutes * 60)
-        
-        recent_keys = sum(1 for e in self.keyboard_events 
-                         if datetime.fromisoformat(e["timestamp"]).timestamp() > cutoff)
-        recent_clicks = sum(1 for e in self.mouse_events 
-                           if datetime.fromisoformat(e["timestamp"]).timestamp() > cutoff)
+        recent_keys = self._count_recent(self.keyboard_events, self.keyboard_counts, minutes)
+        recent_clicks = self._count_recent(self.mouse_events, self.mouse_counts, minutes)
         
         total_events = recent_keys + recent_clicks
         
@@ -270,11 +521,8 @@ class ActivityTracker:
     
     def get_focus_score(self, minutes=10):
         """Calculate focus score based on app switches"""
-        now = datetime.now()
-        cutoff = now.timestamp() - (minutes * 60)
-        
-        recent_switches = sum(1 for s in self.app_switches 
-                             if datetime.fromisoformat(s["timestamp"]).timestamp() > cutoff)
+        cutoff = time.monotonic() - (minutes * 60)
+        recent_switches = self.app_switch_times.count_since(cutoff)
         
         # Fewer switches = better focus
         # 0 switches = 100, 10+ switches = 0
@@ -287,10 +535,31 @@ class ActivityTracker:
             "state": "focused" if focus_score > 70 else "distracted" if focus_score < 40 else "working"
         }
     
-    def get_hourly_patterns(self):
-        """Get activity patterns by hour"""
+    def _count_recent(self, events: TimestampRing, counts: SecondCounter, minutes):
+        """Events in the last N minutes: per-second counters, or the ring past their horizon"""
+        self._consolidate()
+        now = time.monotonic()
+        seconds = minutes * 60
+        if seconds < counts.horizon:
+            return counts.count_since(seconds, now)
+        return events.count_since(now - seconds)
+    
+    def get_hourly_patterns(self, days=None):
+        """Get activity patterns by hour, all time or over the last N days"""
         patterns = {}
         
+        if days:
+            start = (datetime.now() - timedelta(days=days - 1)).date()
+            totals = self.history.hourly_totals(start)
+            for hour, (keystrokes, clicks, _) in enumerate(totals.tolist()):
+                if keystrokes or clicks:
+                    patterns[hour] = {
+                        "activity_level": min(100, (keystrokes + clicks) / 10 / days),
+                        "keystrokes": keystrokes,
+                        "clicks": clicks
+                    }
+            return patterns
+        
         for hour, data in self.stats["hourly_activity"].items():
             total_activity = data["keystrokes"] + data["clicks"]
             patterns[int(hour)] = {
@@ -301,14 +570,58 @@ class ActivityTracker:
         
         return patterns
     
+    def get_activity_history(self, start=None, end=None):
+        """Daily totals and hour-of-day profile for start <= day < end (dates)"""
+        hourly = self.history.hourly_totals(start, end)
+        return {
+            "daily": self.history.daily_totals(start, end),
+            "hourly": {
+                hour: dict(zip(ROLLUP_FIELDS, row))
+                for hour, row in enumerate(hourly.tolist())
+                if any(row)
+            }
+        }
+    
     def get_top_apps(self, limit=5):
         """Get most used applications"""
-        sorted_apps = sorted(
-            self.stats["apps_used"].items(),
-            key=lambda x: x[1],
-            reverse=True
-        )
-        return sorted_apps[:limit]
+        usage = self.stats["apps_used"]
+        if not usage:
+            return []
+        
+        app_ids = np.fromiter(map(int, usage.keys()), dtype=np.int64, count=len(usage))
+        counts = np.fromiter(usage.values(), dtype=np.int64, count=len(usage))
+        top = np.argsort(-counts, kind="stable")[:limit]
+        return [(self._app_name(int(app_ids[i])), int(counts[i])) for i in top]
+    
+    def get_switch_matrix(self, days=None, limit=10):
+        """Counts of switches between the most involved apps
+        
+        Uses the recent in-memory switches, or the history of the last N days.
+        """
+        if days:
+            now = datetime.now()
+            events = self.history.events(now - timedelta(days=days), now, columns=("type", "app"))
+            targets = events["app"][events["type"] == APP_SWITCH].astype(np.int64)
+            sources, targets = targets[:-1], targets[1:]
+        else:
+            pairs = [(src, dst) for src, dst, _ in self.app_switches if src is not None]
+            pairs = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+            sources, targets = pairs[:, 0], pairs[:, 1]
+        
+        if len(sources) == 0:
+            return {"apps": [], "matrix": []}
+        
+        size = int(max(sources.max(), targets.max())) + 1
+        matrix = np.zeros((size, size), dtype=np.int64)
+        np.add.at(matrix, (sources, targets), 1)
+        
+        involvement = matrix.sum(axis=0) + matrix.sum(axis=1)
+        top = np.argsort(-involvement, kind="stable")[:limit]
+        top = top[involvement[top] > 0]
+        return {
+            "apps": [self._app_name(int(app_id)) for app_id in top],
+            "matrix": matrix[np.ix_(top, top)].tolist()
+        }
     
     def get_stats_summary(self):
         """Get summary of all statistics"""
@@ -327,10 +640,27 @@ class ActivityTracker:
 
 # Global instance
 _tracker = None
+_tracker_lock = threading.Lock()
 
-def get_tracker():
-    """Get global tracker instance"""
+def get_tracker(data_dir="data"):
+    """Get global tracker instance
+    
+    When the standalone collector is running, the tracker follows its shared
+    event ring instead of listening to input in this process. The choice is
+    re-checked periodically, so a collector that starts or stops later is
+    picked up.
+    """
     global _tracker
-    if _tracker is None:
-        _tracker = ActivityTracker()
+    with _tracker_lock:
+        if _tracker is None:
+            ring_path = os.path.join(data_dir, ACTIVITY_RING_FILE)
+            follow_ring = None
+            if SharedEventRing.is_live(ring_path):
+                try:
+                    follow_ring = SharedEventRing.open(ring_path)
+                except (OSError, ValueError):
+                    pass
+            _tracker = ActivityTracker(data_dir, follow_ring=follow_ring, ring_path=ring_path)
+            return _tracker
+    _tracker.refresh_source()
     return _tracker
@@ -0,0 +1,83 @@
+"""
+🔤 APP DICTIONARY - Interned application names
+Stable small-integer ids for process names, persisted with the activity stats
+"""
+
+import json
+import os
+import threading
+from typing import List, Optional
+
+
+class AppDictionary:
+    """Append-only name <-> id table.
+
+    Ids are list positions, so they never change once assigned and can be
+    used as array indexes. The table is rewritten (atomically, or as one
+    storage document) only when a new app appears, which is rare.
+    """
+
+    def __init__(self, path: str, storage=None):
+        self.path = path
+        self.storage = storage
+        self._lock = threading.Lock()
+        self.names: List[str] = self._load()
+        self._ids = {name: app_id for app_id, name in enumerate(self.names)}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name: str):
+        return name in self._ids
+
+    def intern(self, name: str) -> int:
+        """Id for a name, assigning the next one if it is new"""
+        app_id = self._ids.get(name)
+        if app_id is not None:
+            return app_id
+
+        with self._lock:
+            app_id = self._ids.get(name)
+            if app_id is None:
+                app_id = len(self.names)
+                self.names.append(name)
+                self._ids[name] = app_id
+                self._save()
+        return app_id
+
+    def lookup(self, name: str) -> Optional[int]:
+        """Id for a known name, without assigning one"""
+        return self._ids.get(name)
+
+    def name(self, app_id: Optional[int]) -> Optional[str]:
+        if app_id is None or not 0 <= app_id < len(self.names):
+            return None
+        return self.names[app_id]
+
+    def exists(self) -> bool:
+        """True once the table has been persisted"""
+        if self.storage:
+            return self.storage.load_document(self._document_name()) is not None
+        return os.path.exists(self.path)
+
+    def _document_name(self) -> str:
+        return os.path.splitext(os.path.basename(self.path))[0]
+
+    def _load(self) -> List[str]:
+        if self.storage:
+            return self.storage.load_document(self._document_name(), [])
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        return []
+
+    def _save(self):
+        if self.storage:
+            self.storage.save_document(self._document_name(), self.names)
+            return
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.names, f)
+        os.replace(tmp_path, self.path)
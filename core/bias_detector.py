@@ -3,10 +3,22 @@
 Detects patterns that might indicate cognitive biases
 """
 
-from typing import List, Dict
+from functools import lru_cache
+from typing import List, Dict, FrozenSet, Tuple
 from collections import Counter
 
 
+@lru_cache(maxsize=10000)
+def _matching_keywords(keywords: Tuple[str, ...], text: str) -> FrozenSet[int]:
+    """Indexes of keywords occurring in text.
+    
+    Plain substring checks: for a few dozen keywords the C-level ``in`` beats
+    a pure-Python automaton walk by about 3x. lru_cache is thread-safe, so
+    detectors shared across server threads can use it.
+    """
+    return frozenset(i for i, keyword in enumerate(keywords) if keyword in text)
+
+
 class BiasDetector:
     """Detect cognitive biases in decision patterns"""
     
@@ -43,19 +55,50 @@ class BiasDetector:
         }
     }
     
+    def __init__(self):
+        # Every rule keyword once; each rule keeps the indexes of its own keywords
+        self._keywords = tuple(dict.fromkeys(
+            keyword
+            for rule in self.BIAS_RULES.values()
+            for keyword in rule["keywords"]
+        ))
+        positions = {keyword: i for i, keyword in enumerate(self._keywords)}
+        self._rule_keywords = {
+            bias_name: frozenset(positions[k] for k in rule["keywords"])
+            for bias_name, rule in self.BIAS_RULES.items()
+        }
+    
     def detect_biases(self, decisions: List[Dict], patterns: Dict):
         """Detect potential cognitive biases"""
         biases_found = []
         
-        # Rule-based detection
+        # Rule-based detection: one keyword scan per decision covers all rules
+        scores = dict.fromkeys(self.BIAS_RULES, 0)
+        evidence = {bias_name: [] for bias_name in self.BIAS_RULES}
+        
+        for dec in decisions:
+            matched = self._match_keywords(dec)
+            if not matched:
+                continue
+            for bias_name, rule_keywords in self._rule_keywords.items():
+                hits = len(matched & rule_keywords)
+                if hits:
+                    scores[bias_name] += hits
+                    if len(evidence[bias_name]) < 3:
+                        evidence[bias_name].append({
+                            "decision": dec.get("decision", ""),
+                            "reason": dec.get("reason", ""),
+                            "timestamp": dec.get("timestamp", "")
+                        })
+        
         for bias_name, rule in self.BIAS_RULES.items():
-            score = self._calculate_bias_score(decisions, rule)
+            score = scores[bias_name]
             if score >= rule["threshold"]:
                 biases_found.append({
                     "bias": bias_name,
                     "score": score,
                     "description": rule["description"],
-                    "evidence": self._find_evidence(decisions, rule["keywords"])
+                    "evidence": evidence[bias_name]
                 })
         
         # Pattern-based detection
@@ -64,38 +107,10 @@ class BiasDetector:
         
         return biases_found
     
-    def _calculate_bias_score(self, decisions: List[Dict], rule: Dict):
-        """Calculate bias score based on keyword frequency"""
-        score = 0
-        keywords = rule["keywords"]
-        
-        for dec in decisions:
-            text = f"{dec.get('decision', '')} {dec.get('reason', '')}".lower()
-            for keyword in keywords:
-                if keyword in text:
-                    score += 1
-        
-        return score
-    
-    def _find_evidence(self, decisions: List[Dict], keywords: List[str]):
-        """Find specific examples of bias"""
-        evidence = []
-        
-        for dec in decisions:
-            text = f"{dec.get('decision', '')} {dec.get('reason', '')}".lower()
-            for keyword in keywords:
-                if keyword in text:
-                    evidence.append({
-                        "decision": dec.get("decision", ""),
-                        "reason": dec.get("reason", ""),
-                        "timestamp": dec.get("timestamp", "")
-                    })
-                    break
-            
-            if len(evidence) >= 3:
-                break
-        
-        return evidence
+    def _match_keywords(self, dec: Dict) -> FrozenSet[int]:
+        """Keyword indexes present in a decision, cached by its text"""
+        text = f"{dec.get('decision', '')} {dec.get('reason', '')}".lower()
+        return _matching_keywords(self._keywords, text)
     
     def _detect_pattern_biases(self, patterns: Dict):
         """Detect biases from pattern analysis"""
@@ -3,18 +3,32 @@
 Tracks and displays your mental state in real-time
 """
 
+import threading
 import time
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, Iterable, List
 from collections import deque
+from itertools import islice
 import random
 
 
+# Activity kinds counted in the sliding window
+OTHER, FOCUS, SWITCH = 0, 1, 2
+ACTIVITY_KINDS = {"typing": FOCUS, "reading": FOCUS, "coding": FOCUS, "switch": SWITCH}
+
+
 class CognitiveStateMonitor:
     """Monitor and predict cognitive state in real-time"""
     
+    WINDOW = 20  # Recent activities considered for state detection
+    BATCH_CHUNK = 1000  # Activities applied per lock hold in log_activities
+    
     def __init__(self):
+        # Guards every field below; requests for the same user may run concurrently
+        self._lock = threading.Lock()
         self.activity_buffer = deque(maxlen=100)  # Last 100 activities
+        # Kind counts over the last WINDOW activities, kept as events enter and leave
+        self._window_counts = [0, 0, 0]
         self.focus_sessions = []
         self.current_state = "idle"
         self.energy_level = 100
@@ -22,32 +36,78 @@ class CognitiveStateMonitor:
         self.decision_quality = 100
         self.flow_state_score = 0
         self.last_break = datetime.now()
+        self._last_break_clock = time.monotonic()
         self.session_start = None
         
     def log_activity(self, activity_type: str, duration: int = 1):
         """Log an activity (typing, clicking, switching, etc.)"""
-        self.activity_buffer.append({
+        with self._lock:
+            self._push_activity(activity_type, duration, datetime.now())
+            self._update_state()
+    
+    def log_activities(self, activities: Iterable[Dict]) -> int:
+        """Log many activities in order, returning how many were applied
+        
+        Each item is a dict like the log_activity arguments ("type",
+        "duration") and may carry an ISO "timestamp"; the rest share one.
+        The whole batch is validated before any of it is applied, so a bad
+        item raises ValueError and leaves the state untouched.
+        """
+        now = datetime.now()
+        # Parsed outside the lock so a slow upload never blocks readers
+        parsed = [self._parse_activity(index, activity, now) for index, activity in enumerate(activities)]
+        
+        for start in range(0, len(parsed), self.BATCH_CHUNK):
+            with self._lock:
+                for activity_type, duration, timestamp in islice(parsed, start, start + self.BATCH_CHUNK):
+                    self._push_activity(activity_type, duration, timestamp)
+                    self._update_state()
+        return len(parsed)
+    
+    def _parse_activity(self, index: int, activity, now: datetime):
+        """(type, duration, timestamp) for one batch item; raises ValueError if malformed"""
+        if not isinstance(activity, dict):
+            raise ValueError(f"item {index} must be an object")
+        activity_type = activity.get("type", "typing")
+        duration = activity.get("duration", 1)
+        timestamp = activity.get("timestamp")
+        if not isinstance(activity_type, str):
+            raise ValueError(f"item {index}: type must be a string")
+        if isinstance(duration, bool) or not isinstance(duration, (int, float)):
+            raise ValueError(f"item {index}: duration must be a number")
+        if not timestamp:
+            return activity_type, duration, now
+        if not isinstance(timestamp, str):
+            raise ValueError(f"item {index}: timestamp must be an ISO 8601 string")
+        return activity_type, duration, datetime.fromisoformat(timestamp)
+    
+    def _push_activity(self, activity_type: str, duration: int, timestamp: datetime):
+        """Append an activity, sliding the window counts by one event"""
+        buffer = self.activity_buffer
+        counts = self._window_counts
+        if len(buffer) >= self.WINDOW:
+            counts[ACTIVITY_KINDS.get(buffer[-self.WINDOW]["type"], OTHER)] -= 1
+        counts[ACTIVITY_KINDS.get(activity_type, OTHER)] += 1
+        
+        buffer.append({
             "type": activity_type,
-            "timestamp": datetime.now(),
+            "timestamp": timestamp,
             "duration": duration
         })
-        self._update_state()
     
     def _update_state(self):
         """Update cognitive state based on recent activity"""
         if len(self.activity_buffer) < 10:
             return
         
-        recent = list(self.activity_buffer)[-20:]
-        
         # Detect flow state
-        focus_activities = [a for a in recent if a["type"] in ["typing", "reading", "coding"]]
-        switches = [a for a in recent if a["type"] == "switch"]
+        focus_activities = self._window_counts[FOCUS]
+        switches = self._window_counts[SWITCH]
         
-        if len(focus_activities) > 15 and len(switches) < 2:
+        if focus_activities > 15 and switches < 2:
             self.current_state = "flow"
             self.flow_state_score = min(100, self.flow_state_score + 5)
-        elif len(switches) > 8:
+        elif switches > 8:
             self.current_state = "distracted"
             self.flow_state_score = max(0, self.flow_state_score - 10)
             self.stress_level = min(100, self.stress_level + 5)
@@ -56,7 +116,7 @@ class CognitiveStateMonitor:
             self.flow_state_score = max(0, self.flow_state_score - 2)
         
         # Update energy based on time since break
-        time_since_break = (datetime.now() - self.last_break).seconds / 60
+        time_since_break = (time.monotonic() - self._last_break_clock) / 60
         if time_since_break > 90:
             self.energy_level = max(20, self.energy_level - 1)
             self.decision_quality = max(30, self.decision_quality - 1)
@@ -69,15 +129,16 @@ class CognitiveStateMonitor:
     
     def get_current_state(self) -> Dict:
         """Get current cognitive state"""
-        return {
-            "state": self.current_state,
-            "energy_level": self.energy_level,
-            "stress_level": self.stress_level,
-            "decision_quality": self.decision_quality,
-            "flow_state_score": self.flow_state_score,
-            "time_since_break": (datetime.now() - self.last_break).seconds // 60,
-            "recommendation": self._get_recommendation()
-        }
+        with self._lock:
+            return {
+                "state": self.current_state,
+                "energy_level": self.energy_level,
+                "stress_level": self.stress_level,
+                "decision_quality": self.decision_quality,
+                "flow_state_score": self.flow_state_score,
+                "time_since_break": (datetime.now() - self.last_break).seconds // 60,
+                "recommendation": self._get_recommendation()
+            }
     
     def _get_recommendation(self) -> str:
         """Get recommendation based on current state"""
@@ -96,33 +157,38 @@ class CognitiveStateMonitor:
     
     def take_break(self):
         """Log a break"""
-        self.last_break = datetime.now()
-        self.energy_level = min(100, self.energy_level + 20)
-        self.stress_level = max(0, self.stress_level - 15)
-        self.decision_quality = min(100, self.decision_quality + 10)
+        with self._lock:
+            self.last_break = datetime.now()
+            self._last_break_clock = time.monotonic()
+            self.energy_level = min(100, self.energy_level + 20)
+            self.stress_level = max(0, self.stress_level - 15)
+            self.decision_quality = min(100, self.decision_quality + 10)
     
     def start_focus_session(self):
         """Start a focus session"""
-        self.session_start = datetime.now()
-        self.current_state = "focusing"
+        with self._lock:
+            self.session_start = datetime.now()
+            self.current_state = "focusing"
     
     def end_focus_session(self):
         """End focus session and record it"""
-        if self.session_start:
-            duration = (datetime.now() - self.session_start).seconds // 60
-            self.focus_sessions.append({
-                "start": self.session_start,
-                "duration": duration,
-                "quality": self.flow_state_score
-            })
-            self.session_start = None
-            return duration
-        return 0
+        with self._lock:
+            if self.session_start:
+                duration = (datetime.now() - self.session_start).seconds // 60
+                self.focus_sessions.append({
+                    "start": self.session_start,
+                    "duration": duration,
+                    "quality": self.flow_state_score
+                })
+                self.session_start = None
+                return duration
+            return 0
     
     def get_daily_stats(self) -> Dict:
         """Get daily statistics"""
-        today_sessions = [s for s in self.focus_sessions 
-                         if s["start"].date() == datetime.now().date()]
+        with self._lock:
+            today_sessions = [s for s in self.focus_sessions 
+                             if s["start"].date() == datetime.now().date()]
         
         total_focus_time = sum(s["duration"] for s in today_sessions)
         avg_quality = sum(s["quality"] for s in today_sessions) / len(today_sessions) if today_sessions else 0
@@ -5,16 +5,22 @@ Makes the twin understand context and respond intelligently
 
 import json
 import os
+import threading
 from datetime import datetime, timedelta
 import re
 
+from core.storage import get_storage, write_json_atomic
+
 
 class ContextAwarenessEngine:
     """Understands context and provides intelligent responses"""
     
-    def __init__(self, data_dir="data"):
+    def __init__(self, data_dir="data", storage=None):
         self.data_dir = data_dir
+        self.storage = storage if storage is not None else get_storage(data_dir)
         self.context_file = f"{data_dir}/context_memory.json"
+        # Guards context memory and conversation state and the context file
+        self._lock = threading.RLock()
         self.context_memory = self._load_context()
         
         # Conversation state
@@ -25,7 +31,11 @@ class ContextAwarenessEngine:
     
     def _load_context(self):
         """Load context memory"""
-        if os.path.exists(self.context_file):
+        if self.storage:
+            context = self.storage.load_document("context_memory")
+            if context is not None:
+                return context
+        elif os.path.exists(self.context_file):
             with open(self.context_file, 'r') as f:
                 return json.load(f)
         
@@ -40,38 +50,41 @@ class ContextAwarenessEngine:
     
     def _save_context(self):
         """Save context memory"""
-        os.makedirs(self.data_dir, exist_ok=True)
-        with open(self.context_file, 'w') as f:
-            json.dump(self.context_memory, f, indent=2)
+        if self.storage:
+            self.storage.save_document("context_memory", self.context_memory)
+            return
+        
+        write_json_atomic(self.context_file, self.context_memory, indent=2)
     
     def understand_query(self, query):
         """Understand user query with context"""
-        query_lower = query.lower()
+        with self._lock:
+            query_lower = query.lower()
         
-        # Detect intent
-        intent = self._detect_intent(query_lower)
+            # Detect intent
+            intent = self._detect_intent(query_lower)
         
-        # Detect emotion
-        emotion = self._detect_emotion(query_lower)
+            # Detect emotion
+            emotion = self._detect_emotion(query_lower)
         
-        # Extract entities
-        entities = self._extract_entities(query)
+            # Extract entities
+            entities = self._extract_entities(query)
         
-        # Detect urgency
-        urgency = self._detect_urgency(query_lower)
+            # Detect urgency
+            urgency = self._detect_urgency(query_lower)
         
-        # Update context
-        self._update_context(query, intent, emotion, entities)
+            # Update context
+            self._update_context(query, intent, emotion, entities)
         
-        return {
-            "query": query,
-            "intent": intent,
-            "emotion": emotion,
-            "entities": entities,
-            "urgency": urgency,
-            "context": self.current_topic,
-            "timestamp": datetime.now().isoformat()
-        }
+            return {
+                "query": query,
+                "intent": intent,
+                "emotion": emotion,
+                "entities": entities,
+                "urgency": urgency,
+                "context": self.current_topic,
+                "timestamp": datetime.now().isoformat()
+            }
     
     def _detect_intent(self, query):
         """Detect user intent"""
@@ -235,71 +248,73 @@ class ContextAwarenessEngine:
     
     def get_conversation_summary(self):
         """Get summary of recent conversation"""
-        if not self.conversation_history:
-            return "No recent conversation"
-        
-        recent = self.conversation_history[-10:]
-        
-        # Count intents
-        intent_counts = {}
-        for conv in recent:
-            intent = conv["intent"]
-            intent_counts[intent] = intent_counts.get(intent, 0) + 1
-        
-        top_intent = max(intent_counts, key=intent_counts.get)
-        
-        # Detect mood trend
-        emotions = [conv["emotion"] for conv in recent]
-        current_mood = emotions[-1] if emotions else "neutral"
-        
-        return {
-            "message_count": len(recent),
-            "primary_intent": top_intent,
-            "current_mood": current_mood,
-            "topics": list(set([conv.get("topic") for conv in recent if conv.get("topic")])),
-            "last_interaction": self.last_interaction.isoformat() if self.last_interaction else None
-        }
+        with self._lock:
+            if not self.conversation_history:
+                return "No recent conversation"
+        
+            recent = self.conversation_history[-10:]
+        
+            # Count intents
+            intent_counts = {}
+            for conv in recent:
+                intent = conv["intent"]
+                intent_counts[intent] = intent_counts.get(intent, 0) + 1
+        
+            top_intent = max(intent_counts, key=intent_counts.get)
+        
+            # Detect mood trend
+            emotions = [conv["emotion"] for conv in recent]
+            current_mood = emotions[-1] if emotions else "neutral"
+        
+            return {
+                "message_count": len(recent),
+                "primary_intent": top_intent,
+                "current_mood": current_mood,
+                "topics": list(set([conv.get("topic") for conv in recent if conv.get("topic")])),
+                "last_interaction": self.last_interaction.isoformat() if self.last_interaction else None
+            }
     
     def get_smart_suggestions(self, current_state):
         """Get smart suggestions based on context"""
-        suggestions = []
-        
-        # Based on recent concerns
-        if self.context_memory["user_concerns"]:
-            recent_concerns = self.context_memory["user_concerns"][-3:]
-            if len(recent_concerns) > 2:
-                suggestions.append({
-                    "type": "concern",
-                    "message": "You've had several concerns recently. Want to talk about what's bothering you?",
-                    "action": "open_chat"
-                })
-        
-        # Based on wins
-        if self.context_memory["wins"]:
-            recent_wins = self.context_memory["wins"][-5:]
-            if len(recent_wins) > 0:
-                suggestions.append({
-                    "type": "celebration",
-                    "message": f"You've had {len(recent_wins)} wins recently! Keep the momentum going!",
-                    "action": "show_wins"
-                })
-        
-        # Based on time since last interaction
-        if self.last_interaction:
-            time_since = datetime.now() - self.last_interaction
-            if time_since > timedelta(hours=4):
+        with self._lock:
+            suggestions = []
+        
+            # Based on recent concerns
+            if self.context_memory["user_concerns"]:
+                recent_concerns = self.context_memory["user_concerns"][-3:]
+                if len(recent_concerns) > 2:
+                    suggestions.append({
+                        "type": "concern",
+                        "message": "You've had several concerns recently. Want to talk about what's bothering you?",
+                        "action": "open_chat"
+                    })
+        
+            # Based on wins
+            if self.context_memory["wins"]:
+                recent_wins = self.context_memory["wins"][-5:]
+                if len(recent_wins) > 0:
+                    suggestions.append({
+                        "type": "celebration",
+                        "message": f"You've had {len(recent_wins)} wins recently! Keep the momentum going!",
+                        "action": "show_wins"
+                    })
+        
+            # Based on time since last interaction
+            if self.last_interaction:
+                time_since = datetime.now() - self.last_interaction
+                if time_since > timedelta(hours=4):
+                    suggestions.append({
+                        "type": "check_in",
+                        "message": "It's been a while! How are things going?",
+                        "action": "check_in"
+                    })
+        
+            # Based on current state
+            if current_state.get("energy_level", 50) < 30:
                 suggestions.append({
-                    "type": "check_in",
-                    "message": "It's been a while! How are things going?",
-                    "action": "check_in"
+                    "type": "energy",
+                    "message": "Your energy is low. Time for a break?",
+                    "action": "suggest_break"
                 })
         
-        # Based on current state
-        if current_state.get("energy_level", 50) < 30:
-            suggestions.append({
-                "type": "energy",
-                "message": "Your energy is low. Time for a break?",
-                "action": "suggest_break"
-            })
-        
-        return suggestions
+            return suggestions
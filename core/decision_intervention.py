@@ -4,8 +4,49 @@ Catches you before bad decisions and intervenes
 """
 
 from datetime import datetime, time
-from typing import Dict, List, Optional
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
+import json
+import operator
+import os
 import re
+import threading
+
+from core.similarity_index import TokenSetIndex
+
+
+# Outcomes that count as a past mistake
+FAILURE_OUTCOMES = ("failure", "regret")
+
+# Bundled rules; a data dir may carry its own intervention_rules.json
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intervention_rules.json")
+
+SEVERITY_RANK = {"critical": 0, "high": 1, "medium": 2, "low": 3}
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "in": lambda value, options: value in options
+}
+
+CLOCK_FIELDS = {
+    "hour": lambda now: now.hour,
+    "weekday": lambda now: now.weekday()
+}
+
+# Relative evaluation cost: context lookups are nearly free, history checks are not
+CONTEXT_COST = 1
+CHECKS = {
+    "repeated_mistake": ("_is_repeated_mistake", 100)
+}
+
+
+def _rule_counters() -> Dict:
+    return {"evaluations": 0, "fired": 0, "errors": 0, "skipped": 0, "total_ms": 0.0}
 
 
 class DecisionInterventionSystem:
@@ -14,98 +55,180 @@ class DecisionInterventionSystem:
     def __init__(self, decision_tracker, pattern_analyzer):
         self.decision_tracker = decision_tracker
         self.pattern_analyzer = pattern_analyzer
+        self._stats_lock = threading.Lock()
         self.intervention_rules = self._load_intervention_rules()
         self.pending_decisions = []
         
+        # Word sets of failed decisions only, kept current by tracker events
+        self._failures = TokenSetIndex()
+        self._repeat_cache: Dict[str, bool] = {}
+        with decision_tracker.lock:
+            for dec in decision_tracker.get_decision_timeline():
+                self._index_failure(dec)
+            decision_tracker.add_listener(self)
+    
+    def on_decision_added(self, decision: Dict):
+        self._index_failure(decision)
+    
+    def on_outcome_updated(self, decision: Dict, previous_outcome: Optional[str]):
+        self._index_failure(decision)
+    
+    def _index_failure(self, dec: Dict):
+        """Track a decision in the failure index while its outcome is a failure"""
+        if dec.get("outcome") in FAILURE_OUTCOMES:
+            self._failures.add(dec["id"], dec.get("decision", "").lower().split())
+        elif dec["id"] in self._failures:
+            self._failures.remove(dec["id"])
+        else:
+            return
+        self._repeat_cache.clear()
+        
     def _load_intervention_rules(self) -> List[Dict]:
-        """Load intervention rules"""
-        return [
-            {
-                "name": "late_night_decision",
-                "condition": lambda ctx: datetime.now().hour >= 22 or datetime.now().hour <= 5,
-                "message": "⚠️ It's late. You make worse decisions after 10pm. Sleep on it?",
-                "severity": "high",
-                "delay_seconds": 60
-            },
-            {
-                "name": "stress_decision",
-                "condition": lambda ctx: ctx.get("stress_level", 0) > 70,
-                "message": "🚨 You're stressed. This decision has 73% regret probability when stressed.",
-                "severity": "high",
-                "delay_seconds": 300
-            },
-            {
-                "name": "impulsive_pattern",
-                "condition": lambda ctx: ctx.get("time_thinking", 0) < 60,
-                "message": "⏸️ You're deciding too fast. You usually regret quick decisions.",
-                "severity": "medium",
-                "delay_seconds": 120
-            },
-            {
-                "name": "capacity_overload",
-                "condition": lambda ctx: ctx.get("current_commitments", 0) > 5,
-                "message": "🛑 You're at 87% capacity. Adding more will hurt existing commitments.",
-                "severity": "high",
-                "delay_seconds": 180
-            },
-            {
-                "name": "emotional_state",
-                "condition": lambda ctx: ctx.get("emotional_state") in ["angry", "frustrated", "sad"],
-                "message": "😤 You're emotional. Draft saved. Review when calm?",
-                "severity": "critical",
-                "delay_seconds": 3600
-            },
-            {
-                "name": "repeated_mistake",
-                "condition": lambda ctx: self._is_repeated_mistake(ctx),
-                "message": "🔄 You've made this exact decision 3 times. It failed each time. Really?",
-                "severity": "critical",
-                "delay_seconds": 300
-            },
-            {
-                "name": "friday_commitment",
-                "condition": lambda ctx: datetime.now().weekday() == 4 and ctx.get("decision_type") == "commitment",
-                "message": "📅 You break 60% of commitments made on Fridays. Wait till Monday?",
-                "severity": "medium",
-                "delay_seconds": 120
-            },
-            {
-                "name": "post_meeting_decision",
-                "condition": lambda ctx: ctx.get("minutes_since_meeting", 999) < 30,
-                "message": "💼 You just left a meeting. You're 40% more impulsive post-meeting.",
-                "severity": "medium",
-                "delay_seconds": 180
-            }
-        ]
+        """Load intervention rules and compile them into an evaluation plan
+        
+        A data dir's own intervention_rules.json overrides the bundled set.
+        """
+        path = os.path.join(self.decision_tracker.data_dir, "intervention_rules.json")
+        if not os.path.exists(path):
+            path = RULES_FILE
+        with open(path, 'r', encoding='utf-8') as f:
+            specs = json.load(f)
+        
+        if not isinstance(specs, list):
+            raise ValueError(f"{path}: expected a list of rules")
+        
+        rules = []
+        for order, spec in enumerate(specs):
+            name = spec.get("name", f"#{order}") if isinstance(spec, dict) else f"#{order}"
+            try:
+                missing = [key for key in ("name", "when", "message", "severity") if key not in spec]
+                if missing:
+                    raise ValueError(f"missing {', '.join(missing)}")
+                if spec["severity"] not in SEVERITY_RANK:
+                    raise ValueError(f"unknown severity {spec['severity']!r}")
+                condition, cost = self._compile_condition(spec["when"])
+            except (KeyError, TypeError, ValueError) as e:
+                detail = f"missing or unknown {e}" if isinstance(e, KeyError) else str(e)
+                raise ValueError(f"{path}: invalid intervention rule {name!r}: {detail}") from e
+            rules.append({
+                "name": spec["name"],
+                "condition": condition,
+                "cost": cost,
+                "order": order,
+                "message": spec["message"],
+                "severity": spec["severity"],
+                "delay_seconds": spec.get("delay_seconds", 0)
+            })
+        
+        # Cheap context predicates first, history lookups last
+        plan = sorted(rules, key=lambda rule: (rule["cost"], rule["order"]))
+        
+        # Declared position of the earliest critical rule from each plan step
+        # on; once a fired critical rule precedes it, the primary
+        # intervention can no longer change. Only the costly tail of the plan
+        # is ever skipped, so every context rule still reports its warning.
+        self._critical_from = [len(plan)] * (len(plan) + 1)
+        for step in range(len(plan) - 1, -1, -1):
+            rule = plan[step]
+            earliest = self._critical_from[step + 1]
+            self._critical_from[step] = min(earliest, rule["order"]) if rule["severity"] == "critical" else earliest
+        self._costly_from = next(
+            (step for step, rule in enumerate(plan) if rule["cost"] > CONTEXT_COST), len(plan)
+        )
+        
+        self.rule_stats = {rule["name"]: _rule_counters() for rule in rules}
+        return plan
+    
+    def _compile_condition(self, spec: Dict) -> Tuple[Callable[[Dict], bool], int]:
+        """Turn a rule's "when" clause into a predicate and its cost"""
+        if not isinstance(spec, dict):
+            raise ValueError(f"condition must be an object, not {spec!r}")
+        if "any" in spec or "all" in spec:
+            combinator = "any" if "any" in spec else "all"
+            terms = spec[combinator]
+            if not isinstance(terms, list) or not terms:
+                raise ValueError(f"{combinator!r} needs a non-empty list of conditions")
+            # Cheapest terms first so they can short-circuit the rest
+            parts = sorted((self._compile_condition(part) for part in terms), key=lambda part: part[1])
+            tests = [test for test, _ in parts]
+            cost = max(cost for _, cost in parts)
+            if combinator == "any":
+                return (lambda ctx: any(test(ctx) for test in tests)), cost
+            return (lambda ctx: all(test(ctx) for test in tests)), cost
+        
+        if "check" in spec:
+            method_name, cost = CHECKS[spec["check"]]
+            return getattr(self, method_name), cost
+        
+        compare = OPERATORS[spec["op"]]
+        value = spec["value"]
+        if isinstance(value, list):
+            value = frozenset(value)
+        
+        if "clock" in spec:
+            read = CLOCK_FIELDS[spec["clock"]]
+            return (lambda ctx: compare(read(datetime.now()), value)), CONTEXT_COST
+        
+        field, default = spec["context"], spec.get("default")
+        return (lambda ctx: compare(ctx.get(field, default), value)), CONTEXT_COST
     
     def check_decision(self, decision: str, context: Dict) -> Dict:
         """Check if decision should be intervened"""
-        interventions = []
+        fired = []
+        first_critical = len(self.intervention_rules)
+        evaluated = len(self.intervention_rules)
+        timings = []
         
-        for rule in self.intervention_rules:
+        for step, rule in enumerate(self.intervention_rules):
+            if step >= self._costly_from and first_critical < self._critical_from[step]:
+                evaluated = step
+                break
+            start = perf_counter()
             try:
-                if rule["condition"](context):
-                    interventions.append({
-                        "rule": rule["name"],
-                        "message": rule["message"],
-                        "severity": rule["severity"],
-                        "delay_seconds": rule["delay_seconds"],
-                        "timestamp": datetime.now()
-                    })
-            except Exception as e:
-                pass  # Skip failed rule checks
-        
-        if interventions:
-            # Get highest severity intervention
-            critical = [i for i in interventions if i["severity"] == "critical"]
-            high = [i for i in interventions if i["severity"] == "high"]
+                hit = bool(rule["condition"](context))
+                failed = False
+            except Exception:
+                hit, failed = False, True  # Skip failed rule checks
+            timings.append((rule["name"], (perf_counter() - start) * 1000, hit, failed))
             
-            primary = critical[0] if critical else (high[0] if high else interventions[0])
+            if not hit:
+                continue
+            fired.append(rule)
+            if rule["severity"] == "critical":
+                first_critical = min(first_critical, rule["order"])
+        
+        skipped = [rule["name"] for rule in self.intervention_rules[evaluated:]]
+        with self._stats_lock:
+            for name, elapsed_ms, hit, failed in timings:
+                counters = self.rule_stats[name]
+                counters["evaluations"] += 1
+                counters["total_ms"] += elapsed_ms
+                counters["fired"] += hit
+                counters["errors"] += failed
+            for name in skipped:
+                self.rule_stats[name]["skipped"] += 1
+        
+        if fired:
+            now = datetime.now()
+            interventions = [
+                {
+                    "rule": rule["name"],
+                    "message": rule["message"],
+                    "severity": rule["severity"],
+                    "delay_seconds": rule["delay_seconds"],
+                    "timestamp": now
+                }
+                for rule in sorted(fired, key=lambda rule: rule["order"])
+            ]
+            
+            # Highest severity wins, ties go to the rule listed first
+            primary = min(interventions, key=lambda i: SEVERITY_RANK.get(i["severity"], len(SEVERITY_RANK)))
             
             return {
                 "should_intervene": True,
                 "intervention": primary,
                 "all_warnings": interventions,
+                "skipped_rules": skipped,
                 "allow_override": primary["severity"] != "critical"
             }
         
@@ -118,28 +241,16 @@ class DecisionInterventionSystem:
         """Check if this is a repeated mistake"""
         decision_text = context.get("decision", "").lower()
         
-        # Get past decisions
-        past_decisions = self.decision_tracker.get_decision_timeline()
-        
-        # Find similar decisions that failed
-        similar_failures = [
-            d for d in past_decisions
-            if self._is_similar(decision_text, d.get("decision", "").lower())
-            and d.get("outcome") in ["failure", "regret"]
-        ]
-        
-        return len(similar_failures) >= 2
-    
-    def _is_similar(self, text1: str, text2: str) -> bool:
-        """Check if two decision texts are similar"""
-        words1 = set(text1.split())
-        words2 = set(text2.split())
-        
-        if not words1 or not words2:
-            return False
-        
-        overlap = len(words1 & words2)
-        return overlap / min(len(words1), len(words2)) > 0.5
+        # Only failed decisions are indexed; answers hold until that set changes
+        with self.decision_tracker.lock:
+            self.decision_tracker.refresh()
+            repeated = self._repeat_cache.get(decision_text)
+            if repeated is None:
+                if len(self._repeat_cache) >= 256:
+                    self._repeat_cache.clear()
+                similar_failures = self._failures.count_overlapping(decision_text.split(), 0.5, stop_at=2)
+                repeated = self._repeat_cache[decision_text] = similar_failures >= 2
+            return repeated
     
     def calculate_regret_probability(self, decision: str, context: Dict) -> float:
         """Calculate probability of regretting this decision"""
@@ -191,5 +302,18 @@ class DecisionInterventionSystem:
         return {
             "total_interventions": len(self.pending_decisions),
             "overridden": sum(1 for d in self.pending_decisions if d.get("overridden")),
-            "successful_blocks": sum(1 for d in self.pending_decisions if not d.get("overridden"))
+            "successful_blocks": sum(1 for d in self.pending_decisions if not d.get("overridden")),
+            "rules": self.get_rule_stats()
         }
+    
+    def get_rule_stats(self) -> List[Dict]:
+        """Per-rule counters and mean evaluation time, in evaluation order"""
+        stats = []
+        for rule in self.intervention_rules:
+            with self._stats_lock:
+                counters = dict(self.rule_stats[rule["name"]])
+            evaluations = counters["evaluations"]
+            counters["avg_ms"] = round(counters["total_ms"] / evaluations, 4) if evaluations else 0.0
+            counters["total_ms"] = round(counters["total_ms"], 3)
+            stats.append({"rule": rule["name"], "severity": rule["severity"], "cost": rule["cost"], **counters})
+        return stats
@@ -0,0 +1,200 @@
+"""
+📒 DECISION JOURNAL - Append-only decision storage
+Log-structured JSONL segments with compaction and batched fsync
+"""
+
+import json
+import os
+import time
+from typing import Dict, List
+
+
+class DecisionJournal:
+    """Append-only log of decision records.
+
+    Every write is a single JSON line appended to the active segment, so the
+    cost of a write does not depend on how much history exists. The current
+    state is rebuilt by replaying ``snapshot.jsonl`` followed by any segments
+    written after it. Compaction folds the log back into a fresh snapshot.
+    """
+
+    SNAPSHOT_NAME = "snapshot.jsonl"
+    SEGMENT_PREFIX = "segment_"
+    SEGMENT_SUFFIX = ".jsonl"
+
+    def __init__(
+        self,
+        journal_dir: str,
+        segment_max_bytes: int = 4 * 1024 * 1024,
+        sync_every: int = 32,
+        sync_interval: float = 1.0,
+        compact_min_records: int = 1000
+    ):
+        self.journal_dir = journal_dir
+        self.segment_max_bytes = segment_max_bytes
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.compact_min_records = compact_min_records
+
+        self._segment = None
+        self._segment_number = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._log_records = 0  # Records written since the last snapshot
+
+    def exists(self) -> bool:
+        """Whether the journal has any data on disk"""
+        return bool(self._segment_numbers()) or os.path.exists(self._snapshot_path())
+
+    def replay(self) -> List[Dict]:
+        """Rebuild the decision list from the snapshot and log segments"""
+        index = {}
+        covered = 0
+
+        snapshot = self._snapshot_path()
+        if os.path.exists(snapshot):
+            for record in self._read_records(snapshot):
+                if record.get("op") == "snapshot":
+                    covered = record.get("covers", 0)
+                else:
+                    self._apply(index, record)
+
+        numbers = self._segment_numbers()
+        for number in numbers:
+            if number <= covered:
+                continue
+            for record in self._read_records(self._segment_path(number)):
+                self._apply(index, record)
+                self._log_records += 1
+
+        self._segment_number = max([covered] + numbers)
+        return list(index.values())
+
+    def append(self, decision: Dict):
+        """Append a newly created decision"""
+        self._write({"op": "add", "decision": decision})
+
+    def update(self, decision_id: str, fields: Dict):
+        """Append a partial update for an existing decision"""
+        self._write({"op": "update", "id": decision_id, "fields": fields})
+
+    def should_compact(self, live_records: int) -> bool:
+        """Compact once the log holds well more records than live decisions"""
+        return self._log_records >= max(self.compact_min_records, 2 * live_records)
+
+    def compact(self, decisions: List[Dict]):
+        """Fold the log into a new snapshot and drop covered segments"""
+        self.sync()
+        self._close_segment()
+
+        covers = self._segment_number
+        os.makedirs(self.journal_dir, exist_ok=True)
+        tmp_path = self._snapshot_path() + ".tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(json.dumps({"op": "snapshot", "covers": covers}) + "\n")
+            for decision in decisions:
+                f.write(json.dumps({"op": "add", "decision": decision}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._snapshot_path())
+        self._fsync_dir()
+
+        for number in self._segment_numbers():
+            if number <= covers:
+                os.remove(self._segment_path(number))
+
+        self._log_records = 0
+
+    def sync(self):
+        """Force buffered writes to stable storage"""
+        if self._segment is not None and self._unsynced:
+            self._segment.flush()
+            os.fsync(self._segment.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        """Sync and close the active segment"""
+        self.sync()
+        self._close_segment()
+
+    def _write(self, record: Dict):
+        segment = self._active_segment()
+        segment.write(json.dumps(record) + "\n")
+        segment.flush()
+        self._log_records += 1
+        self._unsynced += 1
+
+        if (self._unsynced >= self.sync_every or
+                time.monotonic() - self._last_sync >= self.sync_interval):
+            self.sync()
+
+        if segment.tell() >= self.segment_max_bytes:
+            self.sync()
+            self._close_segment()
+
+    def _active_segment(self):
+        if self._segment is None:
+            os.makedirs(self.journal_dir, exist_ok=True)
+            self._segment_number += 1
+            self._segment = open(self._segment_path(self._segment_number), 'a')
+            self._fsync_dir()
+        return self._segment
+
+    def _close_segment(self):
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+
+    @staticmethod
+    def _apply(index: Dict, record: Dict):
+        op = record.get("op")
+        if op == "add":
+            decision = record["decision"]
+            index[decision["id"]] = decision
+        elif op == "update":
+            decision = index.get(record["id"])
+            if decision is not None:
+                decision.update(record.get("fields", {}))
+
+    @staticmethod
+    def _read_records(path: str):
+        with open(path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn tail from a crash mid-write; everything after it is unusable
+                    break
+
+    def _segment_numbers(self) -> List[int]:
+        if not os.path.isdir(self.journal_dir):
+            return []
+        numbers = []
+        for name in os.listdir(self.journal_dir):
+            if name.startswith(self.SEGMENT_PREFIX) and name.endswith(self.SEGMENT_SUFFIX):
+                number = name[len(self.SEGMENT_PREFIX):-len(self.SEGMENT_SUFFIX)]
+                if number.isdigit():
+                    numbers.append(int(number))
+        return sorted(numbers)
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(
+            self.journal_dir, f"{self.SEGMENT_PREFIX}{number:08d}{self.SEGMENT_SUFFIX}"
+        )
+
+    def _snapshot_path(self) -> str:
+        return os.path.join(self.journal_dir, self.SNAPSHOT_NAME)
+
+    def _fsync_dir(self):
+        """Persist directory entries (new segments, renamed snapshots)"""
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        fd = os.open(self.journal_dir, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
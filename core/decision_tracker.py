@@ -3,19 +3,49 @@
 Stores decisions with context, constraints, and outcomes
 """
 
+import atexit
+import bisect
 import json
 import os
+import threading
+import uuid
+from collections import defaultdict
 from datetime import datetime
 from typing import List, Dict, Optional
 
+from core.decision_journal import DecisionJournal
+from core.similarity_index import BM25Index
+from core.storage import StorageBackend, get_storage
+
 
 class DecisionTracker:
     """Track decisions with full context for timeline simulation"""
     
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", storage: Optional[StorageBackend] = None):
         self.data_dir = data_dir
+        # Held for every read and write; listeners are notified while it is held
+        self.lock = threading.RLock()
         self.decisions_file = os.path.join(data_dir, "decisions.json")
+        self.storage = storage if storage is not None else get_storage(data_dir)
+        self.journal = DecisionJournal(os.path.join(data_dir, "decision_journal"))
+        # Storage revision and data version this process has caught up to
+        self._revision = 0
+        self._data_version = self.storage.data_version() if self.storage else 0
         self.decisions = self._load_decisions()
+        
+        # In-memory indexes: id -> decision, tag -> decisions, timestamp order
+        self._by_id = {}
+        self._by_tag = defaultdict(list)
+        self._by_tag_keys = defaultdict(list)
+        self._timeline_keys = []
+        self._timeline = []
+        self._similarity = BM25Index()
+        for dec in self.decisions:
+            self._index_decision(dec)
+        
+        self._listeners = []
+        
+        atexit.register(self.close)
     
     def add_decision(
         self,
@@ -27,57 +57,199 @@ class DecisionTracker:
         tags: List[str] = None
     ):
         """Record a decision with full context"""
-        decision_entry = {
-            "id": f"dec_{len(self.decisions)}",
-            "timestamp": datetime.now().isoformat(),
-            "decision": decision,
-            "reason": reason,
-            "alternatives": alternatives or [],
-            "constraints": constraints or {},
-            "outcome": outcome,
-            "tags": tags or [],
-            "context_snapshot": self._capture_context()
-        }
+        with self.lock:
+            self.refresh()
+            decision_entry = {
+                # Random, so server workers sharing one database never collide
+                "id": f"dec_{uuid.uuid4().hex[:12]}",
+                "timestamp": datetime.now().isoformat(),
+                "decision": decision,
+                "reason": reason,
+                "alternatives": alternatives or [],
+                "constraints": constraints or {},
+                "outcome": outcome,
+                "tags": tags or [],
+                "context_snapshot": self._capture_context()
+            }
         
-        self.decisions.append(decision_entry)
-        self._save_decisions()
+            # Persist first, so a failed write leaves memory untouched
+            if self.storage:
+                self.storage.insert_record("decisions", decision_entry, key=decision_entry["id"])
+            else:
+                self.journal.append(decision_entry)
+            self.decisions.append(decision_entry)
+            self._index_decision(decision_entry)
+            if not self.storage:
+                self._maybe_compact()
         
-        return decision_entry["id"]
+            self._notify("on_decision_added", decision_entry)
+            return decision_entry["id"]
     
     def update_outcome(self, decision_id: str, outcome: str):
         """Update the outcome of a past decision"""
-        for dec in self.decisions:
-            if dec["id"] == decision_id:
-                dec["outcome"] = outcome
-                dec["outcome_timestamp"] = datetime.now().isoformat()
-                break
+        with self.lock:
+            self.refresh()
+            dec = self._by_id.get(decision_id)
+            if dec is None:
+                return
+        
+            previous_outcome = dec.get("outcome")
+            fields = {
+                "outcome": outcome,
+                "outcome_timestamp": datetime.now().isoformat()
+            }
+            dec.update(fields)
+            if self.storage:
+                self.storage.update_record("decisions", decision_id, dec)
+            else:
+                self.journal.update(decision_id, fields)
+                self._maybe_compact()
+        
+            self._notify("on_outcome_updated", dec, previous_outcome)
+    
+    def add_listener(self, listener):
+        """Subscribe to changes
+        
+        The listener may define on_decision_added(decision) and
+        on_outcome_updated(decision, previous_outcome). Handlers run
+        with ``lock`` held, so they may update their own state without
+        locking and readers of that state can take ``lock`` too.
+        """
+        self._listeners.append(listener)
+    
+    def refresh(self):
+        """Pick up decisions other processes added or updated in shared storage
         
-        self._save_decisions()
+        Listeners hear about them as usual. Cheap when nothing changed: one
+        ``PRAGMA data_version`` query. Call with or without ``lock`` held.
+        """
+        if not self.storage:
+            return
+        with self.lock:
+            version = self.storage.data_version()
+            if version == self._data_version:
+                return
+            self._data_version = version
+            changed, self._revision = self.storage.load_changes("decisions", self._revision)
+            for record in changed:
+                dec = self._by_id.get(record["id"])
+                if dec is None:
+                    self.decisions.append(record)
+                    self._index_decision(record)
+                    self._notify("on_decision_added", record)
+                elif dec != record:
+                    previous_outcome = dec.get("outcome")
+                    dec.update(record)
+                    self._notify("on_outcome_updated", dec, previous_outcome)
+    
+    def flush(self):
+        """Force pending journal writes to disk"""
+        with self.lock:
+            if self.storage:
+                self.storage.flush()
+            else:
+                self.journal.sync()
+    
+    def close(self):
+        """Flush and close the journal"""
+        with self.lock:
+            self.journal.close()
+            atexit.unregister(self.close)
+    
+    def get_decision(self, decision_id: str) -> Optional[Dict]:
+        """Get a single decision by id"""
+        with self.lock:
+            self.refresh()
+            return self._by_id.get(decision_id)
     
     def get_recent_decisions(self, n: int = 10):
         """Get most recent decisions"""
-        return sorted(self.decisions, key=lambda x: x["timestamp"], reverse=True)[:n]
+        with self.lock:
+            self.refresh()
+            if n <= 0:
+                return []
+            return self._timeline[:-n - 1:-1]
     
-    def get_decisions_by_tag(self, tag: str):
-        """Get all decisions with a specific tag"""
-        return [d for d in self.decisions if tag in d.get("tags", [])]
+    def get_decisions_by_tag(self, tag: str, start=None, end=None):
+        """Get decisions with a specific tag in timestamp order, optionally start <= timestamp < end"""
+        with self.lock:
+            self.refresh()
+            if tag not in self._by_tag:
+                return []
+            return self._slice_between(self._by_tag_keys[tag], self._by_tag[tag], start, end)
     
     def get_decision_timeline(self):
         """Get chronological decision timeline"""
-        return sorted(self.decisions, key=lambda x: x["timestamp"])
+        with self.lock:
+            self.refresh()
+            return list(self._timeline)
+    
+    def get_decisions_between(self, start=None, end=None):
+        """Get decisions with start <= timestamp < end (datetimes or ISO strings)"""
+        with self.lock:
+            self.refresh()
+            return self._slice_between(self._timeline_keys, self._timeline, start, end)
     
-    def find_similar_decisions(self, current_decision: str):
-        """Find past decisions similar to current one (simple keyword matching)"""
-        keywords = set(current_decision.lower().split())
-        similar = []
+    @staticmethod
+    def _slice_between(keys, decisions, start, end):
+        """Slice of a timestamp-sorted list with start <= timestamp < end"""
+        if isinstance(start, datetime):
+            start = start.isoformat()
+        if isinstance(end, datetime):
+            end = end.isoformat()
         
-        for dec in self.decisions:
-            dec_keywords = set(dec["decision"].lower().split())
-            overlap = len(keywords & dec_keywords)
-            if overlap > 2:
-                similar.append((dec, overlap))
+        lo = bisect.bisect_left(keys, start) if start else 0
+        hi = bisect.bisect_left(keys, end) if end else len(decisions)
+        return decisions[lo:hi]
+    
+    def find_similar_decisions(
+        self,
+        current_decision: str,
+        limit: int = 10,
+        min_score: float = 0.0,
+        where=None,
+        min_shared_words: int = 3
+    ):
+        """Find past decisions similar to current one, ranked by BM25 score
         
-        return sorted(similar, key=lambda x: x[1], reverse=True)
+        Returns (decision, score) pairs, best first. A match must share at
+        least ``min_shared_words`` distinct non-stop words with the query,
+        which keeps the old "more than 2 words in common" precision.
+        ``where`` optionally filters candidate decisions before ranking.
+        """
+        with self.lock:
+            self.refresh()
+            by_id = self._by_id
+            matches = self._similarity.search(
+                current_decision,
+                limit=limit,
+                min_score=min_score,
+                where=(lambda dec_id: where(by_id[dec_id])) if where else None,
+                min_shared_terms=min_shared_words
+            )
+            return [(by_id[dec_id], score) for dec_id, score in matches]
+    
+    def _notify(self, event: str, *args):
+        """Call an event handler on every listener that defines it"""
+        for listener in self._listeners:
+            handler = getattr(listener, event, None)
+            if handler is not None:
+                handler(*args)
+    
+    def _index_decision(self, dec: Dict):
+        """Add a decision to the id, tag and timeline indexes"""
+        self._by_id[dec["id"]] = dec
+        self._similarity.add(dec["id"], dec.get("decision") or "")
+        # Decisions almost always arrive in order, so these are appends
+        for tag in set(dec.get("tags", [])):
+            self._insert_in_order(self._by_tag_keys[tag], self._by_tag[tag], dec)
+        self._insert_in_order(self._timeline_keys, self._timeline, dec)
+    
+    @staticmethod
+    def _insert_in_order(keys, decisions, dec):
+        pos = bisect.bisect_right(keys, dec["timestamp"])
+        keys.insert(pos, dec["timestamp"])
+        decisions.insert(pos, dec)
     
     def _capture_context(self):
         """Capture current context snapshot"""
@@ -87,14 +259,33 @@ class DecisionTracker:
         }
     
     def _load_decisions(self):
-        """Load decisions from disk"""
+        """Load decisions from the storage engine or by replaying the journal"""
+        if self.storage:
+            decisions, self._revision = self.storage.load_changes("decisions")
+            if decisions or not self.journal.exists():
+                return decisions
+            
+            # Switching an existing JSON data directory over to the engine
+            replayed = self.journal.replay()
+            if not replayed:
+                return decisions
+            with self.storage.batch():
+                for dec in replayed:
+                    self.storage.insert_record("decisions", dec, key=dec["id"])
+            return self._load_decisions()
+        
+        if self.journal.exists():
+            return self.journal.replay()
+        
+        # Migrate a legacy decisions.json into the journal once
         if os.path.exists(self.decisions_file):
             with open(self.decisions_file, 'r') as f:
-                return json.load(f)
+                decisions = json.load(f)
+            self.journal.compact(decisions)
+            return decisions
         return []
     
-    def _save_decisions(self):
-        """Save decisions to disk"""
-        os.makedirs(self.data_dir, exist_ok=True)
-        with open(self.decisions_file, 'w') as f:
-            json.dump(self.decisions, f, indent=2)
+    def _maybe_compact(self):
+        """Periodically fold the journal into a snapshot"""
+        if self.journal.should_compact(len(self.decisions)):
+            self.journal.compact(self.decisions)
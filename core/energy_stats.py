@@ -0,0 +1,123 @@
+"""
+📈 ENERGY STATS - Streaming aggregates for learned energy patterns
+Constant-size, JSON-friendly summaries updated one reading at a time
+"""
+
+import math
+from typing import Dict, Iterable, List, Optional
+
+
+# Recency weight of the EWMA; matches the old "last 30 readings" window
+WINDOW = 30
+ALPHA = 2 / (WINDOW + 1)
+
+# Quantile sketch: fixed-width histogram over the 0-100 energy scale
+BIN_WIDTH = 5
+BINS = 100 // BIN_WIDTH
+
+Z_95 = 1.96
+
+
+def new_stat() -> Dict:
+    """An empty aggregate"""
+    return {"count": 0, "ewma": 0.0, "ewvar": 0.0, "mean": 0.0, "m2": 0.0, "bins": [0] * BINS}
+
+
+def update(stat: Dict, value: float) -> Dict:
+    """Fold one reading into an aggregate in place"""
+    value = min(100.0, max(0.0, float(value)))
+    stat["count"] += 1
+    n = stat["count"]
+
+    # Welford's online mean and sum of squared deviations
+    delta = value - stat["mean"]
+    stat["mean"] += delta / n
+    stat["m2"] += delta * (value - stat["mean"])
+
+    # Exponentially weighted mean and variance with the same recency weight
+    if n == 1:
+        stat["ewma"], stat["ewvar"] = value, 0.0
+    else:
+        diff = value - stat["ewma"]
+        stat["ewma"] += ALPHA * diff
+        stat["ewvar"] = (1 - ALPHA) * (ew_variance(stat) + ALPHA * diff * diff)
+    stat["bins"][min(BINS - 1, int(value // BIN_WIDTH))] += 1
+    return stat
+
+
+def from_readings(readings: Iterable[float]) -> Dict:
+    """Aggregate a legacy list of raw readings, oldest first"""
+    stat = new_stat()
+    for value in readings:
+        update(stat, value)
+    return stat
+
+
+def variance(stat: Dict) -> float:
+    n = stat["count"]
+    return stat["m2"] / (n - 1) if n > 1 else 0.0
+
+
+def ew_variance(stat: Dict) -> float:
+    """Recency-weighted variance; aggregates saved before it existed fall back to the all-time one"""
+    return stat["ewvar"] if "ewvar" in stat else variance(stat)
+
+
+def quantile(stat: Dict, q: float) -> Optional[float]:
+    """Approximate quantile, interpolated within the histogram bin"""
+    n = stat["count"]
+    if n == 0:
+        return None
+
+    target = q * n
+    seen = 0
+    for i, count in enumerate(stat["bins"]):
+        if count and seen + count >= target:
+            return i * BIN_WIDTH + BIN_WIDTH * (target - seen) / count
+        seen += count
+    return 100.0
+
+
+def summarize(stat: Dict) -> Dict:
+    """Typical level with a 95% prediction interval and the spread of readings.
+
+    The level and std are recency weighted (EWMA and EW variance), so
+    recent days count most. ``low``-``high`` is where a single new reading
+    should fall 95% of the time, not the uncertainty of the mean.
+    """
+    n = stat["count"]
+    std = math.sqrt(ew_variance(stat))
+    margin = Z_95 * std
+    level = stat["ewma"]
+    return {
+        "mean": round(level, 1),
+        "low": round(max(0.0, level - margin), 1),
+        "high": round(min(100.0, level + margin), 1),
+        "std": round(std, 1),
+        "p10": _rounded(quantile(stat, 0.1)),
+        "p50": _rounded(quantile(stat, 0.5)),
+        "p90": _rounded(quantile(stat, 0.9)),
+        "count": n
+    }
+
+
+def typical(stat: Dict) -> float:
+    """Typical energy for an aggregate (its EWMA)"""
+    return stat["ewma"]
+
+
+def means_by_hour(patterns: Dict[str, Dict]) -> Dict[str, int]:
+    """Hour -> rounded typical energy, for prompts and display"""
+    return {hour: round(typical(stat)) for hour, stat in sorted(patterns.items(), key=lambda item: int(item[0]))}
+
+
+def migrate(patterns: Dict) -> List[str]:
+    """Convert legacy raw-reading lists to aggregates in place; returns converted keys"""
+    converted = [key for key, value in patterns.items() if isinstance(value, list)]
+    for key in converted:
+        patterns[key] = from_readings(patterns[key])
+    return converted
+
+
+def _rounded(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 1)
@@ -0,0 +1,114 @@
+"""
+⏱️ EVENT BUFFERS - Time-windowed counts for high-rate input events
+Array-backed timestamp rings and per-second cumulative counters
+"""
+
+from array import array
+from typing import List, Optional, Tuple
+
+
+class TimestampRing:
+    """Fixed-size ring of monotonic float timestamps, oldest first.
+
+    Timestamps must be appended in non-decreasing order by a single writer.
+    Because the ring stays sorted, the number of events after a cutoff is a
+    binary search rather than a scan.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self._times = array('d', bytes(8 * capacity))
+        self._written = 0
+
+    def __len__(self):
+        return min(self._written, self.capacity)
+
+    def append(self, timestamp: float):
+        self._times[self._written % self.capacity] = timestamp
+        self._written += 1
+
+    @property
+    def written(self) -> int:
+        """Total timestamps ever appended; a cursor for read_since"""
+        return self._written
+
+    def read_since(self, cursor: int) -> Tuple[List[float], int]:
+        """Timestamps appended after ``cursor`` and the new cursor.
+
+        Timestamps the writer has already overwritten are skipped; callers
+        that need exact counts use the cursor difference instead.
+        """
+        times, capacity = self._times, self.capacity
+        written = self._written
+        start = max(cursor, written - capacity)
+        return [times[i % capacity] for i in range(start, written)], written
+
+    def latest(self) -> Optional[float]:
+        """Most recent timestamp, or None when empty"""
+        if self._written == 0:
+            return None
+        return self._times[(self._written - 1) % self.capacity]
+
+    def count_since(self, cutoff: float) -> int:
+        """Number of buffered timestamps strictly after ``cutoff``"""
+        times, capacity = self._times, self.capacity
+        written = self._written
+        lo = written - min(written, capacity)
+        hi = written
+
+        # First logical index whose timestamp is after the cutoff
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if times[mid % capacity] > cutoff:
+                hi = mid
+            else:
+                lo = mid + 1
+        return written - lo
+
+
+class SecondCounter:
+    """Event counts bucketed per second over a sliding horizon.
+
+    Each slot holds the running total as of the end of its second, so the
+    number of events in the last N seconds is one subtraction. Seconds
+    without events are back-filled by the writer when it next advances, and
+    queries only read, so a query can run alongside the writer thread.
+    """
+
+    def __init__(self, horizon: int = 3600):
+        self.horizon = horizon
+        self.total = 0
+        self._cumulative = array('q', bytes(8 * horizon))
+        self._second = None
+
+    def add(self, timestamp: float, count: int = 1):
+        """Count events at a monotonic timestamp"""
+        self._advance(int(timestamp))
+        self.total += count
+        self._cumulative[self._second % self.horizon] = self.total
+
+    def count_since(self, seconds: float, now: float) -> int:
+        """Events in the ``seconds`` before ``now``, up to the horizon"""
+        last = self._second
+        if last is None:
+            return 0
+
+        start = int(now) - int(seconds)
+        if start >= last:
+            return 0
+        start = max(start, last - self.horizon + 1)
+        return self.total - self._cumulative[start % self.horizon]
+
+    def _advance(self, second: int):
+        """Carry the running total forward through seconds with no events"""
+        last = self._second
+        if last is None:
+            self._second = second
+            return
+        if second <= last:
+            return
+
+        cumulative, horizon, total = self._cumulative, self.horizon, self.total
+        for skipped in range(max(last + 1, second - horizon + 1), second):
+            cumulative[skipped % horizon] = total
+        self._second = second
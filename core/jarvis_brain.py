@@ -5,10 +5,13 @@ Makes the twin truly conversational and intelligent like JARVIS
 
 import os
 import json
+import threading
 from datetime import datetime
 from openai import OpenAI
 from anthropic import Anthropic
 
+from core import energy_stats
+
 
 class JarvisBrain:
     """AI-powered conversational intelligence"""
@@ -32,8 +35,9 @@ class JarvisBrain:
         else:
             self.provider = None
         
-        # Conversation memory
+        # Conversation memory; the lock is never held during an API call
         self.conversation_history = []
+        self._history_lock = threading.Lock()
         self.max_history = 20
     
     def is_available(self):
@@ -78,9 +82,9 @@ You speak like JARVIS from Iron Man - sophisticated, slightly dry humor, extreme
         # Add learned patterns
         if user_profile.get('energy_patterns'):
             base += "\n\nLearned Energy Patterns:"
-            for hour, readings in list(user_profile['energy_patterns'].items())[:5]:
-                avg = sum(readings) / len(readings)
-                base += f"\n- {hour}:00 → {avg:.0f}% energy"
+            for hour, stat in list(user_profile['energy_patterns'].items())[:5]:
+                summary = energy_stats.summarize(stat)
+                base += f"\n- {hour}:00 → {summary['mean']:.0f}% energy (usually {summary['p10']:.0f}-{summary['p90']:.0f}%)"
         
         if user_profile.get('decision_style'):
             top_keywords = sorted(user_profile['decision_style'].items(), 
@@ -109,27 +113,30 @@ You speak like JARVIS from Iron Man - sophisticated, slightly dry humor, extreme
         # Build system prompt
         system_prompt = self._build_system_prompt(user_profile, current_state, context)
         
-        # Add to conversation history
-        self.conversation_history.append({
-            "role": "user",
-            "content": message
-        })
-        
-        # Keep history manageable
-        if len(self.conversation_history) > self.max_history:
-            self.conversation_history = self.conversation_history[-self.max_history:]
+        with self._history_lock:
+            # Add to conversation history
+            self.conversation_history.append({
+                "role": "user",
+                "content": message
+            })
+            
+            # Keep history manageable
+            if len(self.conversation_history) > self.max_history:
+                self.conversation_history = self.conversation_history[-self.max_history:]
+            history = list(self.conversation_history)
         
         try:
             if self.provider == 'openai':
-                response = self._chat_openai(system_prompt)
+                response = self._chat_openai(system_prompt, history)
             else:
-                response = self._chat_anthropic(system_prompt)
+                response = self._chat_anthropic(system_prompt, history)
             
             # Add to history
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": response
-            })
+            with self._history_lock:
+                self.conversation_history.append({
+                    "role": "assistant",
+                    "content": response
+                })
             
             return response
             
@@ -137,10 +144,10 @@ You speak like JARVIS from Iron Man - sophisticated, slightly dry humor, extreme
             print(f"AI Error: {e}")
             return self._fallback_response(message, context)
     
-    def _chat_openai(self, system_prompt):
+    def _chat_openai(self, system_prompt, history):
         """Chat using OpenAI"""
         messages = [{"role": "system", "content": system_prompt}]
-        messages.extend(self.conversation_history)
+        messages.extend(history)
         
         response = self.openai_client.chat.completions.create(
             model=self.model,
@@ -151,14 +158,14 @@ You speak like JARVIS from Iron Man - sophisticated, slightly dry humor, extreme
         
         return response.choices[0].message.content
     
-    def _chat_anthropic(self, system_prompt):
+    def _chat_anthropic(self, system_prompt, history):
         """Chat using Anthropic"""
         response = self.anthropic_client.messages.create(
             model=self.model,
             max_tokens=500,
             temperature=0.8,
             system=system_prompt,
-            messages=self.conversation_history
+            messages=history
         )
         
         return response.content[0].text
@@ -234,7 +241,7 @@ Current State:
 - Time: {datetime.now().strftime('%H:%M')}
 
 Recent patterns detected:
-{json.dumps(user_profile.get('energy_patterns', {}), indent=2)[:500]}
+{json.dumps(energy_stats.means_by_hour(user_profile.get('energy_patterns', {})), indent=2)[:500]}
 
 Generate a JARVIS-style proactive insight. Be:
 - Observant and intelligent
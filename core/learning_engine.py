@@ -3,29 +3,58 @@
 Makes the twin learn from interactions and become more intelligent over time
 """
 
+import copy
 import json
 import os
+import threading
 from datetime import datetime, timedelta
 from collections import defaultdict
 import random
 
+from core import energy_stats
+from core.storage import get_storage, write_json_atomic
+from core.write_behind import get_flusher
+
 
 class LearningEngine:
-    """Learns from user behavior and adapts responses"""
+    """Learns from user behavior and adapts responses.
+
+    Profile and interaction changes are buffered in memory and written by
+    the background flusher, so learning never rewrites files on the request
+    path. A burst of FLUSH_EVERY interactions asks for an early flush.
+    """
+    
+    FLUSH_EVERY = 50
+    MIN_WEEKDAY_SAMPLES = 5  # Below this a weekday-hour defers to the plain hour
     
-    def __init__(self, data_dir="data"):
+    def __init__(self, data_dir="data", storage=None):
         self.data_dir = data_dir
+        self.storage = storage if storage is not None else get_storage(data_dir)
         self.profile_file = f"{data_dir}/user_profile.json"
         self.interactions_file = f"{data_dir}/interactions.json"
         self.insights_file = f"{data_dir}/insights.json"
         
+        # Guards the profile, interactions and insights and their files
+        self._lock = threading.RLock()
         self.profile = self._load_profile()
         self.interactions = self._load_interactions()
         self.insights = self._load_insights()
+        
+        # Write-behind state: flushes are serialised by their own lock so
+        # learning only waits for the in-memory snapshot, never for the disk
+        self._flush_lock = threading.Lock()
+        self._profile_dirty = self._migrate_energy_patterns()
+        self._unsaved_interactions = 0
+        self._flusher = get_flusher()
+        self._flusher.register(self)
     
     def _load_profile(self):
         """Load user profile"""
-        if os.path.exists(self.profile_file):
+        if self.storage:
+            profile = self.storage.load_document("user_profile")
+            if profile is not None:
+                return profile
+        elif os.path.exists(self.profile_file):
             with open(self.profile_file, 'r') as f:
                 return json.load(f)
         
@@ -36,7 +65,8 @@ class LearningEngine:
             "personality_traits": {},
             "work_style": {},
             "decision_style": {},
-            "energy_patterns": {},
+            "energy_patterns": {},  # Hour -> energy_stats aggregate
+            "energy_by_weekday": {},  # Day name -> hour -> aggregate
             "stress_triggers": [],
             "flow_triggers": [],
             "best_times": {},
@@ -44,8 +74,16 @@ class LearningEngine:
             "relationship_level": 0  # How well the twin knows you
         }
     
+    def _migrate_energy_patterns(self):
+        """Fold profiles saved with raw per-hour readings into aggregates"""
+        self.profile.setdefault("energy_by_weekday", {})
+        return bool(energy_stats.migrate(self.profile["energy_patterns"]))
+    
     def _load_interactions(self):
         """Load interaction history"""
+        if self.storage:
+            return self._load_records("interactions")
+        
         if os.path.exists(self.interactions_file):
             with open(self.interactions_file, 'r') as f:
                 return json.load(f)
@@ -53,48 +91,115 @@ class LearningEngine:
     
     def _load_insights(self):
         """Load generated insights"""
+        if self.storage:
+            return self._load_records("insights")
+        
         if os.path.exists(self.insights_file):
             with open(self.insights_file, 'r') as f:
                 return json.load(f)
         return []
     
-    def _save_profile(self):
+    def _load_records(self, collection):
+        """Load a record collection, importing the legacy JSON list once"""
+        records = self.storage.load_records(collection)
+        legacy = os.path.join(self.data_dir, f"{collection}.json")
+        if not records and os.path.exists(legacy):
+            with open(legacy, 'r') as f:
+                records = json.load(f)
+            with self.storage.batch():
+                for record in records:
+                    self.storage.insert_record(collection, record)
+        return records
+    
+    def _save_profile(self, profile):
         """Save user profile"""
-        os.makedirs(self.data_dir, exist_ok=True)
-        with open(self.profile_file, 'w') as f:
-            json.dump(self.profile, f, indent=2)
+        if self.storage:
+            self.storage.save_document("user_profile", profile)
+            return
+        
+        write_json_atomic(self.profile_file, profile, indent=2)
+    
+    def _save_interactions(self, interactions):
+        """Save interactions (only the new ones when backed by records)"""
+        if self.storage:
+            with self.storage.batch():
+                for interaction in interactions:
+                    self.storage.insert_record("interactions", interaction)
+                self.storage.trim_records("interactions", 1000)
+            return
+        
+        write_json_atomic(self.interactions_file, interactions, indent=2)
+    
+    def flush(self):
+        """Write buffered profile and interaction changes, if any"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._profile_dirty and not self._unsaved_interactions:
+                    return
+                profile = copy.deepcopy(self.profile) if self._profile_dirty else None
+                unsaved = self._unsaved_interactions
+                if not unsaved:
+                    interactions = None
+                elif self.storage:
+                    interactions = self.interactions[-min(unsaved, 1000):]
+                else:
+                    interactions = self.interactions[-1000:]  # Keep last 1000
+                self._profile_dirty = False
+                self._unsaved_interactions = 0
+            
+            try:
+                if interactions is not None:
+                    self._save_interactions(interactions)
+                if profile is not None:
+                    self._save_profile(profile)
+            except Exception:
+                # Leave the changes pending so the next flush retries them
+                with self._lock:
+                    self._profile_dirty = self._profile_dirty or profile is not None
+                    self._unsaved_interactions += unsaved
+                raise
     
-    def _save_interactions(self):
-        """Save interactions"""
-        os.makedirs(self.data_dir, exist_ok=True)
-        with open(self.interactions_file, 'w') as f:
-            json.dump(self.interactions[-1000:], f, indent=2)  # Keep last 1000
+    def close(self):
+        """Flush pending writes and stop background flushing"""
+        self._flusher.unregister(self)
+        self.flush()
     
     def _save_insights(self):
         """Save insights"""
-        os.makedirs(self.data_dir, exist_ok=True)
-        with open(self.insights_file, 'w') as f:
-            json.dump(self.insights[-100:], f, indent=2)  # Keep last 100
+        if self.storage:
+            with self.storage.batch():
+                self.storage.insert_record("insights", self.insights[-1])
+                self.storage.trim_records("insights", 100)
+            return
+        
+        write_json_atomic(self.insights_file, self.insights[-100:], indent=2)  # Keep last 100
     
     def learn_from_interaction(self, interaction_type, data):
         """Learn from user interaction"""
-        interaction = {
-            "type": interaction_type,
-            "data": data,
-            "timestamp": datetime.now().isoformat(),
-            "hour": datetime.now().hour,
-            "day_of_week": datetime.now().strftime("%A")
-        }
+        with self._lock:
+            # A private copy: callers keep editing their dicts, and the
+            # background flusher serializes this one outside the lock
+            interaction = {
+                "type": interaction_type,
+                "data": copy.deepcopy(data),
+                "timestamp": datetime.now().isoformat(),
+                "hour": datetime.now().hour,
+                "day_of_week": datetime.now().strftime("%A")
+            }
+        
+            self.interactions.append(interaction)
+            self._unsaved_interactions += 1
         
-        self.interactions.append(interaction)
-        self._save_interactions()
+            # Update profile based on interaction
+            self._update_profile(interaction)
         
-        # Update profile based on interaction
-        self._update_profile(interaction)
+            # Increase relationship level
+            self.profile["relationship_level"] = min(100, self.profile["relationship_level"] + 0.1)
+            self._profile_dirty = True
+            flush_soon = self._unsaved_interactions >= self.FLUSH_EVERY
         
-        # Increase relationship level
-        self.profile["relationship_level"] = min(100, self.profile["relationship_level"] + 0.1)
-        self._save_profile()
+        if flush_soon:
+            self._flusher.wake()
     
     def _update_profile(self, interaction):
         """Update profile based on interaction"""
@@ -105,13 +210,12 @@ class LearningEngine:
         # Learn energy patterns
         if itype == "state_check":
             energy = data.get("energy_level", 50)
-            if hour not in self.profile["energy_patterns"]:
-                self.profile["energy_patterns"][str(hour)] = []
-            self.profile["energy_patterns"][str(hour)].append(energy)
-            
-            # Keep only last 30 readings per hour
-            self.profile["energy_patterns"][str(hour)] = \
-                self.profile["energy_patterns"][str(hour)][-30:]
+            by_hour = self.profile["energy_patterns"]
+            by_day = self.profile["energy_by_weekday"].setdefault(interaction["day_of_week"], {})
+            for patterns in (by_hour, by_day):
+                if str(hour) not in patterns:
+                    patterns[str(hour)] = energy_stats.new_stat()
+                energy_stats.update(patterns[str(hour)], energy)
         
         # Learn decision patterns
         elif itype == "decision":
@@ -131,160 +235,194 @@ class LearningEngine:
             time_of_day = "morning" if hour < 12 else "afternoon" if hour < 17 else "evening"
             if time_of_day not in self.profile["flow_triggers"]:
                 self.profile["flow_triggers"].append(time_of_day)
-        
-        self._save_profile()
+    
+    def _energy_stat(self, hour, day=None):
+        """Aggregate for a weekday-hour when it has enough data, else for the hour"""
+        if day:
+            stat = self.profile["energy_by_weekday"].get(day, {}).get(str(hour))
+            if stat and stat["count"] >= self.MIN_WEEKDAY_SAMPLES:
+                return stat
+        return self.profile["energy_patterns"].get(str(hour))
+    
+    def energy_forecast(self, hour, day=None):
+        """Typical energy at an hour with a 95% range for the next reading, or None if unseen"""
+        with self._lock:
+            stat = self._energy_stat(hour, day)
+            return energy_stats.summarize(stat) if stat else None
     
     def generate_insight(self):
         """Generate a new insight about the user"""
-        if len(self.interactions) < 10:
-            return None
+        with self._lock:
+            if len(self.interactions) < 10:
+                return None
         
-        insights = []
+            insights = []
         
-        # Energy pattern insights
-        if self.profile["energy_patterns"]:
-            avg_by_hour = {}
-            for hour, readings in self.profile["energy_patterns"].items():
-                avg_by_hour[int(hour)] = sum(readings) / len(readings)
+            # Energy pattern insights
+            if self.profile["energy_patterns"]:
+                avg_by_hour = {
+                    int(hour): energy_stats.typical(stat)
+                    for hour, stat in self.profile["energy_patterns"].items()
+                }
             
-            if avg_by_hour:
-                best_hour = max(avg_by_hour, key=avg_by_hour.get)
-                worst_hour = min(avg_by_hour, key=avg_by_hour.get)
+                if avg_by_hour:
+                    best_hour = max(avg_by_hour, key=avg_by_hour.get)
+                    worst_hour = min(avg_by_hour, key=avg_by_hour.get)
                 
-                insights.append({
-                    "type": "energy_pattern",
-                    "message": f"You're most energetic around {best_hour}:00 and least energetic around {worst_hour}:00",
-                    "actionable": f"Schedule important work around {best_hour}:00",
-                    "confidence": min(100, len(self.interactions) / 10)
-                })
+                    insights.append({
+                        "type": "energy_pattern",
+                        "message": f"You're most energetic around {best_hour}:00 and least energetic around {worst_hour}:00",
+                        "actionable": f"Schedule important work around {best_hour}:00",
+                        "confidence": min(100, len(self.interactions) / 10)
+                    })
         
-        # Decision pattern insights
-        if self.profile["decision_style"]:
-            top_words = sorted(self.profile["decision_style"].items(), 
-                             key=lambda x: x[1], reverse=True)[:3]
+            # Decision pattern insights
+            if self.profile["decision_style"]:
+                top_words = sorted(self.profile["decision_style"].items(), 
+                                 key=lambda x: x[1], reverse=True)[:3]
             
-            if top_words:
-                words = ", ".join([w[0] for w in top_words])
+                if top_words:
+                    words = ", ".join([w[0] for w in top_words])
+                    insights.append({
+                        "type": "decision_pattern",
+                        "message": f"Your decisions often involve: {words}",
+                        "actionable": "You tend to focus on these areas consistently",
+                        "confidence": min(100, len(self.interactions) / 5)
+                    })
+        
+            # Relationship insight
+            level = self.profile["relationship_level"]
+            if level > 20 and level < 25:
                 insights.append({
-                    "type": "decision_pattern",
-                    "message": f"Your decisions often involve: {words}",
-                    "actionable": "You tend to focus on these areas consistently",
-                    "confidence": min(100, len(self.interactions) / 5)
+                    "type": "relationship",
+                    "message": "I'm starting to understand your patterns",
+                    "actionable": "Keep using me daily for better insights",
+                    "confidence": level
+                })
+            elif level > 50 and level < 55:
+                insights.append({
+                    "type": "relationship",
+                    "message": "I know you pretty well now",
+                    "actionable": "My predictions should be quite accurate",
+                    "confidence": level
                 })
         
-        # Relationship insight
-        level = self.profile["relationship_level"]
-        if level > 20 and level < 25:
-            insights.append({
-                "type": "relationship",
-                "message": "I'm starting to understand your patterns",
-                "actionable": "Keep using me daily for better insights",
-                "confidence": level
-            })
-        elif level > 50 and level < 55:
-            insights.append({
-                "type": "relationship",
-                "message": "I know you pretty well now",
-                "actionable": "My predictions should be quite accurate",
-                "confidence": level
-            })
-        
-        if insights:
-            insight = random.choice(insights)
-            insight["timestamp"] = datetime.now().isoformat()
-            insight["id"] = len(self.insights)
+            if insights:
+                insight = random.choice(insights)
+                insight["timestamp"] = datetime.now().isoformat()
+                insight["id"] = len(self.insights)
             
-            self.insights.append(insight)
-            self._save_insights()
+                self.insights.append(insight)
+                self._save_insights()
             
-            return insight
+                return insight
         
-        return None
+            return None
     
     def get_personalized_greeting(self):
         """Get personalized greeting based on learning"""
-        hour = datetime.now().hour
-        level = self.profile["relationship_level"]
+        with self._lock:
+            hour = datetime.now().hour
+            level = self.profile["relationship_level"]
         
-        # Base greeting
-        if hour < 12:
-            base = "Good morning"
-        elif hour < 17:
-            base = "Good afternoon"
-        else:
-            base = "Good evening"
+            # Base greeting
+            if hour < 12:
+                base = "Good morning"
+            elif hour < 17:
+                base = "Good afternoon"
+            else:
+                base = "Good evening"
         
-        # Personalization based on relationship level
-        if level < 10:
-            return f"{base}! I'm learning about you..."
-        elif level < 30:
-            return f"{base}! I'm starting to understand your patterns."
-        elif level < 60:
-            return f"{base}! I know you pretty well now."
-        else:
-            return f"{base}! I know you like the back of my hand."
+            # Personalization based on relationship level
+            if level < 10:
+                return f"{base}! I'm learning about you..."
+            elif level < 30:
+                return f"{base}! I'm starting to understand your patterns."
+            elif level < 60:
+                return f"{base}! I know you pretty well now."
+            else:
+                return f"{base}! I know you like the back of my hand."
     
     def get_smart_recommendation(self, current_state):
         """Get smart recommendation based on learned patterns"""
-        hour = datetime.now().hour
-        energy = current_state.get("energy_level", 50)
-        stress = current_state.get("stress_level", 50)
+        with self._lock:
+            now = datetime.now()
+            hour = now.hour
+            energy = current_state.get("energy_level", 50)
+            stress = current_state.get("stress_level", 50)
         
-        # Check learned energy patterns
-        if str(hour) in self.profile["energy_patterns"]:
-            typical_energy = sum(self.profile["energy_patterns"][str(hour)]) / \
-                           len(self.profile["energy_patterns"][str(hour)])
+            # Check learned energy patterns
+            stat = self._energy_stat(hour, now.strftime("%A"))
+            if stat:
+                typical_energy = energy_stats.typical(stat)
             
-            if energy < typical_energy - 20:
-                return f"Your energy is unusually low for {hour}:00. Something's off today."
-            elif energy > typical_energy + 20:
-                return f"You're more energetic than usual! Great time for challenging work."
+                if energy < typical_energy - 20:
+                    return f"Your energy is unusually low for {hour}:00. Something's off today."
+                elif energy > typical_energy + 20:
+                    return f"You're more energetic than usual! Great time for challenging work."
         
-        # Default recommendations
-        if energy < 30:
-            return "Energy critically low. Take a break or rest."
-        elif stress > 70:
-            return "High stress detected. Consider a short walk or breathing exercise."
-        elif energy > 70 and stress < 30:
-            return "Perfect state for deep work. Start your flow session!"
-        else:
-            return "You're doing okay. Stay consistent."
+            # Default recommendations
+            if energy < 30:
+                return "Energy critically low. Take a break or rest."
+            elif stress > 70:
+                return "High stress detected. Consider a short walk or breathing exercise."
+            elif energy > 70 and stress < 30:
+                return "Perfect state for deep work. Start your flow session!"
+            else:
+                return "You're doing okay. Stay consistent."
     
     def predict_next_state(self, current_hour):
         """Predict state for next hour based on patterns"""
-        next_hour = (current_hour + 1) % 24
+        with self._lock:
+            next_hour = (current_hour + 1) % 24
+            now = datetime.now()
+            # Hours earlier than now fall on tomorrow
+            day = (now + timedelta(days=1) if next_hour < now.hour else now).strftime("%A")
+            forecast = self.energy_forecast(next_hour, day)
+        
+            if forecast:
+                predicted_energy = round(forecast["mean"])
+                return {
+                    "hour": next_hour,
+                    "predicted_energy": predicted_energy,
+                    "interval": [round(forecast["low"]), round(forecast["high"])],
+                    "confidence": min(100, forecast["count"] * 5),
+                    "message": f"At {next_hour}:00, your energy will likely be around {predicted_energy}%, "
+                               f"usually between {round(forecast['low'])}% and {round(forecast['high'])}%"
+                }
         
-        if str(next_hour) in self.profile["energy_patterns"]:
-            readings = self.profile["energy_patterns"][str(next_hour)]
-            predicted_energy = sum(readings) / len(readings)
-            
             return {
                 "hour": next_hour,
-                "predicted_energy": round(predicted_energy),
-                "confidence": min(100, len(readings) * 5),
-                "message": f"At {next_hour}:00, your energy will likely be around {round(predicted_energy)}%"
+                "predicted_energy": 50,
+                "confidence": 0,
+                "message": "Not enough data to predict next hour"
             }
-        
-        return {
-            "hour": next_hour,
-            "predicted_energy": 50,
-            "confidence": 0,
-            "message": "Not enough data to predict next hour"
-        }
     
     def get_recent_insights(self, limit=5):
         """Get recent insights"""
-        return self.insights[-limit:]
+        with self._lock:
+            return self.insights[-limit:]
     
     def get_profile_summary(self):
         """Get profile summary"""
-        return {
-            "relationship_level": self.profile["relationship_level"],
-            "total_interactions": len(self.interactions),
-            "insights_generated": len(self.insights),
-            "patterns_learned": {
-                "energy_hours": len(self.profile["energy_patterns"]),
-                "decision_keywords": len(self.profile["decision_style"]),
-                "flow_triggers": len(self.profile["flow_triggers"])
+        with self._lock:
+            return {
+                "relationship_level": self.profile["relationship_level"],
+                "total_interactions": len(self.interactions),
+                "insights_generated": len(self.insights),
+                "patterns_learned": {
+                    "energy_hours": len(self.profile["energy_patterns"]),
+                    "decision_keywords": len(self.profile["decision_style"]),
+                    "flow_triggers": len(self.profile["flow_triggers"])
+                }
             }
-        }
+    
+    def profile_snapshot(self):
+        """Copy of the profile that is safe to read while learning continues"""
+        with self._lock:
+            return copy.deepcopy(self.profile)
+    
+    def recent_interactions(self, limit=20):
+        """Copy of the latest interactions"""
+        with self._lock:
+            return self.interactions[-limit:]
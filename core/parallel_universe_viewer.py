@@ -3,6 +3,7 @@
 Live simulation of alternate versions of you making different choices
 """
 
+import threading
 from datetime import datetime
 from typing import Dict, List
 import random
@@ -36,6 +37,7 @@ class ParallelUniverseViewer:
     }
     
     def __init__(self):
+        self._lock = threading.RLock()
         self.universes = {
             "cautious": {"score": 0, "decisions": [], "state": "stable"},
             "ambitious": {"score": 0, "decisions": [], "state": "stable"},
@@ -45,30 +47,31 @@ class ParallelUniverseViewer:
         
     def present_decision(self, decision_prompt: str, context: Dict) -> Dict:
         """Present a decision to all three versions"""
-        responses = {}
-        
-        for persona_key, persona in self.PERSONAS.items():
-            response = self._simulate_persona_decision(
+        responses = {
+            persona_key: self._simulate_persona_decision(
                 persona_key, 
                 decision_prompt, 
                 context
             )
-            responses[persona_key] = response
+            for persona_key in self.PERSONAS
+        }
+        
+        with self._lock:
+            for persona_key, response in responses.items():
+                # Log decision
+                self.universes[persona_key]["decisions"].append({
+                    "prompt": decision_prompt,
+                    "choice": response["choice"],
+                    "reasoning": response["reasoning"],
+                    "timestamp": datetime.now()
+                })
             
-            # Log decision
-            self.universes[persona_key]["decisions"].append({
+            self.current_day_decisions.append({
                 "prompt": decision_prompt,
-                "choice": response["choice"],
-                "reasoning": response["reasoning"],
+                "responses": responses,
                 "timestamp": datetime.now()
             })
         
-        self.current_day_decisions.append({
-            "prompt": decision_prompt,
-            "responses": responses,
-            "timestamp": datetime.now()
-        })
-        
         return responses
     
     def _simulate_persona_decision(self, persona_key: str, prompt: str, context: Dict) -> Dict:
@@ -183,31 +186,33 @@ class ParallelUniverseViewer:
     
     def update_universe_scores(self, decision_id: int, outcomes: Dict):
         """Update scores based on decision outcomes"""
-        for persona_key, outcome in outcomes.items():
-            if outcome == "success":
-                self.universes[persona_key]["score"] += 10
-            elif outcome == "failure":
-                self.universes[persona_key]["score"] -= 5
-            elif outcome == "neutral":
-                self.universes[persona_key]["score"] += 2
+        with self._lock:
+            for persona_key, outcome in outcomes.items():
+                if outcome == "success":
+                    self.universes[persona_key]["score"] += 10
+                elif outcome == "failure":
+                    self.universes[persona_key]["score"] -= 5
+                elif outcome == "neutral":
+                    self.universes[persona_key]["score"] += 2
     
     def get_daily_comparison(self) -> Dict:
         """Get comparison of how each version performed today"""
-        return {
-            "decisions_made": len(self.current_day_decisions),
-            "universes": {
-                key: {
-                    "persona": self.PERSONAS[key]["name"],
-                    "emoji": self.PERSONAS[key]["emoji"],
-                    "score": universe["score"],
-                    "state": universe["state"],
-                    "decisions": len(universe["decisions"])
-                }
-                for key, universe in self.universes.items()
-            },
-            "leader": max(self.universes.items(), key=lambda x: x[1]["score"])[0],
-            "recommendation": self._get_recommendation()
-        }
+        with self._lock:
+            return {
+                "decisions_made": len(self.current_day_decisions),
+                "universes": {
+                    key: {
+                        "persona": self.PERSONAS[key]["name"],
+                        "emoji": self.PERSONAS[key]["emoji"],
+                        "score": universe["score"],
+                        "state": universe["state"],
+                        "decisions": len(universe["decisions"])
+                    }
+                    for key, universe in self.universes.items()
+                },
+                "leader": max(self.universes.items(), key=lambda x: x[1]["score"])[0],
+                "recommendation": self._get_recommendation()
+            }
     
     def _get_recommendation(self) -> str:
         """Recommend which version to follow"""
@@ -220,24 +225,25 @@ class ParallelUniverseViewer:
     
     def get_live_view(self) -> str:
         """Get live split-screen view of all three versions"""
-        view = "\n🌌 PARALLEL UNIVERSE VIEWER - LIVE\n\n"
+        with self._lock:
+            view = "\n🌌 PARALLEL UNIVERSE VIEWER - LIVE\n\n"
         
-        for key, universe in self.universes.items():
-            persona = self.PERSONAS[key]
-            view += f"{persona['emoji']} {persona['name']}\n"
-            view += f"Score: {universe['score']} | State: {universe['state']}\n"
-            view += f"Style: {persona['decision_style']}\n"
+            for key, universe in self.universes.items():
+                persona = self.PERSONAS[key]
+                view += f"{persona['emoji']} {persona['name']}\n"
+                view += f"Score: {universe['score']} | State: {universe['state']}\n"
+                view += f"Style: {persona['decision_style']}\n"
             
-            if universe["decisions"]:
-                last = universe["decisions"][-1]
-                view += f"Last choice: {last['choice']}\n"
+                if universe["decisions"]:
+                    last = universe["decisions"][-1]
+                    view += f"Last choice: {last['choice']}\n"
             
-            view += "\n"
+                view += "\n"
         
-        leader = max(self.universes.items(), key=lambda x: x[1]["score"])[0]
-        view += f"🏆 Current Leader: {self.PERSONAS[leader]['name']}\n"
+            leader = max(self.universes.items(), key=lambda x: x[1]["score"])[0]
+            view += f"🏆 Current Leader: {self.PERSONAS[leader]['name']}\n"
         
-        return view
+            return view
     
     def switch_timeline(self, target_persona: str):
         """Switch to following a different persona's decisions"""
@@ -3,24 +3,251 @@
 Identifies recurring themes, preferences, and tendencies
 """
 
+import bisect
 import json
 import os
 from collections import Counter, defaultdict
-from typing import List, Dict
+from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 
+from core.storage import StorageBackend, get_storage, write_json_atomic
+from core.write_behind import get_flusher
+
 
 class PatternAnalyzer:
     """Analyze cognitive patterns from decision history"""
     
-    def __init__(self, data_dir: str = "data"):
+    # Preference -> reason keywords, in reporting order
+    PREFERENCE_KEYWORDS = [
+        ("efficiency", ("efficient", "performance")),
+        ("simplicity", ("simple", "minimal")),
+        ("scalability", ("scalable", "scale")),
+        ("speed", ("fast", "quick")),
+        ("reliability", ("reliable", "stable")),
+        ("innovation", ("novel", "innovative"))
+    ]
+    
+    def __init__(self, data_dir: str = "data", storage: Optional[StorageBackend] = None):
         self.data_dir = data_dir
+        self.storage = storage if storage is not None else get_storage(data_dir)
         self.patterns_file = os.path.join(data_dir, "patterns.json")
-        self.patterns = self._load_patterns()
+        self._patterns = self._load_patterns()
+        self._reset_aggregates()
+        
+        # Set while tracking: aggregates changed since patterns were derived
+        # or saved. Patterns are rebuilt on read and saved by the flusher.
+        self._tracker = None
+        self._stale = False
+        self._unsaved = False
+    
+    @property
+    def patterns(self) -> Dict:
+        """Current patterns, derived from the aggregates on demand"""
+        if self._tracker is None:
+            return self._patterns
+        with self._tracker.lock:
+            self._tracker.refresh()
+            if self._stale:
+                self._patterns = self._patterns_from_aggregates()
+                self._stale = False
+            return self._patterns
+    
+    @patterns.setter
+    def patterns(self, value: Dict):
+        self._patterns = value
     
     def analyze_decisions(self, decisions: List[Dict]):
         """Analyze patterns from decision history"""
-        patterns = {
+        patterns = self._compute_patterns(decisions)
+        
+        self.patterns = patterns
+        self._save_patterns(patterns)
+        
+        return patterns
+    
+    # ----- Incremental mode -----
+    
+    def track(self, decision_tracker):
+        """Keep patterns current from a DecisionTracker's change events
+        
+        History is folded into the running aggregates once; after that each
+        added decision or outcome change is an O(1) update. Patterns are
+        derived when read and written to disk by the background flusher.
+        """
+        with decision_tracker.lock:
+            self._reset_aggregates()
+            for dec in decision_tracker.get_decision_timeline():
+                self._add_to_aggregates(dec)
+            decision_tracker.add_listener(self)
+            self._tracker = decision_tracker
+            self._mark_changed()
+        get_flusher().register(self)
+    
+    def on_decision_added(self, decision: Dict):
+        """Fold a new decision into the aggregates"""
+        self._add_to_aggregates(decision)
+        self._mark_changed()
+    
+    def on_outcome_updated(self, decision: Dict, previous_outcome: Optional[str]):
+        """Move a decision between outcome tallies"""
+        outcomes = self._agg["outcomes"]
+        outcomes[self._classify_outcome(previous_outcome)] -= 1
+        outcomes[self._classify_outcome(decision.get("outcome"))] += 1
+        self._mark_changed()
+    
+    def flush(self):
+        """Save patterns if they changed since the last save"""
+        if self._tracker is None:
+            return
+        with self._tracker.lock:
+            if not self._unsaved:
+                return
+            patterns = self.patterns
+            self._unsaved = False
+        # Patterns are rebuilt, never mutated, so the dict is safe to write unlocked
+        self._save_patterns(patterns)
+    
+    def close(self):
+        """Save pending patterns and stop background flushing"""
+        get_flusher().unregister(self)
+        self.flush()
+    
+    def verify(self, decisions: List[Dict]) -> bool:
+        """Consistency check: full recompute must match the incremental patterns"""
+        expected = self._compute_patterns(decisions)
+        actual = self._patterns_from_aggregates()
+        # most_common(10) breaks ties arbitrarily, so themes must carry the
+        # right counts and the same multiset of counts, in any order
+        tag_counts = Counter(tag for dec in decisions for tag in dec.get("tags", []))
+        expected_themes = expected.pop("recurring_themes")
+        actual_themes = actual.pop("recurring_themes")
+        themes_match = (
+            all(tag_counts[tag] == count for tag, count in actual_themes.items())
+            and Counter(expected_themes.values()) == Counter(actual_themes.values())
+        )
+        return expected == actual and themes_match
+    
+    def _mark_changed(self):
+        self._stale = True
+        self._unsaved = True
+    
+    def _reset_aggregates(self):
+        """Empty running aggregates"""
+        self._agg = {
+            "count": 0,
+            "preferences": Counter(),
+            "tags": Counter(),
+            "constraints": Counter(),
+            "outcomes": {"success": 0, "failure": 0, "unknown": 0},
+            "first_timestamp": None,
+            "last_timestamp": None,
+            # Preference hits per decision, as bitmasks in timestamp order,
+            # plus the preference counts of the early half of that order
+            "timestamps": [],
+            "masks": [],
+            "early": Counter()
+        }
+    
+    def _add_to_aggregates(self, dec: Dict):
+        """Update every running aggregate for one decision"""
+        agg = self._agg
+        hits = self._preference_hits(dec.get("reason") or "")
+        
+        agg["count"] += 1
+        agg["preferences"].update(hits)
+        agg["tags"].update(dec.get("tags", []))
+        agg["constraints"].update((dec.get("constraints") or {}).keys())
+        agg["outcomes"][self._classify_outcome(dec.get("outcome"))] += 1
+        
+        timestamp = dec["timestamp"]
+        if agg["first_timestamp"] is None or timestamp < agg["first_timestamp"]:
+            agg["first_timestamp"] = timestamp
+        if agg["last_timestamp"] is None or timestamp > agg["last_timestamp"]:
+            agg["last_timestamp"] = timestamp
+        
+        self._insert_preference_mask(timestamp, self._preference_mask(hits))
+    
+    def _insert_preference_mask(self, timestamp: str, mask: int):
+        """Insert a decision into the evolution split, moving the midpoint"""
+        agg = self._agg
+        timestamps, masks, early = agg["timestamps"], agg["masks"], agg["early"]
+        
+        old_mid = len(masks) // 2
+        pos = bisect.bisect_right(timestamps, timestamp)
+        timestamps.insert(pos, timestamp)
+        masks.insert(pos, mask)
+        
+        if pos < old_mid:
+            # Lands in the early half and pushes the old boundary decision out
+            self._apply_mask(early, mask, 1)
+            self._apply_mask(early, masks[old_mid], -1)
+        
+        new_mid = len(masks) // 2
+        if new_mid > old_mid:
+            self._apply_mask(early, masks[new_mid - 1], 1)
+    
+    def _patterns_from_aggregates(self):
+        """Build the patterns dict from running aggregates"""
+        agg = self._agg
+        count = agg["count"]
+        
+        if count < 2:
+            evolution = {"status": "insufficient_data"}
+        else:
+            early = self._ordered_preferences(agg["early"])
+            recent = self._ordered_preferences(agg["preferences"] - agg["early"])
+            evolution = {
+                "early_preferences": early,
+                "recent_preferences": recent,
+                "shift_detected": self._compare_preferences(early, recent)
+            }
+        
+        if count == 0:
+            rate = 0
+        else:
+            first = datetime.fromisoformat(agg["first_timestamp"])
+            last = datetime.fromisoformat(agg["last_timestamp"])
+            rate = self._rate(count, (last - first).days)
+        
+        return {
+            "preferences": self._ordered_preferences(agg["preferences"]),
+            "recurring_themes": dict(agg["tags"].most_common(10)),
+            "decision_speed": {
+                "total_decisions": count,
+                "decisions_per_month": rate
+            },
+            "constraint_patterns": dict(agg["constraints"]),
+            "outcome_patterns": dict(agg["outcomes"]),
+            "evolution": evolution
+        }
+    
+    def _ordered_preferences(self, counts: Counter):
+        """Preference counts in reporting order, omitting zeros"""
+        return {
+            name: counts[name]
+            for name, _ in self.PREFERENCE_KEYWORDS
+            if counts[name] > 0
+        }
+    
+    def _preference_mask(self, hits: List[str]) -> int:
+        """Encode preference hits as a bitmask"""
+        mask = 0
+        for bit, (name, _) in enumerate(self.PREFERENCE_KEYWORDS):
+            if name in hits:
+                mask |= 1 << bit
+        return mask
+    
+    def _apply_mask(self, counts: Counter, mask: int, delta: int):
+        """Add or remove the preferences encoded in a mask"""
+        for bit, (name, _) in enumerate(self.PREFERENCE_KEYWORDS):
+            if mask & (1 << bit):
+                counts[name] += delta
+    
+    # ----- Full analysis -----
+    
+    def _compute_patterns(self, decisions: List[Dict]):
+        """Recompute every pattern from scratch"""
+        return {
             "preferences": self._extract_preferences(decisions),
             "recurring_themes": self._find_recurring_themes(decisions),
             "decision_speed": self._analyze_decision_speed(decisions),
@@ -28,32 +255,22 @@ class PatternAnalyzer:
             "outcome_patterns": self._analyze_outcomes(decisions),
             "evolution": self._track_evolution(decisions)
         }
-        
-        self.patterns = patterns
-        self._save_patterns()
-        
-        return patterns
+    
+    def _preference_hits(self, reason: str) -> List[str]:
+        """Preferences whose keywords appear in a reason"""
+        reason = reason.lower()
+        return [
+            name for name, keywords in self.PREFERENCE_KEYWORDS
+            if any(keyword in reason for keyword in keywords)
+        ]
     
     def _extract_preferences(self, decisions: List[Dict]):
         """Extract decision preferences"""
         preferences = defaultdict(int)
         
         for dec in decisions:
-            reason = dec.get("reason", "").lower()
-            
-            # Look for preference keywords
-            if "efficient" in reason or "performance" in reason:
-                preferences["efficiency"] += 1
-            if "simple" in reason or "minimal" in reason:
-                preferences["simplicity"] += 1
-            if "scalable" in reason or "scale" in reason:
-                preferences["scalability"] += 1
-            if "fast" in reason or "quick" in reason:
-                preferences["speed"] += 1
-            if "reliable" in reason or "stable" in reason:
-                preferences["reliability"] += 1
-            if "novel" in reason or "innovative" in reason:
-                preferences["innovation"] += 1
+            for name in self._preference_hits(dec.get("reason") or ""):
+                preferences[name] += 1
         
         return dict(preferences)
     
@@ -90,16 +307,19 @@ class PatternAnalyzer:
         outcomes = {"success": 0, "failure": 0, "unknown": 0}
         
         for dec in decisions:
-            outcome = dec.get("outcome", "").lower()
-            if outcome in ["success", "successful", "good"]:
-                outcomes["success"] += 1
-            elif outcome in ["failure", "failed", "bad"]:
-                outcomes["failure"] += 1
-            else:
-                outcomes["unknown"] += 1
+            outcomes[self._classify_outcome(dec.get("outcome"))] += 1
         
         return outcomes
     
+    def _classify_outcome(self, outcome: Optional[str]) -> str:
+        """Bucket a raw outcome into success / failure / unknown"""
+        outcome = (outcome or "").lower()
+        if outcome in ["success", "successful", "good"]:
+            return "success"
+        elif outcome in ["failure", "failed", "bad"]:
+            return "failure"
+        return "unknown"
+    
     def _track_evolution(self, decisions: List[Dict]):
         """Track how decision patterns evolve over time"""
         if len(decisions) < 2:
@@ -119,13 +339,16 @@ class PatternAnalyzer:
     
     def _detect_preference_shift(self, early: List[Dict], recent: List[Dict]):
         """Detect if preferences have shifted"""
-        early_prefs = self._extract_preferences(early)
-        recent_prefs = self._extract_preferences(recent)
-        
+        return self._compare_preferences(
+            self._extract_preferences(early),
+            self._extract_preferences(recent)
+        )
+    
+    def _compare_preferences(self, early_prefs: Dict, recent_prefs: Dict):
+        """List preferences whose counts moved by more than 2"""
         shifts = []
-        all_keys = set(early_prefs.keys()) | set(recent_prefs.keys())
         
-        for key in all_keys:
+        for key, _ in self.PREFERENCE_KEYWORDS:
             early_val = early_prefs.get(key, 0)
             recent_val = recent_prefs.get(key, 0)
             if abs(recent_val - early_val) > 2:
@@ -145,21 +368,29 @@ class PatternAnalyzer:
         first = datetime.fromisoformat(sorted_decisions[0]["timestamp"])
         last = datetime.fromisoformat(sorted_decisions[-1]["timestamp"])
         
-        days = (last - first).days
+        return self._rate(len(decisions), (last - first).days)
+    
+    def _rate(self, count: int, days: int):
+        """Decisions per 30 days over a span"""
         if days == 0:
-            return len(decisions)
+            return count
         
-        return len(decisions) / (days / 30)
+        return count / (days / 30)
     
     def _load_patterns(self):
         """Load patterns from disk"""
+        if self.storage:
+            return self.storage.load_document("patterns", {})
+        
         if os.path.exists(self.patterns_file):
             with open(self.patterns_file, 'r') as f:
                 return json.load(f)
         return {}
     
-    def _save_patterns(self):
+    def _save_patterns(self, patterns: Dict):
         """Save patterns to disk"""
-        os.makedirs(self.data_dir, exist_ok=True)
-        with open(self.patterns_file, 'w') as f:
-            json.dump(self.patterns, f, indent=2)
+        if self.storage:
+            self.storage.save_document("patterns", patterns)
+            return
+        
+        write_json_atomic(self.patterns_file, patterns, indent=2)
@@ -6,6 +6,8 @@ Makes the twin anticipate needs and act proactively like JARVIS
 import random
 from datetime import datetime, timedelta
 
+from core import energy_stats
+
 
 class ProactiveAssistant:
     """Proactively suggests actions and insights"""
@@ -160,9 +162,7 @@ class ProactiveAssistant:
         
         for hour in range(current_hour + 1, min(current_hour + 4, 24)):
             if str(hour) in patterns:
-                readings = patterns[str(hour)]
-                avg = sum(readings) / len(readings)
-                if avg < 40:
+                if energy_stats.typical(patterns[str(hour)]) < 40:
                     return hour
         
         return None
@@ -3,153 +3,352 @@
 Predicts probability of regretting decisions in real-time
 """
 
+import copy
+import json
+import os
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
 from collections import defaultdict
 
+import numpy as np
+
+from core.storage import write_json_atomic
+from core.write_behind import get_flusher
+
+
+REGRET_OUTCOMES = ["failure", "regret", "bad"]
+NEGATIVE_EMOTIONS = ["angry", "frustrated", "sad"]
+NUMERIC_CONTEXT_FIELDS = ("stress_level", "time_thinking", "current_commitments")
+
+# Probability bands: below 0.2 is MINIMAL, 0.8 and above is CRITICAL
+REGRET_THRESHOLDS = [0.2, 0.4, 0.6, 0.8]
+REGRET_LEVELS = ["MINIMAL", "LOW", "MEDIUM", "HIGH", "CRITICAL"]
+REGRET_RECOMMENDATIONS = [
+    "✅ Low regret risk. Proceed if it feels right.",
+    "💭 Consider carefully. Write down pros/cons.",
+    "⏸️ PAUSE. Take 30 minutes to think it through.",
+    "⚠️ HIGH RISK. Wait at least 2 hours. Talk to someone.",
+    "🛑 DON'T DO IT. Sleep on this. Review tomorrow."
+]
+
+
+def _tally():
+    return {"total": 0, "regrets": 0}
+
 
 class RegretPredictor:
     """Predict regret probability for decisions"""
     
     def __init__(self, decision_tracker):
         self.decision_tracker = decision_tracker
-        self.regret_patterns = self._analyze_regret_patterns()
+        self.storage = decision_tracker.storage
+        self.patterns_file = os.path.join(decision_tracker.data_dir, "regret_patterns.json")
+        # Tables changed since the last save; the background flusher writes them
+        self._unsaved = False
+        self.regret_patterns = self._load_regret_patterns()
+        decision_tracker.add_listener(self)
+        get_flusher().register(self)
+    
+    def rebuild(self):
+        """Recount every table from the full decision history"""
+        with self.decision_tracker.lock:
+            self.regret_patterns = self._analyze_regret_patterns()
+            self._unsaved = True
+        self.flush()
+    
+    def flush(self):
+        """Save the tables if they changed since the last save"""
+        with self.decision_tracker.lock:
+            if not self._unsaved:
+                return
+            patterns = copy.deepcopy(self.regret_patterns)
+            self._unsaved = False
+        self._save_regret_patterns(patterns)
+    
+    def close(self):
+        """Save pending tables and stop background flushing"""
+        get_flusher().unregister(self)
+        self.flush()
+    
+    def on_decision_added(self, decision: Dict):
+        """Count a new decision in every table it belongs to"""
+        is_regret = self._is_regret(decision.get("outcome"))
+        self._apply(decision, is_regret, total=1, regrets=1)
+        self.regret_patterns["decision_count"] += 1
+        self.regret_patterns["regret_count"] += is_regret
+        self._note_outcome_time(decision)
+        self._unsaved = True
+    
+    def on_outcome_updated(self, decision: Dict, previous_outcome: Optional[str]):
+        """Move a decision's regret tally when its outcome changes"""
+        was_regret = self._is_regret(previous_outcome)
+        is_regret = self._is_regret(decision.get("outcome"))
+        self._note_outcome_time(decision)
+        self._unsaved = True
+        if was_regret == is_regret:
+            return
         
+        self._apply(decision, True, total=0, regrets=1 if is_regret else -1)
+        self.regret_patterns["regret_count"] += 1 if is_regret else -1
+    
+    def _note_outcome_time(self, decision: Dict):
+        """Track the newest outcome update, part of the history marker"""
+        outcome_at = decision.get("outcome_timestamp")
+        latest = self.regret_patterns["last_outcome_at"]
+        if outcome_at and (latest is None or outcome_at > latest):
+            self.regret_patterns["last_outcome_at"] = outcome_at
+    
     def _analyze_regret_patterns(self) -> Dict:
         """Analyze past decisions to find regret patterns"""
         decisions = self.decision_tracker.get_decision_timeline()
         
-        patterns = {
-            "time_of_day": defaultdict(lambda: {"total": 0, "regrets": 0}),
-            "day_of_week": defaultdict(lambda: {"total": 0, "regrets": 0}),
-            "decision_speed": {"fast": {"total": 0, "regrets": 0}, "slow": {"total": 0, "regrets": 0}},
-            "emotional_state": defaultdict(lambda: {"total": 0, "regrets": 0}),
-            "stress_level": {"high": {"total": 0, "regrets": 0}, "low": {"total": 0, "regrets": 0}}
+        self.regret_patterns = self._empty_patterns()
+        for dec in decisions:
+            self.on_decision_added(dec)
+        
+        return self.regret_patterns
+    
+    def _empty_patterns(self) -> Dict:
+        """Zeroed regret tables"""
+        return {
+            "decision_count": 0,
+            "regret_count": 0,
+            "last_outcome_at": None,
+            "time_of_day": defaultdict(_tally),
+            "day_of_week": defaultdict(_tally),
+            "decision_speed": {"fast": _tally(), "slow": _tally()},
+            "emotional_state": defaultdict(_tally),
+            "stress_level": {"high": _tally(), "low": _tally()}
         }
+    
+    def _apply(self, dec: Dict, is_regret: bool, total: int, regrets: int):
+        """Add to every table cell a decision falls in; ``regrets`` only counts if is_regret"""
+        patterns = self.regret_patterns
+        cells = []
         
-        for dec in decisions:
-            outcome = dec.get("outcome", "")
-            is_regret = outcome in ["failure", "regret", "bad"]
-            
-            # Time patterns
-            if "timestamp" in dec:
-                dt = datetime.fromisoformat(dec["timestamp"])
-                hour = dt.hour
-                day = dt.weekday()
-                
-                patterns["time_of_day"][hour]["total"] += 1
-                if is_regret:
-                    patterns["time_of_day"][hour]["regrets"] += 1
-                
-                patterns["day_of_week"][day]["total"] += 1
-                if is_regret:
-                    patterns["day_of_week"][day]["regrets"] += 1
+        # Time patterns
+        if "timestamp" in dec:
+            dt = datetime.fromisoformat(dec["timestamp"])
+            cells.append(patterns["time_of_day"][dt.hour])
+            cells.append(patterns["day_of_week"][dt.weekday()])
+        
+        # Stress, speed and mood, when the decision was recorded with them
+        context = {**(dec.get("context_snapshot") or {}), **(dec.get("constraints") or {})}
+        stress = context.get("stress_level")
+        if isinstance(stress, (int, float)):
+            cells.append(patterns["stress_level"]["high" if stress > 70 else "low"])
+        thinking_time = context.get("time_thinking")
+        if isinstance(thinking_time, (int, float)):
+            cells.append(patterns["decision_speed"]["fast" if thinking_time < 60 else "slow"])
+        emotion = context.get("emotional_state")
+        if isinstance(emotion, str):
+            cells.append(patterns["emotional_state"][emotion])
+        
+        for cell in cells:
+            cell["total"] += total
+            if is_regret:
+                cell["regrets"] += regrets
+    
+    def _is_regret(self, outcome: Optional[str]) -> bool:
+        return outcome in REGRET_OUTCOMES
+    
+    def _regret_rate(self, table: str, key) -> Optional[float]:
+        """Observed regret rate for one table cell, or None without history"""
+        cell = self.regret_patterns[table].get(key)
+        if not cell or cell["total"] <= 0:
+            return None
+        return cell["regrets"] / cell["total"]
+    
+    def _history_marker(self) -> Dict:
+        """What the saved tables must agree with: decisions, regrets and the newest outcome update"""
+        decisions = self.decision_tracker.get_decision_timeline()
+        outcome_times = [dec["outcome_timestamp"] for dec in decisions if dec.get("outcome_timestamp")]
+        return {
+            "decision_count": len(decisions),
+            "regret_count": sum(1 for dec in decisions if self._is_regret(dec.get("outcome"))),
+            "last_outcome_at": max(outcome_times, default=None)
+        }
+    
+    def _load_regret_patterns(self) -> Dict:
+        """Load persisted tables, rebuilding them if they disagree with the tracker
+        
+        Outcome updates made after the last save change the regret count or
+        the newest outcome time, so tables lost to a crash get recounted.
+        """
+        if self.storage:
+            saved = self.storage.load_document("regret_patterns")
+        elif os.path.exists(self.patterns_file):
+            with open(self.patterns_file, 'r') as f:
+                saved = json.load(f)
+        else:
+            saved = None
+        
+        marker = self._history_marker()
+        if not saved or any(saved.get(key) != value for key, value in marker.items()):
+            patterns = self._analyze_regret_patterns()
+            self._unsaved = True
+            return patterns
         
+        # JSON object keys come back as strings
+        patterns = self._empty_patterns()
+        patterns.update(marker)
+        for table in ("time_of_day", "day_of_week", "emotional_state"):
+            for key, cell in saved.get(table, {}).items():
+                patterns[table][int(key) if table != "emotional_state" else key] = cell
+        for table in ("decision_speed", "stress_level"):
+            patterns[table].update(saved.get(table, {}))
         return patterns
     
+    def _save_regret_patterns(self, patterns: Dict):
+        """Persist the tables"""
+        if self.storage:
+            self.storage.save_document("regret_patterns", patterns)
+            return
+        
+        write_json_atomic(self.patterns_file, patterns)
+    
     def predict_regret(self, decision: str, context: Dict) -> Dict:
         """Predict regret probability"""
-        score = 0.0
-        factors = []
-        
-        # Time-based prediction
-        hour = datetime.now().hour
-        if hour in self.regret_patterns["time_of_day"]:
-            pattern = self.regret_patterns["time_of_day"][hour]
-            if pattern["total"] > 0:
-                regret_rate = pattern["regrets"] / pattern["total"]
-                if regret_rate > 0.5:
-                    score += 0.3
-                    factors.append(f"You regret {int(regret_rate*100)}% of decisions made at this hour")
-        
-        # Late night penalty
-        if hour >= 22 or hour <= 5:
-            score += 0.35
-            factors.append("Late night decisions have 67% regret rate")
-        
-        # Stress-based
-        stress = context.get("stress_level", 0)
-        if stress > 70:
-            score += 0.25
-            factors.append("High stress increases regret by 25%")
-        
-        # Speed-based
-        thinking_time = context.get("time_thinking", 0)
-        if thinking_time < 60:
-            score += 0.2
-            factors.append("Quick decisions have 58% regret rate")
-        
-        # Emotional state
-        emotion = context.get("emotional_state", "neutral")
-        if emotion in ["angry", "frustrated", "sad"]:
-            score += 0.3
-            factors.append(f"Decisions made while {emotion} are regretted 73% of the time")
-        
-        # Day of week
-        day = datetime.now().weekday()
-        if day == 4:  # Friday
-            score += 0.15
-            factors.append("Friday decisions have higher regret rate")
-        
-        # Capacity overload
-        if context.get("current_commitments", 0) > 5:
-            score += 0.2
-            factors.append("You're overloaded - decision quality suffers")
-        
-        regret_probability = min(1.0, score)
+        return self.predict_regret_batch([decision], [context], include_similar=True)[0]
+    
+    def predict_regret_batch(
+        self,
+        decisions: List[str],
+        contexts: Optional[List[Dict]] = None,
+        now: Optional[datetime] = None,
+        include_similar: bool = False
+    ) -> List[Dict]:
+        """Predict regret for many decisions at once
         
-        return {
-            "regret_probability": regret_probability,
-            "percentage": int(regret_probability * 100),
-            "level": self._get_regret_level(regret_probability),
-            "factors": factors,
-            "recommendation": self._get_recommendation(regret_probability),
-            "similar_past_decisions": self._find_similar_regrets(decision)
-        }
+        Every factor is evaluated as an array operation over the whole batch.
+        A context may carry an ISO "timestamp" to score the decision as of
+        that time instead of ``now``. Similar past regrets need one index
+        search per decision, so they are only looked up with include_similar.
+        Raises ValueError for a malformed context.
+        """
+        n = len(decisions)
+        contexts = contexts if contexts is not None else [{}] * n
+        if len(contexts) != n:
+            raise ValueError("decisions and contexts must have the same length")
+        if n == 0:
+            return []
+        
+        now = now or datetime.now()
+        times = [self._check_context(i, ctx, now) for i, ctx in enumerate(contexts)]
+        hours = np.fromiter((t.hour for t in times), dtype=np.int64, count=n)
+        days = np.fromiter((t.weekday() for t in times), dtype=np.int64, count=n)
+        stress = np.array([ctx.get("stress_level", 0) for ctx in contexts], dtype=float)
+        thinking_time = np.array([ctx.get("time_thinking", 0) for ctx in contexts], dtype=float)
+        commitments = np.array([ctx.get("current_commitments", 0) for ctx in contexts], dtype=float)
+        emotions = np.array([ctx.get("emotional_state", "neutral") for ctx in contexts], dtype=object)
+        
+        # Learned rates per candidate; NaN where there is no history.
+        # The tables are updated by tracker events under the tracker's lock.
+        with self.decision_tracker.lock:
+            self.decision_tracker.refresh()
+            hour_rates = self._rate_table("time_of_day", 24)[hours]
+            stress_rate = self._regret_rate("stress_level", "high")
+            fast_rate = self._regret_rate("decision_speed", "fast")
+        
+        learned_hour = hour_rates > 0.5
+        late_night = (hours >= 22) | (hours <= 5)
+        high_stress = stress > 70
+        quick = thinking_time < 60
+        upset = np.isin(emotions, NEGATIVE_EMOTIONS)
+        friday = days == 4
+        overloaded = commitments > 5
+        
+        scores = (
+            0.3 * learned_hour
+            + 0.35 * late_night
+            + 0.25 * high_stress
+            + 0.2 * quick
+            + 0.3 * upset
+            + 0.15 * friday
+            + 0.2 * overloaded
+        )
+        probabilities = np.minimum(1.0, scores)
+        bands = np.searchsorted(REGRET_THRESHOLDS, probabilities, side="right")
+        
+        results = []
+        for i in range(n):
+            factors = []
+            if learned_hour[i]:
+                factors.append(f"You regret {int(hour_rates[i]*100)}% of decisions made at this hour")
+            if late_night[i]:
+                factors.append("Late night decisions have 67% regret rate")
+            if high_stress[i]:
+                if stress_rate is not None:
+                    factors.append(f"You regret {int(stress_rate*100)}% of decisions made under high stress")
+                else:
+                    factors.append("High stress increases regret by 25%")
+            if quick[i]:
+                if fast_rate is not None:
+                    factors.append(f"You regret {int(fast_rate*100)}% of your quick decisions")
+                else:
+                    factors.append("Quick decisions have 58% regret rate")
+            if upset[i]:
+                factors.append(f"Decisions made while {emotions[i]} are regretted 73% of the time")
+            if friday[i]:
+                factors.append("Friday decisions have higher regret rate")
+            if overloaded[i]:
+                factors.append("You're overloaded - decision quality suffers")
+            
+            probability = float(probabilities[i])
+            result = {
+                "regret_probability": probability,
+                "percentage": int(probability * 100),
+                "level": REGRET_LEVELS[bands[i]],
+                "factors": factors,
+                "recommendation": REGRET_RECOMMENDATIONS[bands[i]]
+            }
+            if include_similar:
+                result["similar_past_decisions"] = self._find_similar_regrets(decisions[i])
+            results.append(result)
+        
+        return results
     
-    def _get_regret_level(self, probability: float) -> str:
-        """Get regret level description"""
-        if probability >= 0.8:
-            return "CRITICAL"
-        elif probability >= 0.6:
-            return "HIGH"
-        elif probability >= 0.4:
-            return "MEDIUM"
-        elif probability >= 0.2:
-            return "LOW"
-        else:
-            return "MINIMAL"
-    
-    def _get_recommendation(self, probability: float) -> str:
-        """Get recommendation based on regret probability"""
-        if probability >= 0.8:
-            return "🛑 DON'T DO IT. Sleep on this. Review tomorrow."
-        elif probability >= 0.6:
-            return "⚠️ HIGH RISK. Wait at least 2 hours. Talk to someone."
-        elif probability >= 0.4:
-            return "⏸️ PAUSE. Take 30 minutes to think it through."
-        elif probability >= 0.2:
-            return "💭 Consider carefully. Write down pros/cons."
-        else:
-            return "✅ Low regret risk. Proceed if it feels right."
+    def _check_context(self, index: int, ctx: Dict, now: datetime) -> datetime:
+        """Validate one batch context and return the time to score it at"""
+        if not isinstance(ctx, dict):
+            raise ValueError(f"context {index} must be an object")
+        for field in NUMERIC_CONTEXT_FIELDS:
+            value = ctx.get(field, 0)
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"context {index}: {field} must be a number")
+        if not isinstance(ctx.get("emotional_state", "neutral"), str):
+            raise ValueError(f"context {index}: emotional_state must be a string")
+        
+        timestamp = ctx.get("timestamp")
+        if not timestamp:
+            return now
+        try:
+            return datetime.fromisoformat(timestamp)
+        except (TypeError, ValueError):
+            raise ValueError(f"context {index}: timestamp must be an ISO 8601 string")
+    
+    def _rate_table(self, table: str, size: int) -> np.ndarray:
+        """Regret rate per integer key as an array, NaN where there is no history"""
+        rates = np.full(size, np.nan)
+        for key, cell in self.regret_patterns[table].items():
+            if cell["total"] > 0:
+                rates[key] = cell["regrets"] / cell["total"]
+        return rates
     
     def _find_similar_regrets(self, decision: str) -> List[Dict]:
         """Find similar past decisions that were regretted"""
-        decisions = self.decision_tracker.get_decision_timeline()
-        similar = []
-        
-        decision_words = set(decision.lower().split())
+        matches = self.decision_tracker.find_similar_decisions(
+            decision,
+            limit=3,
+            where=lambda dec: self._is_regret(dec.get("outcome"))
+        )
         
-        for dec in decisions:
-            if dec.get("outcome") in ["failure", "regret", "bad"]:
-                dec_words = set(dec.get("decision", "").lower().split())
-                overlap = len(decision_words & dec_words)
-                
-                if overlap > 2:
-                    similar.append({
-                        "decision": dec.get("decision"),
-                        "reason_regretted": dec.get("reason", ""),
-                        "timestamp": dec.get("timestamp")
-                    })
-        
-        return similar[:3]
+        return [
+            {
+                "decision": dec.get("decision"),
+                "reason_regretted": dec.get("reason", ""),
+                "timestamp": dec.get("timestamp"),
+                "similarity": round(score, 3)
+            }
+            for dec, score in matches
+        ]
@@ -0,0 +1,190 @@
+"""
+🔁 SHARED EVENT RING - Cross-process activity event stream
+Memory-mapped ring buffer written by the collector, read by every other process
+"""
+
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# Event types
+KEY = 1
+CLICK = 2
+MOVE = 3
+APP_SWITCH = 4
+
+NO_APP = 0xFFFFFFFF
+
+EVENT_DTYPE = np.dtype([("time", "<f8"), ("type", "<u4"), ("app", "<u4")])
+
+
+class SharedEventRing:
+    """Fixed-size event ring in a memory-mapped file.
+
+    Layout: a 64-byte header, a table of app names, then fixed 16-byte
+    records (wall-clock time, event type, app id). App ids are the
+    collector's AppDictionary ids. There is one writer, the
+    collector. It fills a record, then publishes it by bumping the
+    sequence number in the header. Readers map the same file and take numpy
+    views straight over the records, so reading costs no syscalls or copies.
+    A reader that falls more than ``capacity`` events behind loses the oldest.
+    """
+
+    MAGIC = b"TWINRING"
+    VERSION = 1
+    HEADER = struct.Struct("<8sII")  # magic, version, capacity
+    SEQ_OFFSET = 16
+    HEARTBEAT_OFFSET = 24
+    APP_COUNT_OFFSET = 32
+    HEADER_SIZE = 64
+    APP_SLOTS = 4096
+    APP_SLOT_SIZE = 64
+
+    def __init__(self, path: str, mm: mmap.mmap, capacity: int, writable: bool, inode: int = 0):
+        self.path = path
+        self.capacity = capacity
+        self.writable = writable
+        self.inode = inode
+        self._mm = mm
+        self._records_offset = self.HEADER_SIZE + self.APP_SLOTS * self.APP_SLOT_SIZE
+        self._records = np.frombuffer(
+            mm, dtype=EVENT_DTYPE, count=capacity, offset=self._records_offset
+        )
+
+        self._app_names: Dict[int, str] = {}
+        self._write_lock = threading.Lock()
+
+    @classmethod
+    def create(cls, path: str, capacity: int = 65536) -> "SharedEventRing":
+        """Create a fresh ring file for a collector.
+
+        The ring is built under a temporary name and renamed over ``path``,
+        so readers still mapping an old ring keep a valid (if stale) file
+        instead of one truncated underneath them.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        size = cls.HEADER_SIZE + cls.APP_SLOTS * cls.APP_SLOT_SIZE + capacity * EVENT_DTYPE.itemsize
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w+b") as f:
+            f.truncate(size)
+            mm = mmap.mmap(f.fileno(), size)
+            inode = os.fstat(f.fileno()).st_ino
+        cls.HEADER.pack_into(mm, 0, cls.MAGIC, cls.VERSION, capacity)
+        os.replace(tmp_path, path)
+        return cls(path, mm, capacity, writable=True, inode=inode)
+
+    @classmethod
+    def open(cls, path: str) -> "SharedEventRing":
+        """Map an existing ring read-only"""
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            inode = os.fstat(f.fileno()).st_ino
+        magic, version, capacity = cls.HEADER.unpack_from(mm, 0)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            mm.close()
+            raise ValueError(f"Not an activity ring: {path}")
+        return cls(path, mm, capacity, writable=False, inode=inode)
+
+    @classmethod
+    def is_live(cls, path: str, max_age: float = 5.0) -> bool:
+        """True when a collector has written a heartbeat recently"""
+        try:
+            with open(path, "rb") as f:
+                header = f.read(cls.HEADER_SIZE)
+        except OSError:
+            return False
+        if len(header) < cls.HEADER_SIZE or header[:8] != cls.MAGIC:
+            return False
+        heartbeat, = struct.unpack_from("<d", header, cls.HEARTBEAT_OFFSET)
+        return time.time() - heartbeat <= max_age
+
+    def is_current(self) -> bool:
+        """True while ``path`` is still the file this ring mapped"""
+        try:
+            return os.stat(self.path).st_ino == self.inode
+        except OSError:
+            return False
+
+    # ----- Writer -----
+
+    def append_many(self, event_type: int, times: List[float], app: int = NO_APP):
+        """Publish a batch of events of one type"""
+        if not times:
+            return
+        with self._write_lock:
+            seq = self.sequence
+            for offset, event_time in enumerate(times):
+                self._records[(seq + offset) % self.capacity] = (event_time, event_type, app)
+            struct.pack_into("<Q", self._mm, self.SEQ_OFFSET, seq + len(times))
+
+    def append(self, event_type: int, event_time: float, app: int = NO_APP):
+        self.append_many(event_type, [event_time], app)
+
+    def register_app(self, app_id: int, name: str):
+        """Publish the name for an app id so readers can resolve it"""
+        if self._app_names.get(app_id) == name or not 0 <= app_id < self.APP_SLOTS:
+            return
+
+        with self._write_lock:
+            encoded = name.encode("utf-8")[:self.APP_SLOT_SIZE]
+            slot = self.HEADER_SIZE + app_id * self.APP_SLOT_SIZE
+            self._mm[slot:slot + self.APP_SLOT_SIZE] = encoded.ljust(self.APP_SLOT_SIZE, b"\0")
+            count, = struct.unpack_from("<I", self._mm, self.APP_COUNT_OFFSET)
+            struct.pack_into("<I", self._mm, self.APP_COUNT_OFFSET, max(count, app_id + 1))
+        self._app_names[app_id] = name
+
+    def heartbeat(self):
+        struct.pack_into("<d", self._mm, self.HEARTBEAT_OFFSET, time.time())
+
+    # ----- Reader -----
+
+    @property
+    def sequence(self) -> int:
+        """Number of events ever published"""
+        return struct.unpack_from("<Q", self._mm, self.SEQ_OFFSET)[0]
+
+    def read_since(self, cursor: int) -> Tuple[List[np.ndarray], int]:
+        """Views over the events published after ``cursor``, and the new cursor.
+
+        At most two views are returned (two when the range wraps around the
+        end of the ring). They alias shared memory, so consume them before
+        the writer can lap the reader.
+        """
+        seq = self.sequence
+        start = max(cursor, seq - self.capacity)
+        if start >= seq:
+            return [], seq
+
+        first = start % self.capacity
+        last = first + (seq - start)
+        if last <= self.capacity:
+            return [self._records[first:last]], seq
+        return [self._records[first:], self._records[:last - self.capacity]], seq
+
+    def app_name(self, app: int) -> Optional[str]:
+        """Name registered for an app id"""
+        if app == NO_APP or not 0 <= app < self.APP_SLOTS:
+            return None
+        name = self._app_names.get(app)
+        if name is None:
+            slot = self.HEADER_SIZE + app * self.APP_SLOT_SIZE
+            raw = bytes(self._mm[slot:slot + self.APP_SLOT_SIZE]).rstrip(b"\0")
+            if not raw:
+                return None
+            name = raw.decode("utf-8", errors="replace")
+            self._app_names[app] = name
+        return name
+
+    def close(self):
+        self._records = None
+        try:
+            self._mm.close()
+        except BufferError:
+            # A caller still holds views; the mapping goes when they do
+            pass
@@ -0,0 +1,168 @@
+"""
+🔎 SIMILARITY INDEX - Ranked text search over past decisions
+Incremental inverted indexes: BM25 ranking and word-set overlap
+"""
+
+import heapq
+import math
+import re
+from collections import defaultdict
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:['\-][a-z0-9]+)*")
+
+STOP_WORDS = frozenset([
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "i", "in",
+    "is", "it", "its", "me", "my", "of", "on", "or", "so", "that", "the",
+    "this", "to", "was", "we", "with", "you"
+])
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case word tokens with stop words removed"""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOP_WORDS]
+
+
+class BM25Index:
+    """Token -> document postings, updated one document at a time"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[Hashable, int]] = defaultdict(dict)
+        self.doc_lengths: Dict[Hashable, int] = {}
+        self.doc_terms: Dict[Hashable, Tuple[str, ...]] = {}
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, doc_id: Hashable, text: str):
+        """Index (or re-index) a document"""
+        if doc_id in self.doc_lengths:
+            self.remove(doc_id)
+
+        tokens = tokenize(text)
+        counts = defaultdict(int)
+        for token in tokens:
+            counts[token] += 1
+
+        for token, tf in counts.items():
+            self.postings[token][doc_id] = tf
+        self.doc_terms[doc_id] = tuple(counts)
+        self.doc_lengths[doc_id] = len(tokens)
+        self.total_length += len(tokens)
+
+    def remove(self, doc_id: Hashable):
+        """Drop a document from the index"""
+        if doc_id not in self.doc_lengths:
+            return
+
+        for token in self.doc_terms.pop(doc_id):
+            docs = self.postings[token]
+            del docs[doc_id]
+            if not docs:
+                del self.postings[token]
+        self.total_length -= self.doc_lengths.pop(doc_id)
+
+    def search(
+        self,
+        text: str,
+        limit: int = 10,
+        min_score: float = 0.0,
+        where: Optional[Callable[[Hashable], bool]] = None,
+        min_shared_terms: int = 1
+    ) -> List[Tuple[Hashable, float]]:
+        """Top documents for a query as (doc_id, score), best first.
+        
+        ``where`` is checked once per document as postings are walked, so
+        rejected documents are never scored. Documents sharing fewer than
+        ``min_shared_terms`` distinct query tokens are dropped.
+        """
+        n_docs = len(self.doc_lengths)
+        if n_docs == 0:
+            return []
+
+        avg_length = self.total_length / n_docs or 1.0
+        scores = defaultdict(float)
+        shared = defaultdict(int)
+        allowed = {}
+
+        for token in set(tokenize(text)):
+            docs = self.postings.get(token)
+            if not docs:
+                continue
+
+            df = len(docs)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for doc_id, tf in docs.items():
+                if where is not None:
+                    ok = allowed.get(doc_id)
+                    if ok is None:
+                        ok = allowed[doc_id] = bool(where(doc_id))
+                    if not ok:
+                        continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+                shared[doc_id] += 1
+
+        candidates = (
+            (doc_id, score) for doc_id, score in scores.items()
+            if score > min_score and shared[doc_id] >= min_shared_terms
+        )
+        return heapq.nlargest(limit, candidates, key=lambda item: item[1])
+
+
+class TokenSetIndex:
+    """Word set -> documents, for overlap queries over a small subset.
+
+    Answers "which documents share more than ``threshold`` of the smaller
+    word set with this text" by counting postings hits, so only documents
+    sharing at least one word are ever looked at.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, set] = defaultdict(set)
+        self.doc_words: Dict[Hashable, frozenset] = {}
+
+    def __len__(self):
+        return len(self.doc_words)
+
+    def __contains__(self, doc_id: Hashable):
+        return doc_id in self.doc_words
+
+    def add(self, doc_id: Hashable, words: Iterable[str]):
+        """Index (or re-index) a document by its distinct words"""
+        self.remove(doc_id)
+        words = frozenset(words)
+        self.doc_words[doc_id] = words
+        for word in words:
+            self.postings[word].add(doc_id)
+
+    def remove(self, doc_id: Hashable):
+        """Drop a document from the index"""
+        for word in self.doc_words.pop(doc_id, ()):
+            docs = self.postings[word]
+            docs.discard(doc_id)
+            if not docs:
+                del self.postings[word]
+
+    def count_overlapping(self, words: Iterable[str], threshold: float = 0.5, stop_at: Optional[int] = None) -> int:
+        """Documents whose overlap / min(set sizes) exceeds threshold"""
+        words = set(words)
+        if not words:
+            return 0
+
+        shared = defaultdict(int)
+        for word in words:
+            for doc_id in self.postings.get(word, ()):
+                shared[doc_id] += 1
+
+        matches = 0
+        for doc_id, overlap in shared.items():
+            if overlap / min(len(words), len(self.doc_words[doc_id])) > threshold:
+                matches += 1
+                if stop_at is not None and matches >= stop_at:
+                    break
+        return matches
@@ -0,0 +1,170 @@
+"""
+💾 SNAPSHOT LOG - Crash-safe persistence for counter dictionaries
+Atomic full snapshots with append-only delta segments in between
+"""
+
+import copy
+import json
+import os
+import time
+from typing import Dict
+
+
+class SnapshotLog:
+    """Counters persisted as a full snapshot plus small delta records.
+
+    ``path`` holds the last full snapshot, replaced atomically by
+    write-and-rename. Between snapshots each flush appends only the counters
+    that changed to ``<path>.deltas.jsonl``. Loading applies the deltas newer
+    than the snapshot, so a crash loses at most the unflushed interval.
+    """
+
+    SEQ_KEY = "_delta_seq"
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = 30.0,
+        flush_every: int = 500,
+        snapshot_every: int = 20
+    ):
+        self.path = path
+        self.deltas_path = path + ".deltas.jsonl"
+        self.flush_interval = flush_interval
+        self.flush_every = flush_every
+        self.snapshot_every = snapshot_every
+
+        self._seq = 0
+        self._deltas_since_snapshot = 0
+        self._pending_events = 0
+        self._last_flush = time.monotonic()
+        self._flushed: Dict = {}
+
+    def load(self, default: Dict) -> Dict:
+        """Rebuild the counters from the snapshot and later deltas"""
+        state = copy.deepcopy(default)
+        snapshot_seq = 0
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    state = json.load(f)
+                snapshot_seq = state.pop(self.SEQ_KEY, 0)
+            except (OSError, json.JSONDecodeError):
+                pass
+
+        self._seq = snapshot_seq
+        if os.path.exists(self.deltas_path):
+            records, good_bytes = self._read_deltas()
+            for record in records:
+                if record.get("seq", 0) > snapshot_seq:
+                    self._apply(state, record.get("delta", {}))
+                    self._seq = record["seq"]
+                    self._deltas_since_snapshot += 1
+            if good_bytes < os.path.getsize(self.deltas_path):
+                # Cut the torn tail so later appends start on a clean line
+                # instead of being hidden behind it on the next load
+                with open(self.deltas_path, 'r+b') as f:
+                    f.truncate(good_bytes)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+        self._flushed = copy.deepcopy(state)
+        return state
+
+    def note_events(self, count: int = 1):
+        """Count changes toward the event-based flush trigger"""
+        self._pending_events += count
+
+    def due(self) -> bool:
+        """True once enough events or time have passed since the last flush"""
+        if self._pending_events >= self.flush_every:
+            return True
+        return (self._pending_events > 0 and
+                time.monotonic() - self._last_flush >= self.flush_interval)
+
+    def flush(self, state: Dict):
+        """Persist what changed since the last flush"""
+        if self._deltas_since_snapshot >= self.snapshot_every:
+            self.snapshot(state)
+            return
+
+        delta = self._diff(state, self._flushed)
+        if delta:
+            self._seq += 1
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.deltas_path, 'a') as f:
+                f.write(json.dumps({"seq": self._seq, "delta": delta}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._deltas_since_snapshot += 1
+            self._flushed = copy.deepcopy(state)
+        self.mark_flushed()
+
+    def snapshot(self, state: Dict):
+        """Write a full snapshot atomically and drop the deltas it covers"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({**state, self.SEQ_KEY: self._seq}, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+        # Deltas up to _seq are now in the snapshot; a crash before this
+        # removal is harmless because load skips them by sequence number
+        if os.path.exists(self.deltas_path):
+            os.remove(self.deltas_path)
+
+        self._deltas_since_snapshot = 0
+        self._flushed = copy.deepcopy(state)
+        self.mark_flushed()
+
+    def mark_flushed(self):
+        """Reset the flush triggers after the caller persisted the state itself"""
+        self._pending_events = 0
+        self._last_flush = time.monotonic()
+
+    @classmethod
+    def _diff(cls, new: Dict, old: Dict) -> Dict:
+        """Numeric increments (and replaced values) from ``old`` to ``new``"""
+        delta = {}
+        for key, value in new.items():
+            previous = old.get(key)
+            if isinstance(value, dict):
+                nested = cls._diff(value, previous if isinstance(previous, dict) else {})
+                if nested or key not in old:
+                    delta[key] = nested
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                change = value - (previous if isinstance(previous, (int, float)) else 0)
+                if change or key not in old:
+                    delta[key] = change
+            elif value != previous:
+                delta[key] = {"$set": value}
+        return delta
+
+    @classmethod
+    def _apply(cls, state: Dict, delta: Dict):
+        for key, change in delta.items():
+            if isinstance(change, dict) and "$set" in change:
+                state[key] = change["$set"]
+            elif isinstance(change, dict):
+                cls._apply(state.setdefault(key, {}), change)
+            else:
+                state[key] = state.get(key, 0) + change
+
+    def _read_deltas(self):
+        """Complete delta records and the byte length they occupy"""
+        records = []
+        good_bytes = 0
+        with open(self.deltas_path, 'rb') as f:
+            for line in f:
+                # A line without its newline is a torn tail from a crash mid-write
+                if not line.endswith(b"\n"):
+                    break
+                if line.strip():
+                    try:
+                        records.append(json.loads(line))
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        break
+                good_bytes += len(line)
+        return records, good_bytes
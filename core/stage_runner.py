@@ -0,0 +1,171 @@
+"""
+⏱️ STAGE RUNNER - Concurrent analysis stages with deadlines
+Runs a request's independent steps side by side and keeps whatever finishes in time
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class StageGroup:
+    """The stages of one request.
+
+    Each stage has a deadline in seconds from when the group was created.
+    ``collect`` waits for every stage up to its own deadline; a stage that
+    misses it is reported as timed out and its late result is dropped.
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor, slow_executor: Optional[ThreadPoolExecutor] = None):
+        self._executor = executor
+        self._slow_executor = slow_executor or executor
+        self._started = time.monotonic()
+        self._stages: Dict[str, Tuple[Future, float]] = {}
+        # Written by stages that finish after collect() has started reading
+        self._timings: Dict[str, float] = {}
+        self._timings_lock = threading.Lock()
+
+    def submit(
+        self,
+        name: str,
+        fn: Callable[[], Any],
+        deadline: float,
+        slow: bool = False,
+        after: Optional[Future] = None
+    ) -> Future:
+        """Start a stage and return its future.
+
+        ``slow`` stages (LLM calls) run on their own pool, so ones that
+        overrun their deadline can't starve the cheap stages of other
+        requests. With ``after`` the stage starts once that future is done
+        instead of holding a thread while it waits; ``fn`` can then read
+        ``after.result()`` without blocking.
+        """
+        executor = self._slow_executor if slow else self._executor
+
+        def timed():
+            start = time.monotonic()
+            try:
+                return fn()
+            finally:
+                with self._timings_lock:
+                    self._timings[name] = (time.monotonic() - start) * 1000
+
+        if after is None:
+            future = executor.submit(timed)
+        else:
+            future = Future()
+            after.add_done_callback(lambda _: self._chain(executor.submit(timed), future))
+        self._stages[name] = (future, self._started + deadline)
+        return future
+
+    @staticmethod
+    def _chain(source: Future, target: Future):
+        """Settle ``target`` with ``source``'s outcome once it has one"""
+        def copy(done: Future):
+            error = done.exception()
+            if error is not None:
+                target.set_exception(error)
+            else:
+                target.set_result(done.result())
+
+        if target.set_running_or_notify_cancel():
+            source.add_done_callback(copy)
+
+    def when_done(self, callback: Callable[[], Any]):
+        """Call ``callback`` once every stage submitted so far has finished, late ones included"""
+        futures = [future for future, _ in self._stages.values()]
+        if not futures:
+            callback()
+            return
+
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def finished(_future):
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                callback()
+
+        for future in futures:
+            future.add_done_callback(finished)
+
+    def collect(self) -> Tuple[Dict[str, Any], Dict]:
+        """Results by stage (None if missed or failed) and a timing report"""
+        results = {}
+        timed_out = []
+        errors = {}
+
+        for name, (future, deadline_at) in self._stages.items():
+            try:
+                results[name] = future.result(timeout=max(0.0, deadline_at - time.monotonic()))
+            except FutureTimeout:
+                results[name] = None
+                timed_out.append(name)
+            except Exception as e:
+                results[name] = None
+                errors[name] = f"{type(e).__name__}: {e}"
+
+        with self._timings_lock:
+            timings = dict(self._timings)
+        report = {
+            "total_ms": round((time.monotonic() - self._started) * 1000, 1),
+            "stages_ms": {name: round(ms, 1) for name, ms in timings.items() if name not in timed_out},
+            "timed_out": timed_out,
+            "errors": errors
+        }
+        return results, report
+
+
+class StageRunner:
+    """Bounded thread pools shared by every request.
+
+    Stages block on I/O (an LLM call, a JSON write), so threads are enough.
+    The bounds keep stages that outlive their deadline from piling up
+    without limit; when a pool is full new stages queue and their
+    deadline keeps running. LLM stages get a pool of their own, so a slow
+    provider only delays other LLM stages.
+    """
+
+    def __init__(self, max_workers: int = 16, slow_workers: int = 4):
+        self.max_workers = max_workers
+        self.slow_workers = slow_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slow_executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def group(self) -> StageGroup:
+        with self._lock:
+            if self._executor is None:
+                # Created on first use so forked server workers each get their own threads
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="twin-stage")
+                self._slow_executor = ThreadPoolExecutor(self.slow_workers, thread_name_prefix="twin-stage-ai")
+        return StageGroup(self._executor, self._slow_executor)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._slow_executor.shutdown(wait=False)
+                self._executor = None
+                self._slow_executor = None
+
+
+_runner: Optional[StageRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_stage_runner() -> StageRunner:
+    """Process-wide runner, sized by TWIN_STAGE_WORKERS and TWIN_AI_WORKERS"""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = StageRunner(
+                int(os.getenv("TWIN_STAGE_WORKERS", "16")),
+                int(os.getenv("TWIN_AI_WORKERS", "4"))
+            )
+        return _runner
@@ -0,0 +1,268 @@
+"""
+🗄️ STORAGE BACKENDS - Pluggable persistence for twin components
+Embedded SQLite engine shared by the API process and the daemon
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class StorageBackend:
+    """Interface every storage engine implements.
+
+    Documents are small JSON values stored whole (profiles, patterns, stats).
+    Record collections are ordered lists where each row is written on its own
+    (decisions, interactions, insights).
+
+    Several processes may share one engine's database. Records are safe to
+    write from any of them: every insert or update gets a new revision, and
+    a reader catches up with ``load_changes``. Documents are not merged, so
+    the last save wins; each document must have a single writing process.
+    """
+
+    def load_document(self, name: str, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    def save_document(self, name: str, value: Any):
+        raise NotImplementedError
+
+    def load_records(self, collection: str) -> List[Dict]:
+        raise NotImplementedError
+
+    def load_changes(self, collection: str, since: int = 0) -> Tuple[List[Dict], int]:
+        """Records inserted or updated after revision ``since`` and the latest revision"""
+        raise NotImplementedError
+
+    def data_version(self) -> int:
+        """Changes whenever another process commits to the shared database"""
+        return 0
+
+    def insert_record(self, collection: str, record: Dict, key: Optional[str] = None):
+        raise NotImplementedError
+
+    def update_record(self, collection: str, key: str, record: Dict):
+        raise NotImplementedError
+
+    def trim_records(self, collection: str, keep: int):
+        raise NotImplementedError
+
+    @contextmanager
+    def batch(self):
+        """Group several writes into one transaction"""
+        yield self
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLiteStorage(StorageBackend):
+    """SQLite engine in WAL mode.
+
+    WAL lets readers in other processes proceed while one process writes, so
+    the API server and the daemon can point at the same database file.
+    ``PRAGMA data_version`` tells a process cheaply whether anyone else has
+    committed since it last looked. The SQL text below is constant, which
+    lets sqlite3's statement cache reuse the prepared statements across calls.
+    """
+
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS documents (
+            name TEXT PRIMARY KEY,
+            body TEXT NOT NULL,
+            updated_at REAL NOT NULL DEFAULT (julianday('now'))
+        )""",
+        """CREATE TABLE IF NOT EXISTS records (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            collection TEXT NOT NULL,
+            key TEXT,
+            body TEXT NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS records_by_collection ON records (collection, seq)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS records_by_key ON records (collection, key)"
+    ]
+    # Databases created before revisions existed gain the column on open
+    ADD_REVISIONS = [
+        "ALTER TABLE records ADD COLUMN rev INTEGER NOT NULL DEFAULT 0",
+        "UPDATE records SET rev = seq"
+    ]
+    REVISION_INDEX = "CREATE INDEX IF NOT EXISTS records_by_rev ON records (rev)"
+
+    SELECT_DOCUMENT = "SELECT body FROM documents WHERE name = ?"
+    UPSERT_DOCUMENT = (
+        "INSERT INTO documents (name, body) VALUES (?, ?) "
+        "ON CONFLICT(name) DO UPDATE SET body = excluded.body, updated_at = julianday('now')"
+    )
+    SELECT_RECORDS = "SELECT body FROM records WHERE collection = ? ORDER BY seq"
+    SELECT_CHANGES = "SELECT body FROM records WHERE collection = ? AND rev > ? ORDER BY seq"
+    SELECT_REVISION = "SELECT COALESCE(MAX(rev), 0) FROM records"
+    NEXT_REVISION = "(SELECT COALESCE(MAX(rev), 0) + 1 FROM records)"
+    INSERT_RECORD = f"INSERT INTO records (collection, key, body, rev) VALUES (?, ?, ?, {NEXT_REVISION})"
+    UPDATE_RECORD = f"UPDATE records SET body = ?, rev = {NEXT_REVISION} WHERE collection = ? AND key = ?"
+    TRIM_RECORDS = (
+        "DELETE FROM records WHERE collection = ? AND seq <= ("
+        "SELECT seq FROM records WHERE collection = ? ORDER BY seq DESC LIMIT 1 OFFSET ?)"
+    )
+
+    def __init__(self, db_path: str, data_dir: Optional[str] = None):
+        self.db_path = db_path
+        self.data_dir = data_dir or os.path.dirname(db_path)
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._conn = sqlite3.connect(
+            db_path,
+            timeout=30,
+            isolation_level=None,  # Autocommit unless inside batch()
+            check_same_thread=False,
+            cached_statements=256
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in self.SCHEMA:
+            self._conn.execute(statement)
+        with self.batch():
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(records)")}
+            if "rev" not in columns:
+                for statement in self.ADD_REVISIONS:
+                    self._conn.execute(statement)
+        self._conn.execute(self.REVISION_INDEX)
+
+    def load_document(self, name: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._conn.execute(self.SELECT_DOCUMENT, (name,)).fetchone()
+        if row is not None:
+            return json.loads(row[0])
+
+        # First run against an existing JSON data directory: import it
+        legacy = os.path.join(self.data_dir, f"{name}.json")
+        if os.path.exists(legacy):
+            with open(legacy, 'r') as f:
+                value = json.load(f)
+            self.save_document(name, value)
+            return value
+        return default
+
+    def save_document(self, name: str, value: Any):
+        with self._lock:
+            self._conn.execute(self.UPSERT_DOCUMENT, (name, json.dumps(value)))
+
+    def load_records(self, collection: str) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(self.SELECT_RECORDS, (collection,)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def load_changes(self, collection: str, since: int = 0) -> Tuple[List[Dict], int]:
+        with self._lock:
+            # One read transaction, so the revision matches the rows returned
+            own = not self._conn.in_transaction
+            if own:
+                self._conn.execute("BEGIN")
+            try:
+                rows = self._conn.execute(self.SELECT_CHANGES, (collection, since)).fetchall()
+                latest = self._conn.execute(self.SELECT_REVISION).fetchone()[0]
+            finally:
+                if own:
+                    self._conn.execute("COMMIT")
+        return [json.loads(row[0]) for row in rows], latest
+
+    def data_version(self) -> int:
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def insert_record(self, collection: str, record: Dict, key: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(self.INSERT_RECORD, (collection, key, json.dumps(record)))
+
+    def update_record(self, collection: str, key: str, record: Dict):
+        with self._lock:
+            self._conn.execute(self.UPDATE_RECORD, (json.dumps(record), collection, key))
+
+    def trim_records(self, collection: str, keep: int):
+        with self._lock:
+            self._conn.execute(self.TRIM_RECORDS, (collection, collection, keep))
+
+    @contextmanager
+    def batch(self):
+        """Group several writes into one transaction"""
+        with self._lock:
+            if self._batch_depth == 0:
+                self._conn.execute("BEGIN IMMEDIATE")
+            self._batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self._conn.execute("COMMIT")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def write_json_atomic(path: str, value: Any, indent: Optional[int] = None):
+    """Replace a JSON file in one step so readers never see a partial write"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(value, f, indent=indent)
+    os.replace(tmp_path, path)
+
+
+# Shared engines, one per database file
+_engines: Dict[str, StorageBackend] = {}
+_engines_lock = threading.Lock()
+
+
+def _forget_engines_after_fork():
+    # A forked server worker must open its own connections, never reuse the parent's
+    global _engines_lock
+    _engines.clear()
+    _engines_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_engines_after_fork)
+
+
+def get_storage(data_dir: str = "data", backend: Optional[str] = None) -> Optional[StorageBackend]:
+    """Get the storage engine for a data directory.
+
+    ``backend`` defaults to the TWIN_STORAGE environment variable. "json"
+    (the default) returns None, meaning components keep their own JSON files.
+    """
+    backend = (backend or os.getenv("TWIN_STORAGE", "json")).lower()
+
+    if backend == "json":
+        return None
+
+    if backend == "sqlite":
+        db_path = os.path.abspath(os.path.join(data_dir, "twin.db"))
+        with _engines_lock:
+            if db_path not in _engines:
+                _engines[db_path] = SQLiteStorage(db_path, data_dir)
+            return _engines[db_path]
+
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+def release_storage(data_dir: str = "data"):
+    """Close and forget the shared engine for a data directory, if any"""
+    db_path = os.path.abspath(os.path.join(data_dir, "twin.db"))
+    with _engines_lock:
+        engine = _engines.pop(db_path, None)
+    if engine is not None:
+        engine.close()
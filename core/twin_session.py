@@ -0,0 +1,290 @@
+"""
+👥 TWIN SESSIONS - Per-user engine bundles
+Lazily built, LRU-cached twins so one API process can serve a whole team
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from core.cognitive_state_monitor import CognitiveStateMonitor
+from core.context_awareness import ContextAwarenessEngine
+from core.decision_intervention import DecisionInterventionSystem
+from core.decision_tracker import DecisionTracker
+from core.flow_state_protector import FlowStateProtector
+from core.jarvis_brain import JarvisBrain
+from core.learning_engine import LearningEngine
+from core.parallel_universe_viewer import ParallelUniverseViewer
+from core.pattern_analyzer import PatternAnalyzer
+from core.proactive_assistant import ProactiveAssistant
+from core.regret_predictor import RegretPredictor
+from core.storage import get_storage, release_storage
+
+
+DEFAULT_USER = "default"
+USER_ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.@-]{0,63}$")
+
+
+class TwinSession:
+    """Every stateful engine for one user, all rooted at one data dir"""
+
+    def __init__(self, user_id: str, data_dir: str):
+        self.user_id = user_id
+        self.data_dir = data_dir
+        os.makedirs(data_dir, exist_ok=True)
+        storage = get_storage(data_dir)
+
+        self.state_monitor = CognitiveStateMonitor()
+        self.universe_viewer = ParallelUniverseViewer()
+        self.decision_tracker = DecisionTracker(data_dir, storage)
+        self.pattern_analyzer = PatternAnalyzer(data_dir, storage)
+        self.pattern_analyzer.track(self.decision_tracker)
+        self.intervention_system = DecisionInterventionSystem(self.decision_tracker, self.pattern_analyzer)
+        self.regret_predictor = RegretPredictor(self.decision_tracker)
+        self.flow_protector = FlowStateProtector()
+        self.learning_engine = LearningEngine(data_dir, storage)
+        self.context_engine = ContextAwarenessEngine(data_dir, storage)
+        self.jarvis = JarvisBrain()
+        self.proactive = ProactiveAssistant()
+
+        self.last_used = time.monotonic()
+        # Requests holding this session, and whether the cache has let go of it
+        self.refs = 0
+        self.retired = False
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+    def flush(self):
+        """Push anything buffered to disk"""
+        self.decision_tracker.flush()
+        self.pattern_analyzer.flush()
+        self.regret_predictor.flush()
+        self.learning_engine.flush()
+
+    def close(self):
+        """Flush and release file handles and the storage engine"""
+        self.decision_tracker.close()
+        self.pattern_analyzer.close()
+        self.regret_predictor.close()
+        self.learning_engine.close()
+        # The default data dir's engine is shared with the activity tracker
+        if self.user_id != DEFAULT_USER:
+            release_storage(self.data_dir)
+
+
+class SessionCache:
+    """LRU cache of TwinSessions with idle eviction.
+
+    Sessions are kept in least-recently-used order, so idle ones are always
+    at the front and a sweep stops at the first session still in use.
+    ``acquire`` pins a session until ``release``. An evicted session that
+    is still pinned is retired: it is closed when the last request lets go,
+    and a request for that user in the meantime takes it back instead of
+    opening the same files twice. A background thread sweeps idle sessions
+    even when no requests arrive.
+    """
+
+    def __init__(
+        self,
+        root_dir: str = "data",
+        max_sessions: int = 256,
+        idle_timeout: float = 1800,
+        factory: Callable[[str, str], TwinSession] = TwinSession
+    ):
+        self.root_dir = root_dir
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.factory = factory
+        self._sessions: "OrderedDict[str, TwinSession]" = OrderedDict()
+        self._retired: Dict[str, TwinSession] = {}
+        # Users whose session is being built or closed; others wait on the event
+        self._busy: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, user_id: str):
+        return user_id in self._sessions
+
+    def data_dir_for(self, user_id: str) -> str:
+        """The default user keeps the original single-user data dir"""
+        if user_id == DEFAULT_USER:
+            return self.root_dir
+        return os.path.join(self.root_dir, "users", user_id)
+
+    def acquire(self, user_id: str = DEFAULT_USER) -> TwinSession:
+        """Session for a user, pinned until release(); built on first use.
+
+        Building happens outside the cache lock, so one user's journal
+        replay never holds up requests for other users.
+        """
+        if not USER_ID_PATTERN.match(user_id):
+            raise ValueError(f"Invalid user id: {user_id!r}")
+
+        while True:
+            with self._lock:
+                session = self._sessions.get(user_id) or self._retired.pop(user_id, None)
+                if session is not None:
+                    session.retired = False
+                    self._sessions[user_id] = session
+                    self._sessions.move_to_end(user_id)
+                    return self._pin(session)
+
+                busy = self._busy.get(user_id)
+                if busy is None:
+                    busy = self._busy[user_id] = threading.Event()
+                    break
+            busy.wait()
+
+        try:
+            session = self.factory(user_id, self.data_dir_for(user_id))
+        except BaseException:
+            with self._lock:
+                del self._busy[user_id]
+            busy.set()
+            raise
+
+        with self._lock:
+            del self._busy[user_id]
+            self._sessions[user_id] = session
+            session = self._pin(session)
+        busy.set()
+        return session
+
+    def pin(self, session: TwinSession) -> TwinSession:
+        """Take another pin on a session the caller already holds"""
+        with self._lock:
+            session.refs += 1
+        return session
+
+    def release(self, session: TwinSession):
+        """Unpin a session, closing it if it was evicted while in use"""
+        with self._lock:
+            session.refs -= 1
+            if not (session.retired and session.refs == 0 and self._retired.get(session.user_id) is session):
+                return
+            del self._retired[session.user_id]
+            closing = self._mark_closing([session])
+        self._close(closing)
+
+    def get(self, user_id: str = DEFAULT_USER) -> TwinSession:
+        """Session for a user without pinning it (for single-threaded callers)"""
+        session = self.acquire(user_id)
+        self.release(session)
+        return session
+
+    def sweep(self) -> int:
+        """Evict idle sessions now, returning how many were evicted"""
+        with self._lock:
+            closing = self._evict(self._pop_evictable())
+        self._close(closing)
+        return len(closing)
+
+    def close_all(self):
+        """Flush and close every resident session once it is no longer in use"""
+        with self._lock:
+            evicted = list(self._sessions.values())
+            self._sessions.clear()
+            closing = self._evict(evicted)
+        self._close(closing)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "resident": len(self._sessions),
+                "pinned": sum(1 for session in self._sessions.values() if session.refs),
+                "retired": len(self._retired),
+                "max_sessions": self.max_sessions,
+                "idle_timeout": self.idle_timeout,
+                "oldest_idle_seconds": round(now - next(iter(self._sessions.values())).last_used, 1)
+                if self._sessions else 0
+            }
+
+    def _pin(self, session: TwinSession) -> TwinSession:
+        """Pin a resident session and evict around it (lock held)"""
+        session.refs += 1
+        session.touch()
+        closing = self._evict(self._pop_evictable())
+        if closing:
+            # Close on a helper thread so this request is not delayed by it
+            threading.Thread(target=self._close, args=(closing,), daemon=True).start()
+        self._start_sweeper()
+        return session
+
+    def _pop_evictable(self) -> List[TwinSession]:
+        """Remove over-capacity and idle sessions from the LRU end (lock held)"""
+        evicted = []
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._sessions:
+            user_id, oldest = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and oldest.last_used > cutoff:
+                break
+            del self._sessions[user_id]
+            evicted.append(oldest)
+        return evicted
+
+    def _evict(self, evicted: List[TwinSession]) -> List[TwinSession]:
+        """Retire pinned sessions and return the unpinned ones to close (lock held)"""
+        idle = []
+        for session in evicted:
+            if session.refs:
+                session.retired = True
+                self._retired[session.user_id] = session
+            else:
+                idle.append(session)
+        return self._mark_closing(idle)
+
+    def _mark_closing(self, sessions: List[TwinSession]) -> List[TwinSession]:
+        """Block rebuilds of these users until their sessions are closed (lock held)"""
+        for session in sessions:
+            self._busy[session.user_id] = threading.Event()
+        return sessions
+
+    def _close(self, sessions: List[TwinSession]):
+        for session in sessions:
+            try:
+                session.close()
+            finally:
+                with self._lock:
+                    busy = self._busy.pop(session.user_id)
+                busy.set()
+
+    def _start_sweeper(self):
+        """Start the idle sweep thread on first use (lock held)"""
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="twin-session-sweep", daemon=True)
+        self._sweeper.start()
+
+    def _sweep_loop(self):
+        interval = max(1.0, min(60.0, self.idle_timeout / 2))
+        while True:
+            time.sleep(interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"⚠️ Session sweep failed: {e}")
+
+
+_cache: Optional[SessionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_session_cache(root_dir: str = "data") -> SessionCache:
+    """Process-wide cache, sized by TWIN_MAX_SESSIONS and TWIN_SESSION_IDLE"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SessionCache(
+                root_dir,
+                max_sessions=int(os.getenv("TWIN_MAX_SESSIONS", "256")),
+                idle_timeout=float(os.getenv("TWIN_SESSION_IDLE", "1800"))
+            )
+        return _cache
@@ -0,0 +1,219 @@
+"""
+🪟 WINDOW WATCHER - Active-window change notifications
+X11 property-change events with a polling fallback for other platforms
+"""
+
+import os
+import platform
+import select
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import psutil
+
+try:
+    from Xlib import X, display as xdisplay, error as xerror
+    XLIB_AVAILABLE = True
+except ImportError:
+    XLIB_AVAILABLE = False
+
+
+class ProcessNameCache:
+    """pid -> process name, so focus changes don't build a psutil.Process each time.
+
+    A hit is checked with ``Process.is_running()``, which compares the
+    process creation time, so a pid reused by a new process is looked up
+    again instead of returning the old process's name.
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    def lookup(self, pid: int) -> Optional[str]:
+        entry = self._entries.get(pid)
+        if entry is not None:
+            process, name = entry
+            if process.is_running():
+                self._entries.move_to_end(pid)
+                return name
+            del self._entries[pid]
+
+        try:
+            process = psutil.Process(pid)
+            name = process.name()
+        except (psutil.Error, ValueError):
+            return None
+
+        self._entries[pid] = (process, name)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return name
+
+
+class PollingFocusWatcher:
+    """Calls a probe for the active app on an interval and reports changes"""
+
+    def __init__(self, on_focus: Callable[[str], None], probe: Callable[[], Optional[str]],
+                 interval: float = 2.0):
+        self.on_focus = on_focus
+        self.probe = probe
+        self.interval = interval
+        self.thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        self._stop.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        last_app = None
+        while not self._stop.is_set():
+            try:
+                app = self.probe()
+                if app and app != last_app:
+                    last_app = app
+                    self.on_focus(app)
+                self._stop.wait(self.interval)
+            except Exception as e:
+                print(f"Error monitoring apps: {e}")
+                self._stop.wait(5)
+
+
+class X11FocusWatcher:
+    """Reports focus changes from _NET_ACTIVE_WINDOW PropertyNotify events.
+
+    The thread sleeps in select() on the X connection, so there is no work
+    while focus stays put and a switch is seen as soon as the window manager
+    announces it. A lost connection is retried with exponential backoff;
+    after MAX_RECONNECTS failures in a row the watcher hands over to
+    polling ``probe``, if one was given.
+    """
+
+    MAX_RECONNECTS = 5
+    MAX_BACKOFF = 30.0
+
+    def __init__(self, on_focus: Callable[[str], None], process_names: ProcessNameCache,
+                 probe: Optional[Callable[[], Optional[str]]] = None):
+        self.on_focus = on_focus
+        self.process_names = process_names
+        self.probe = probe
+        self.thread = None
+        self.fallback = None
+        self._stop = threading.Event()
+        self._display = None
+
+    def start(self):
+        """Connect to the X server; raises if it is unreachable"""
+        self._connect()
+        self._stop.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self.fallback is not None:
+            self.fallback.stop()
+
+    def _connect(self):
+        self._display = xdisplay.Display()
+        self._root = self._display.screen().root
+        self._active_window_atom = self._display.intern_atom('_NET_ACTIVE_WINDOW')
+        self._pid_atom = self._display.intern_atom('_NET_WM_PID')
+        self._root.change_attributes(event_mask=X.PropertyChangeMask)
+
+    def _disconnect(self):
+        if self._display is not None:
+            try:
+                self._display.close()
+            except Exception:
+                pass
+            self._display = None
+
+    def _run(self):
+        last_app = None
+        failures = 0
+        try:
+            while not self._stop.is_set():
+                try:
+                    if self._display is None:
+                        self._connect()
+                    failures = 0
+                    last_app = self._watch(last_app)
+                except Exception as e:
+                    self._disconnect()
+                    failures += 1
+                    if failures > self.MAX_RECONNECTS and self.probe is not None:
+                        print(f"⚠️ X11 focus events lost ({e}), polling instead")
+                        self.fallback = PollingFocusWatcher(self.on_focus, self.probe)
+                        if not self._stop.is_set():
+                            self.fallback.start()
+                        return
+                    delay = min(self.MAX_BACKOFF, 2.0 ** (failures - 1))
+                    print(f"⚠️ X11 focus watcher error ({e}), reconnecting in {delay:.0f}s")
+                    self._stop.wait(delay)
+        finally:
+            self._disconnect()
+
+    def _watch(self, last_app: Optional[str]) -> Optional[str]:
+        """Report focus changes until stopped; connection errors propagate"""
+        changed = True
+        while not self._stop.is_set():
+            if changed:
+                app = self._active_app()
+                if app and app != last_app:
+                    last_app = app
+                    self._notify(app)
+
+            # Wake at least once a second to notice stop()
+            select.select([self._display], [], [], 1.0)
+            changed = False
+            while self._display.pending_events():
+                event = self._display.next_event()
+                if (event.type == X.PropertyNotify and
+                        event.atom == self._active_window_atom):
+                    changed = True
+        return last_app
+
+    def _notify(self, app: str):
+        # A failing callback must not take the X event loop down with it
+        try:
+            self.on_focus(app)
+        except Exception as e:
+            print(f"Error handling focus change: {e}")
+
+    def _active_app(self) -> Optional[str]:
+        try:
+            active = self._root.get_full_property(self._active_window_atom, X.AnyPropertyType)
+            if not active or not active.value or not active.value[0]:
+                return None
+            window = self._display.create_resource_object('window', active.value[0])
+            pid = window.get_full_property(self._pid_atom, X.AnyPropertyType)
+        except xerror.XError:
+            # Window closed between the event and the lookup
+            return None
+
+        if not pid or not pid.value:
+            return None
+        return self.process_names.lookup(int(pid.value[0]))
+
+
+def create_focus_watcher(on_focus: Callable[[str], None], probe: Callable[[], Optional[str]],
+                         process_names: ProcessNameCache):
+    """Start the best available focus watcher for this platform"""
+    if platform.system() == "Linux" and XLIB_AVAILABLE and os.environ.get("DISPLAY"):
+        watcher = X11FocusWatcher(on_focus, process_names, probe)
+        try:
+            watcher.start()
+            return watcher
+        except Exception as e:
+            print(f"⚠️ X11 focus events unavailable ({e}), polling instead")
+
+    watcher = PollingFocusWatcher(on_focus, probe)
+    watcher.start()
+    return watcher
@@ -0,0 +1,73 @@
+"""
+📝 WRITE-BEHIND FLUSHER - Background persistence for buffered engines
+One thread per process flushes every registered engine on a timer or on demand
+"""
+
+import atexit
+import os
+import threading
+import weakref
+
+
+class WriteBehindFlusher:
+    """Periodically calls ``flush()`` on registered objects.
+
+    Objects keep their pending writes in memory and only mark themselves
+    dirty, so a request never waits on a file rewrite. ``wake`` asks for an
+    early pass when an object's buffer fills up. Objects are held weakly;
+    an evicted engine that was closed properly simply disappears.
+    """
+
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+        self._targets = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def register(self, target):
+        with self._lock:
+            self._targets.add(target)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+
+    def unregister(self, target):
+        with self._lock:
+            self._targets.discard(target)
+
+    def wake(self):
+        """Flush soon instead of waiting for the next interval"""
+        self._wakeup.set()
+
+    def flush_all(self):
+        with self._lock:
+            targets = list(self._targets)
+        for target in targets:
+            try:
+                target.flush()
+            except Exception as e:
+                print(f"⚠️ Write-behind flush failed: {e}")
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush_all()
+
+    def _after_fork(self):
+        # The flushing thread does not survive a fork; the next register restarts it
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+
+_flusher = WriteBehindFlusher(float(os.getenv("TWIN_FLUSH_INTERVAL", "5")))
+atexit.register(_flusher.flush_all)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_flusher._after_fork)
+
+
+def get_flusher() -> WriteBehindFlusher:
+    """Process-wide flusher, run every TWIN_FLUSH_INTERVAL seconds"""
+    return _flusher
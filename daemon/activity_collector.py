@@ -0,0 +1,45 @@
+"""
+📡 ACTIVITY COLLECTOR
+Collects keyboard, mouse and app-switch events once for every process
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.activity_tracker import ACTIVITY_RING_FILE, ActivityTracker
+from core.shared_ring import SharedEventRing
+
+
+def main(data_dir="data"):
+    """Run the collector until Ctrl+C"""
+    ring_path = os.path.join(data_dir, ACTIVITY_RING_FILE)
+    if SharedEventRing.is_live(ring_path):
+        print("⚠️ Another activity collector is already running")
+        return
+
+    ring = SharedEventRing.create(ring_path)
+    tracker = ActivityTracker(data_dir, publish_ring=ring)
+
+    if not tracker.start_tracking():
+        ring.close()
+        return
+
+    print(f"📡 Publishing activity events to {ring_path}")
+    print("   The API, daemon and dashboard will read from it")
+    print("\nPress Ctrl+C to stop\n")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        tracker.stop_tracking()
+        ring.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,7 @@ from core.regret_predictor import RegretPredictor
 from core.flow_state_protector import FlowStateProtector
 from core.decision_tracker import DecisionTracker
 from core.pattern_analyzer import PatternAnalyzer
+from core.activity_tracker import get_tracker
 
 
 class CognitiveTwinDaemon:
@@ -35,12 +36,14 @@ class CognitiveTwinDaemon:
         self.universe_viewer = ParallelUniverseViewer()
         self.decision_tracker = DecisionTracker(data_dir)
         self.pattern_analyzer = PatternAnalyzer(data_dir)
+        self.pattern_analyzer.track(self.decision_tracker)
         self.intervention_system = DecisionInterventionSystem(
             self.decision_tracker,
             self.pattern_analyzer
         )
         self.regret_predictor = RegretPredictor(self.decision_tracker)
         self.flow_protector = FlowStateProtector()
+        self.activity_tracker = get_tracker(data_dir)
         
         # State
         self.last_activity = datetime.now()
@@ -58,6 +61,10 @@ class CognitiveTwinDaemon:
         print("🛡️ Protection systems active")
         print("\nPress Ctrl+C to stop\n")
         
+        # Follow the activity collector's events if it is running
+        if self.activity_tracker.follow_ring is not None:
+            self.activity_tracker.start_tracking()
+        
         # Start monitoring threads
         threads = [
             threading.Thread(target=self._monitor_loop, daemon=True),
@@ -97,6 +104,10 @@ class CognitiveTwinDaemon:
             
             current_time = datetime.now()
             
+            # Real input comes from the activity collector when it is running
+            if self.activity_tracker.is_tracking:
+                self.last_activity = self.activity_tracker.last_activity
+            
             # Detect idle
             if (current_time - self.last_activity).seconds > 300:  # 5 min idle
                 if self.flow_protector.flow_active:
@@ -142,6 +142,66 @@ def test_flow_protector():
         print(f"   ✗ Error: {e}")
         return False
 
+def _linear_interventions(intervention, context):
+    """Fired rule names and primary rule, evaluating every rule in declared order"""
+    fired = []
+    for rule in sorted(intervention.intervention_rules, key=lambda rule: rule["order"]):
+        try:
+            if rule["condition"](context):
+                fired.append(rule)
+        except Exception:
+            pass
+    for severity in ("critical", "high"):
+        ranked = [rule for rule in fired if rule["severity"] == severity]
+        if ranked:
+            return [rule["name"] for rule in fired], ranked[0]["name"]
+    return [rule["name"] for rule in fired], fired[0]["name"] if fired else None
+
+def test_intervention_rules():
+    """Test the short-circuiting rule plan against a full linear evaluation"""
+    print("\n⚡ Testing Decision Intervention...")
+    try:
+        import itertools
+        import tempfile
+        from core.decision_intervention import CONTEXT_COST, DecisionInterventionSystem
+        from core.decision_tracker import DecisionTracker
+        
+        with tempfile.TemporaryDirectory() as data_dir:
+            tracker = DecisionTracker(data_dir)
+            for _ in range(2):
+                tracker.add_decision("buy a car", "impulse", outcome="regret")
+            intervention = DecisionInterventionSystem(tracker, None)
+            costs = {rule["name"]: rule["cost"] for rule in intervention.intervention_rules}
+            
+            checked = 0
+            for emotion, stress, thinking, meeting, decision in itertools.product(
+                (None, "angry", "calm"), (0, 90), (10, 600), (10, 999), ("buy a car", "plan a trip")
+            ):
+                context = {"stress_level": stress, "time_thinking": thinking,
+                           "minutes_since_meeting": meeting, "decision": decision}
+                if emotion:
+                    context["emotional_state"] = emotion
+                
+                expected, expected_primary = _linear_interventions(intervention, context)
+                result = intervention.check_decision(decision, context)
+                if not result["should_intervene"]:
+                    assert not expected, (context, expected)
+                    continue
+                
+                skipped = result["skipped_rules"]
+                assert all(costs[name] > CONTEXT_COST for name in skipped), skipped
+                assert result["intervention"]["rule"] == expected_primary, (context, result["intervention"])
+                warned = [warning["rule"] for warning in result["all_warnings"]]
+                assert warned == [name for name in expected if name not in skipped], (context, warned, expected)
+                checked += 1
+            tracker.close()
+        
+        print(f"   ✓ {checked} contexts match the linear evaluator")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e!r}")
+        return False
+
 def main():
     print("""
 ╔═══════════════════════════════════════════════════════════╗
@@ -162,6 +222,7 @@ def main():
     results.append(("Cognitive Monitor", test_cognitive_monitor()))
     results.append(("Parallel Universe", test_parallel_universe()))
     results.append(("Flow Protector", test_flow_protector()))
+    results.append(("Decision Intervention", test_intervention_rules()))
     
     # Summary
     print("\n" + "="*60)
@@ -31,6 +31,7 @@ class CognitiveTwin:
         self.memory = CognitiveMemory(data_dir)
         self.decisions = DecisionTracker(data_dir)
         self.analyzer = PatternAnalyzer(data_dir)
+        self.analyzer.track(self.decisions)
         self.bias_detector = BiasDetector()
         
         # Initialize simulators
@@ -64,10 +65,6 @@ class CognitiveTwin:
             metadata={"decision_id": decision_id}
         )
         
-        # Re-analyze patterns
-        all_decisions = self.decisions.get_decision_timeline()
-        self.analyzer.analyze_decisions(all_decisions)
-        
         self.console.print(f"✓ Decision recorded: {decision_id}", style="green")
         return decision_id
     